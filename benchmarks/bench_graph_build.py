@@ -0,0 +1,193 @@
+"""
+Benchmark the integer-indexed EntityGraph against the string-keyed NetworkX graph it replaced:
+build time, retained memory, and connected component and degree queries. The original
+DataFrame.iterrows build of the NetworkX graph is timed as well, unless --skip-row-loop is given.
+
+Usage:
+    python -m benchmarks.bench_graph_build --rows 500000
+"""
+import argparse
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from entity_resolution.graph import EntityGraph
+
+ENTITY_TYPES = np.array(["Commercial Registered Agent", "Registered Agent", "Owner"])
+
+
+def make_prepared_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic frame shaped like EntityResolutionRunner's prepared data.
+
+    Parameters:
+    - rows: The number of company rows to generate.
+    - seed: The random seed.
+    """
+    rng = np.random.default_rng(seed)
+    company_ids = np.arange(rows)
+    # Agents are heavily reused across companies, as in the real registry
+    agent_ids = rng.zipf(1.5, rows) % max(rows // 20, 1)
+    return pd.DataFrame(
+        {
+            "company_id": company_ids,
+            "company_name": pd.Series(company_ids).map("COMPANY {} LLC".format),
+            "entity_name": pd.Series(agent_ids).map("AGENT {}".format),
+            "entity_type": ENTITY_TYPES[rng.integers(0, len(ENTITY_TYPES), rows)],
+            "principal_address": pd.Series(
+                rng.integers(0, max(rows // 2, 1), rows)
+            ).map("{} MAIN ST BISMARCK, ND 58501".format),
+        }
+    )
+
+
+def row_loop_build(df: pd.DataFrame) -> nx.DiGraph:
+    """
+    The original per-row NetworkX graph build, kept as the benchmark baseline.
+    """
+    G = nx.DiGraph()
+    for _, row in df.iterrows():
+        company_name = row["company_name"]
+        company_id = row["company_id"]
+        entity_name = row["entity_name"]
+        entity_type = row["entity_type"]
+
+        if entity_name:
+            G.add_node(
+                str(entity_name),
+                title=f"Name: {entity_name} | Relationship: {entity_type}",
+            )
+
+        G.add_node(
+            str(company_name),
+            label=f"Company: {company_name}",
+            title=f"Company ID: {company_id}",
+        )
+
+        G.add_edge(
+            str(entity_name),
+            str(company_name),
+            relationship=f"{entity_type}",
+            label=f"{entity_type}",
+        )
+    return G
+
+
+def networkx_build(df: pd.DataFrame) -> nx.DiGraph:
+    """
+    The former columnar string-keyed NetworkX graph build, with title/label attributes on every
+    node and edge, kept as the benchmark baseline.
+    """
+    G = nx.DiGraph()
+    entity_names = df["entity_name"].astype(str)
+    company_names = df["company_name"].astype(str)
+    entity_types = df["entity_type"].astype(str)
+
+    entity_titles = "Name: " + entity_names + " | Relationship: " + entity_types
+    company_labels = "Company: " + company_names
+    company_titles = "Company ID: " + df["company_id"].astype(str)
+
+    nodes = np.empty(2 * len(df), dtype=object)
+    nodes[0::2] = entity_names.to_numpy()
+    nodes[1::2] = company_names.to_numpy()
+    node_attributes = np.empty(2 * len(df), dtype=object)
+    node_attributes[0::2] = [{"title": title} for title in entity_titles]
+    node_attributes[1::2] = [
+        {"label": label, "title": title}
+        for label, title in zip(company_labels, company_titles)
+    ]
+    G.add_nodes_from(zip(nodes, node_attributes))
+    G.add_edges_from(
+        (entity, company, {"relationship": entity_type, "label": entity_type})
+        for entity, company, entity_type in zip(
+            entity_names, company_names, entity_types
+        )
+    )
+    return G
+
+
+def measure(function, *args) -> tuple[float, float, object]:
+    """
+    Return the seconds, the MB of memory retained by the result, and the result of a call.
+    Memory is traced in a second call, as tracing slows allocations down.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    traced_result = function(*args)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_result
+    return seconds, retained / 1024**2, result
+
+
+def networkx_queries(G: nx.DiGraph) -> tuple[int, int]:
+    n_components = nx.number_weakly_connected_components(G)
+    return n_components, max(degree for _, degree in G.degree)
+
+
+def entity_graph_queries(graph: EntityGraph) -> tuple[int, int]:
+    return int(graph.components().max()) + 1, int(graph.degrees().max())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-row-loop",
+        action="store_true",
+        help="Do not time the iterrows build, which takes about 30s on 500k rows.",
+    )
+    args = parser.parse_args()
+
+    df = make_prepared_frame(args.rows, args.seed)
+
+    row_loop_time = None
+    if not args.skip_row_loop:
+        # Timed once: the row loop is too slow to trace its memory in a second run
+        start = time.perf_counter()
+        G_row_loop = row_loop_build(df)
+        row_loop_time = time.perf_counter() - start
+
+    networkx_time, networkx_mb, G = measure(networkx_build, df)
+    graph_time, graph_mb, graph = measure(EntityGraph.from_entities, df)
+    # Company names are unique in the synthetic frame, so both graphs have the same shape
+    assert G.number_of_nodes() == graph.number_of_nodes()
+    assert G.number_of_edges() == graph.number_of_edges()
+    if row_loop_time is not None:
+        assert list(G_row_loop.nodes(data=True)) == list(G.nodes(data=True))
+        assert list(G_row_loop.edges(data=True)) == list(G.edges(data=True))
+        del G_row_loop
+
+    networkx_query_time, _, networkx_answers = measure(networkx_queries, G)
+    graph_query_time, _, graph_answers = measure(entity_graph_queries, graph)
+    assert networkx_answers == graph_answers
+
+    print(f"rows:          {args.rows}")
+    print(f"nodes, edges:  {graph.number_of_nodes()}, {graph.number_of_edges()}")
+    if row_loop_time is not None:
+        print(f"iterrows:      build {row_loop_time:.2f}s")
+    print(f"networkx:      build {networkx_time:.2f}s, {networkx_mb:.1f} MB")
+    print(f"entity graph:  build {graph_time:.2f}s, {graph_mb:.1f} MB")
+    print(
+        f"queries:       components and degrees {networkx_query_time:.2f}s -> "
+        f"{graph_query_time:.2f}s"
+    )
+    if row_loop_time is not None:
+        print(
+            f"speedup:       {row_loop_time / networkx_time:.1f}x build iterrows -> networkx, "
+            f"{row_loop_time / graph_time:.1f}x iterrows -> entity graph"
+        )
+    print(
+        f"speedup:       {networkx_time / graph_time:.1f}x build networkx -> entity graph, "
+        f"{networkx_mb / graph_mb:.1f}x less memory"
+    )
+
+
+if __name__ == "__main__":
+    main()
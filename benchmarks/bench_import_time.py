@@ -0,0 +1,98 @@
+"""
+Check the import time of the er_pipeline CLI and of every command's --help against a budget.
+
+Every target runs in a fresh interpreter under python -X importtime. A target fails if its
+cumulative import time exceeds the budget or if it imports one of the heavy modules (Scrapy,
+Twisted, pandas, NumPy, NetworkX, pyvis) that only the commands themselves should load.
+Exits with status 1 if any target fails, so it can run as a check.
+
+Usage:
+    python -m benchmarks.bench_import_time --budget-ms 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("scrapy", "twisted", "pandas", "numpy", "networkx", "pyvis")
+
+
+def import_times(code: str) -> tuple[int, set[str]]:
+    """
+    Run code in a fresh interpreter under -X importtime and return its total import time in
+    microseconds and the names of all modules it imported.
+
+    Parameters:
+    - code: The Python code to run.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{result.stderr}")
+    total, modules = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented and already counted in their parent's cumulative time
+        if not name.startswith("  "):
+            total += int(cumulative)
+        modules.add(name.strip())
+    return total, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=500)
+    parser.add_argument(
+        "--commands",
+        default=None,
+        help="Comma-separated commands whose --help is checked, all by default.",
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    import services
+
+    commands = (
+        args.commands.split(",")
+        if args.commands
+        else [command.name for command in services.app.registered_commands]
+    )
+    targets = {"import services": "import services"} | {
+        f"{command} --help": (
+            "import sys, services; "
+            f"sys.argv = ['er_pipeline', {command!r}, '--help']; "
+            "services.main()"
+        )
+        for command in commands
+    }
+
+    failures = []
+    print(f"{'target':<32} {'import ms':>10}  heavy modules")
+    for target, code in targets.items():
+        total, modules = import_times(code)
+        total_ms = total / 1000
+        heavy = sorted({name.split(".")[0] for name in modules} & set(HEAVY_MODULES))
+        print(f"{target:<32} {total_ms:>10.1f}  {', '.join(heavy) or '-'}")
+        if total_ms > args.budget_ms:
+            failures.append(f"{target} took {total_ms:.1f}ms > {args.budget_ms}ms")
+        if heavy:
+            failures.append(f"{target} imported {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: all {len(targets)} targets within {args.budget_ms}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark Parser.parse_data against the original dict-merging parse path.
+
+Payloads are the filing details and search-listing rows recorded in a replay store
+(run_crawler --replay-mode record), or synthetic stand-in payloads if no store is given.
+Both paths must produce the same items; the time and memory per item are compared.
+
+Usage:
+    python -m benchmarks.bench_parser --items 200000 --replay-store-path tmp/replay/api_responses.sqlite
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import time
+import tracemalloc
+from itertools import cycle, islice
+from typing import Optional
+
+from web_crawler.items import CompanyInfoItem
+from web_crawler.replay import ReplayStore
+from web_crawler.spiders.helpers.constants import (
+    BUSINESS_SEARCH_API_PATH,
+    FILING_DETAIL_API_PATH,
+)
+from web_crawler.spiders.parser import Parser
+
+# The original item, without slots
+DictItem = dataclasses.make_dataclass(
+    "DictItem",
+    [(field.name, field.type) for field in dataclasses.fields(CompanyInfoItem)],
+)
+
+
+class DictMergingParser:
+    """
+    The original parse path, kept as the benchmark baseline: every key is snakecased per company,
+    and the item is built from three intermediate dicts.
+    """
+
+    def __normalize_text(self, text):
+        return text.replace("\n", " ").replace("\r", "").strip()
+
+    def __snakecase(self, text):
+        return text.replace(" ", "_").replace("-", "_").replace("___", "_").lower()
+
+    def parse_data(self, filing_info_data, meta_info_data):
+        filing_info = {
+            self.__snakecase(info["LABEL"]): self.__normalize_text(info["VALUE"])
+            for info in filing_info_data["DRAWER_DETAIL_LIST"]
+        }
+        meta_info_formatted = {
+            self.__snakecase(key): value for key, value in meta_info_data.items()
+        }
+        meta_info_formatted.update(
+            {
+                "company_id": meta_info_formatted.pop("id"),
+                "company_name": meta_info_formatted["title"][0],
+                "retrieved_at": datetime.datetime.now(),
+            }
+        )
+        combined_info = meta_info_formatted | filing_info
+        parsed_data = {
+            key: combined_info.get(key, None) for key in DictItem.__annotations__.keys()
+        }
+        yield DictItem(**parsed_data)
+
+
+def recorded_payloads(replay_store_path: str) -> list[tuple[dict, dict]]:
+    """
+    Return the (filing info, meta info) payloads of the companies recorded in a replay store.
+
+    Parameters:
+    - replay_store_path: The path of the replay store.
+    """
+    store = ReplayStore(replay_store_path)
+    rows = {}
+    for _, body in store.recorded(BUSINESS_SEARCH_API_PATH):
+        rows.update(json.loads(body).get("rows", {}))
+    payloads = []
+    for path, body in store.recorded(FILING_DETAIL_API_PATH):
+        # The path is FILING_DETAIL_API_PATH/<company_id>/<owner_status>
+        company_id = path[len(FILING_DETAIL_API_PATH) :].split("/")[1]
+        if company_id in rows:
+            payloads.append((json.loads(body), rows[company_id]))
+    store.close()
+    return payloads
+
+
+def synthetic_payloads(companies: int) -> list[tuple[dict, dict]]:
+    """
+    Return the (filing info, meta info) payloads served by the stand-in server, decoded from JSON.
+
+    Parameters:
+    - companies: The number of synthetic companies.
+    """
+    from web_crawler.standin import SyntheticRegistry
+
+    registry = SyntheticRegistry(companies=companies)
+    return [
+        (
+            json.loads(json.dumps(registry.filing_details[company_id])),
+            json.loads(json.dumps(row)),
+        )
+        for company_id, row in registry.search_rows.items()
+    ]
+
+
+def parse_all(parser, payloads: list[tuple[dict, dict]], items: int) -> list:
+    return [
+        item
+        for filing_info, meta_info in islice(cycle(payloads), items)
+        for item in parser.parse_data(filing_info, meta_info)
+    ]
+
+
+def measure(parser, payloads: list[tuple[dict, dict]], items: int) -> dict:
+    """
+    Return the parse time and retained memory per item of a parser.
+    """
+    # Warm up memoized keys and labels
+    parse_all(parser, payloads, len(payloads))
+    start = time.perf_counter()
+    parse_all(parser, payloads, items)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    parsed = parse_all(parser, payloads, min(items, 50_000))
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "us_per_item": seconds / items * 1e6,
+        "items_per_second": items / seconds,
+        "bytes_per_item": retained / len(parsed),
+    }
+
+
+def fields_without_time(item) -> tuple:
+    return tuple(
+        getattr(item, field.name)
+        for field in dataclasses.fields(item)
+        if field.name != "retrieved_at"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--replay-store-path", default=None)
+    parser.add_argument("--companies", type=int, default=1000)
+    args = parser.parse_args()
+
+    payloads: Optional[list] = (
+        recorded_payloads(args.replay_store_path) if args.replay_store_path else None
+    )
+    if not payloads:
+        payloads = synthetic_payloads(args.companies)
+
+    baseline, fast = DictMergingParser(), Parser()
+    for filing_info, meta_info in payloads:
+        (expected,) = baseline.parse_data(filing_info, meta_info)
+        (actual,) = fast.parse_data(filing_info, meta_info)
+        assert fields_without_time(expected) == fields_without_time(actual)
+
+    baseline_result = measure(baseline, payloads, args.items)
+    fast_result = measure(fast, payloads, args.items)
+
+    print(f"payloads:   {len(payloads)} ({args.replay_store_path or 'synthetic'})")
+    print(f"items:      {args.items}")
+    for name, result in (("dict merge", baseline_result), ("fast path", fast_result)):
+        print(
+            f"{name + ':':<11} {result['us_per_item']:.2f}us/item, "
+            f"{result['items_per_second']:,.0f} items/s, "
+            f"{result['bytes_per_item']:.0f} bytes/item"
+        )
+    print(
+        f"speedup:    {baseline_result['us_per_item'] / fast_result['us_per_item']:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmark the end-to-end pipeline on synthetic registries of increasing size.
+
+Every size is generated up front and then benchmarked in its own process, so peak RSS covers
+only the pipeline and is not carried over between sizes. Each stage of the ER runner and
+Parser.parse_data is timed separately, and the results are written as JSON so runs on
+different commits can be compared.
+
+Usage:
+    python -m benchmarks.bench_pipeline --sizes 1000,10000,100000,1000000
+    python -m benchmarks.bench_pipeline --sizes 1000,10000 --compare benchmarks/results/<commit>.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+from benchmarks.synthetic_registry import generate_registry
+from entity_resolution.er import EntityResolutionRunner
+from entity_resolution.metrics import file_size
+from entity_resolution.rendering import GRAPH_DATA_SUFFIX
+from web_crawler.spiders.parser import Parser
+from web_crawler.standin import SyntheticRegistry
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+DEFAULT_RESULTS_DIR = "benchmarks/results"
+
+
+def peak_rss_mb() -> float:
+    """
+    Return the peak resident set size of this process in MB.
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def time_stage(stages: dict, name: str, stage, *args) -> None:
+    start = time.perf_counter()
+    stage(*args)
+    stages[name] = {
+        "seconds": round(time.perf_counter() - start, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def parse_payloads(payloads: list[tuple[dict, dict]], rows: int) -> None:
+    parser = Parser()
+    for filing_info, meta_info in islice(cycle(payloads), rows):
+        for _ in parser.parse_data(filing_info, meta_info):
+            pass
+
+
+def run_size(in_file_path: str, rows: int, args: argparse.Namespace) -> dict:
+    """
+    Run every pipeline stage on a synthetic registry.
+
+    Parameters:
+    - in_file_path: The synthetic registry CSV.
+    - rows: The number of companies in the registry.
+    - args: The parsed command line arguments.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # pyvis writes its assets next to the working directory
+        os.chdir(tmp_dir)
+        stages = {}
+        runner = EntityResolutionRunner(
+            in_file_path,
+            os.path.join(tmp_dir, "plot.html"),
+            os.path.join(tmp_dir, "clusters.csv"),
+            fuzzy_threshold=args.fuzzy_threshold,
+            gh_pages_path=os.path.join(tmp_dir, "index.html"),
+            render_mode=args.render_mode,
+            workers=args.workers,
+        )
+        for name, stage in runner.stages():
+            time_stage(stages, name, stage)
+            stages[name]["counters"] = runner.metrics.stages[name]["counters"]
+        nodes, edges = runner.G.number_of_nodes(), runner.G.number_of_edges()
+        # The single page loads its graph data from a file next to it
+        plot_path = Path(runner.out_plot_file_name)
+        html_mb = (
+            file_size(
+                str(plot_path),
+                str(plot_path.with_name(f"{plot_path.stem}{GRAPH_DATA_SUFFIX}")),
+            )
+            / 1024**2
+        )
+        del runner
+
+        # Parse a bounded set of distinct API payloads, cycled up to the requested size
+        registry = SyntheticRegistry(companies=min(rows, args.parse_sample))
+        payloads = [
+            (registry.filing_details[company_id], row)
+            for company_id, row in registry.search_rows.items()
+        ]
+        time_stage(stages, "parse_data", parse_payloads, payloads, rows)
+
+    return {
+        "rows": rows,
+        "nodes": nodes,
+        "edges": edges,
+        "html_mb": round(html_mb, 2),
+        "total_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": stages,
+    }
+
+
+def run_size_in_process(rows: int, args: argparse.Namespace) -> dict:
+    """
+    Generate a synthetic registry of the given size and benchmark it in a fresh process.
+
+    Parameters:
+    - rows: The number of companies.
+    - args: The parsed command line arguments.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        in_file_path = os.path.join(tmp_dir, "active_companies.csv")
+        start = time.perf_counter()
+        generate_registry(
+            rows,
+            agent_reuse=args.agent_reuse,
+            address_collision_rate=args.address_collision_rate,
+            noise=args.noise,
+            seed=args.seed,
+        ).to_csv(in_file_path, index=False)
+        generate_seconds = round(time.perf_counter() - start, 4)
+
+        command = [sys.executable, "-m", "benchmarks.bench_pipeline", *sys.argv[1:]]
+        command += ["--single", str(rows), "--input", in_file_path]
+        process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode:
+        error = (process.stderr.strip().splitlines() or ["killed"])[-1]
+        return {"rows": rows, "generate_seconds": generate_seconds, "error": error}
+    result = json.loads(process.stdout.splitlines()[-1])
+    return {"generate_seconds": generate_seconds, **result}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: list[dict], baseline: dict) -> None:
+    for result in results:
+        if "error" in result:
+            print(f"{result['rows']:>9} rows: failed: {result['error']}")
+            continue
+        print(
+            f"{result['rows']:>9} rows: {result['total_seconds']:9.2f}s, "
+            f"peak RSS {result['peak_rss_mb']:8.1f} MB, "
+            f"{result['nodes']} nodes, {result['edges']} edges"
+        )
+        baseline_stages = baseline.get(result["rows"], {}).get("stages", {})
+        for name, stage in result["stages"].items():
+            line = f"    {name:<18} {stage['seconds']:9.3f}s {stage['peak_rss_mb']:8.1f} MB"
+            if baseline_stages.get(name, {}).get("seconds"):
+                ratio = stage["seconds"] / baseline_stages[name]["seconds"]
+                line += f"  x{ratio:.2f} vs baseline"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--agent-reuse", type=float, default=0.5)
+    parser.add_argument("--address-collision-rate", type=float, default=0.1)
+    parser.add_argument("--noise", type=float, default=0.1)
+    parser.add_argument("--fuzzy-threshold", type=float, default=0.9)
+    parser.add_argument("--render-mode", default="single")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--parse-sample", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="The JSON results path")
+    parser.add_argument("--compare", help="A previous JSON results file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_size(args.input, args.single, args)))
+        return
+
+    results = []
+    for rows in (int(size) for size in args.sizes.split(",")):
+        results.append(run_size_in_process(rows, args))
+        print_results(results[-1:], {})
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("out", "compare", "single", "input")
+        },
+        "results": results,
+    }
+    out_path = Path(args.out or os.path.join(DEFAULT_RESULTS_DIR, f"{commit}.json"))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2))
+    print(f"Wrote results to {out_path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(f"Compared with {baseline['commit']}:")
+        print_results(
+            results, {result["rows"]: result for result in baseline["results"]}
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Check the retry backoff of the crawler against the stand-in server run with an error rate.
+
+The stand-in server answers a share of the requests with a 503 and a Retry-After header, and a
+crawl of one prefix runs against it with the project settings. The check fails if:
+- the reactor stalls while retries wait for their backoff (retries must be rescheduled, not slept),
+  or no response arrives while a retry is waiting,
+- a retry reaches the downloader before the Retry-After of its 503 has elapsed,
+- the crawl does not close with finish_reason 'finished'.
+Exits with status 1 if any check fails, so it can run as a check.
+
+Usage:
+    python -m benchmarks.bench_retry_backoff --error-rate 0.02 --companies 18000
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEARTBEAT_SECONDS = 0.05
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_standin_server(
+    port: int, companies: int, error_rate: float, latency: float
+) -> subprocess.Popen:
+    """
+    Start the stand-in server in a subprocess and wait until it accepts connections.
+
+    Parameters:
+    - port: The port to listen on.
+    - companies: The number of synthetic companies to serve.
+    - error_rate: The share of requests answered with a 503 and a Retry-After header.
+    - latency: The mean response latency in seconds.
+    """
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import services; services.main()",
+            "run_standin_server",
+            "--port",
+            str(port),
+            "--companies",
+            str(companies),
+            "--error-rate",
+            str(error_rate),
+            "--latency",
+            str(latency),
+        ],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"The stand-in server did not start on port {port}")
+
+
+class RetryRecorder:
+    """
+    Records, through the crawler signals, the Retry-After of every retried response, the delay
+    before its retry reached the downloader, the responses received meanwhile and the longest
+    reactor stall.
+    """
+
+    def __init__(self, crawler) -> None:
+        from scrapy import signals
+
+        self.crawler = crawler
+        self.waiting: dict[bytes, tuple[float, float]] = {}
+        self.retry_delays: list[tuple[float, float]] = []
+        self.responses_while_waiting = 0
+        self.max_stall = 0.0
+        self.finish_reason = None
+        self.heartbeat = None
+        self.last_beat = None
+        crawler.signals.connect(self.engine_started, signal=signals.engine_started)
+        crawler.signals.connect(
+            self.response_downloaded, signal=signals.response_downloaded
+        )
+        crawler.signals.connect(
+            self.request_reached_downloader, signal=signals.request_reached_downloader
+        )
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    def engine_started(self):
+        from twisted.internet import task
+
+        self.last_beat = time.monotonic()
+        self.heartbeat = task.LoopingCall(self.beat)
+        self.heartbeat.start(HEARTBEAT_SECONDS, now=False)
+
+    def beat(self):
+        now = time.monotonic()
+        self.max_stall = max(self.max_stall, now - self.last_beat - HEARTBEAT_SECONDS)
+        self.last_beat = now
+
+    def response_downloaded(self, response, request, spider):
+        now = time.monotonic()
+        if self.waiting:
+            self.responses_while_waiting += 1
+        retry_after = response.headers.get("Retry-After")
+        if response.status == 503 and retry_after:
+            fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+            self.waiting[fingerprint] = (now, float(retry_after))
+
+    def request_reached_downloader(self, request, spider):
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+        if fingerprint in self.waiting:
+            failed_at, retry_after = self.waiting.pop(fingerprint)
+            self.retry_delays.append((time.monotonic() - failed_at, retry_after))
+
+    def spider_closed(self, spider, reason):
+        self.finish_reason = reason
+        if self.heartbeat and self.heartbeat.running:
+            self.heartbeat.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--companies", type=int, default=18000)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--search-param", default="A")
+    parser.add_argument(
+        "--max-stall",
+        type=float,
+        default=0.5,
+        help="The longest reactor stall in seconds allowed while retries wait.",
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.settings import Settings
+
+    port = free_port()
+    server = start_standin_server(port, args.companies, args.error_rate, args.latency)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            settings = Settings()
+            settings.setmodule("web_crawler.settings", priority="project")
+            settings.set("SOURCE_BASE_URL", f"http://127.0.0.1:{port}")
+            settings.set(
+                "FEEDS",
+                {os.path.join(output_dir, "items.jsonl"): {"format": "jsonlines"}},
+            )
+            process = CrawlerProcess(settings)
+            crawler = process.create_crawler("rest_spider")
+            recorder = RetryRecorder(crawler)
+            started = time.monotonic()
+            process.crawl(crawler, search_param=args.search_param)
+            process.start()
+            elapsed = time.monotonic() - started
+            stats = crawler.stats.get_stats()
+    finally:
+        server.terminate()
+        server.wait()
+
+    retries = len(recorder.retry_delays)
+    early = [
+        (delay, retry_after)
+        for delay, retry_after in recorder.retry_delays
+        # The retry is scheduled a moment after the response is downloaded
+        if delay < retry_after - 0.01
+    ]
+    total_wait = sum(delay for delay, _ in recorder.retry_delays)
+    print(f"{'items':<32} {stats.get('item_scraped_count', 0):>10}")
+    print(f"{'retries':<32} {retries:>10}")
+    print(f"{'crawl seconds':<32} {elapsed:>10.2f}")
+    print(f"{'summed retry delays seconds':<32} {total_wait:>10.2f}")
+    if retries:
+        shortest = min(delay for delay, _ in recorder.retry_delays)
+        print(f"{'shortest retry delay seconds':<32} {shortest:>10.2f}")
+    print(
+        f"{'responses while retries waited':<32} {recorder.responses_while_waiting:>10}"
+    )
+    print(f"{'longest reactor stall seconds':<32} {recorder.max_stall:>10.3f}")
+    print(f"{'finish_reason':<32} {str(recorder.finish_reason):>10}")
+
+    failures = []
+    if not retries:
+        failures.append("no request was retried, raise --error-rate or --companies")
+    if recorder.waiting:
+        failures.append(f"{len(recorder.waiting)} retries never reached the downloader")
+    if recorder.max_stall > args.max_stall:
+        failures.append(
+            f"the reactor stalled for {recorder.max_stall:.3f}s > {args.max_stall}s"
+        )
+    if retries and not recorder.responses_while_waiting:
+        failures.append("no response was downloaded while retries waited")
+    if early:
+        failures.append(
+            f"{len(early)} retries ran before their Retry-After, e.g. after "
+            f"{early[0][0]:.3f}s instead of {early[0][1]}s"
+        )
+    if recorder.finish_reason != "finished":
+        failures.append(f"the crawl closed with {recorder.finish_reason!r}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: {retries} retries honoured Retry-After without blocking the crawl")
+
+
+if __name__ == "__main__":
+    main()
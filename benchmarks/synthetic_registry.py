@@ -0,0 +1,210 @@
+"""
+Generate a synthetic crawl output with the CompanyInfoItem schema, for benchmarking the pipeline
+at sizes the live registry cannot provide.
+
+Usage:
+    python -m benchmarks.synthetic_registry --companies 100000 --out tmp/data/synthetic.csv
+"""
+import argparse
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from web_crawler.items import CompanyInfoItem
+from web_crawler.standin import COMMERCIAL_AGENTS, FILING_TYPES
+
+FIRST_NAMES = [
+    "MICHELLE",
+    "ZANE",
+    "RICK",
+    "PATRICIA",
+    "JAMES",
+    "MARIA",
+    "DAVID",
+    "LINDA",
+]
+LAST_NAMES = ["BAKKE", "SCHOBINGER", "PAULSON", "ROGALLA", "OLSON", "NELSON", "JOHNSON"]
+STREETS = ["MAIN ST", "BROADWAY AVE", "W SWEET AVE", "46TH AVE S", "W CENTURY AVE"]
+CITIES = ["BISMARCK, ND", "FARGO, ND", "MINOT, ND", "DICKINSON, ND", "WILLISTON, ND"]
+NAME_WORDS = ["AVIATION", "VENTURES", "HOLDINGS", "FARMS", "ENERGY", "LOGISTICS"]
+ENTITY_TYPE_SHARES = {
+    "commercial_registered_agent": 0.4,
+    "registered_agent": 0.4,
+    "owner_name": 0.2,
+}
+
+
+def pick(rng: np.random.Generator, values: list[str], size: int) -> pd.Series:
+    return pd.Series(np.array(values)[rng.integers(0, len(values), size)])
+
+
+def make_addresses(rng: np.random.Generator, size: int) -> pd.Series:
+    return (
+        pd.Series(rng.integers(1, 10000, size)).astype(str)
+        + " "
+        + pick(rng, STREETS, size)
+        + " "
+        + pick(rng, CITIES, size)
+        + "  "
+        + pd.Series(rng.integers(58001, 58856, size)).astype(str)
+    )
+
+
+def add_noise(rng: np.random.Generator, values: pd.Series) -> pd.Series:
+    """
+    Return noisy variants of the values: different spacing, punctuation and ZIP+4.
+
+    Parameters:
+    - rng: The random generator.
+    - values: The values to perturb.
+    """
+    return (
+        values.str.replace("  ", " ", regex=False).str.replace(",", "", regex=False)
+        + "-"
+        + pd.Series(rng.integers(1000, 9999, len(values)), index=values.index).astype(
+            str
+        )
+    )
+
+
+def copy_earlier(
+    rng: np.random.Generator, values: pd.Series, rate: float, noise: float
+) -> pd.Series:
+    """
+    Replace a share of the values with (possibly noisy) copies of earlier values.
+
+    Parameters:
+    - rng: The random generator.
+    - values: The values.
+    - rate: The share of values replaced with a copy.
+    - noise: The share of copies that are perturbed.
+    """
+    values = values.copy()
+    copied = rng.random(len(values)) < rate
+    copied[0] = False
+    sources = (rng.random(len(values)) * np.arange(len(values))).astype(int)
+    copies = values.iloc[sources[copied]].reset_index(drop=True)
+    noisy = rng.random(len(copies)) < noise
+    copies[noisy] = add_noise(rng, copies[noisy])
+    values[copied] = copies.to_numpy()
+    return values
+
+
+def generate_registry(
+    companies: int,
+    agent_reuse: float = 0.5,
+    address_collision_rate: float = 0.1,
+    noise: float = 0.1,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Generate a synthetic crawl output with one CompanyInfoItem row per company.
+
+    Parameters:
+    - companies: The number of companies.
+    - agent_reuse: The share of registered agents and owners drawn from a shared pool
+      rather than being unique to their company.
+    - address_collision_rate: The share of principal addresses copied from another company.
+    - noise: The share of copied addresses and reused agents that are noisy variants.
+    - seed: The random seed.
+    """
+    rng = np.random.default_rng(seed)
+    company_ids = pd.Series(np.arange(100000, 100000 + companies)).astype(str)
+    company_names = (
+        pick(rng, NAME_WORDS, companies)
+        + " "
+        + pick(rng, NAME_WORDS, companies)
+        + " "
+        + company_ids
+        + ", LLC"
+    )
+    filing_types = pick(rng, FILING_TYPES, companies)
+    filing_dates = pick(
+        rng, pd.date_range("1990-01-01", "2023-12-31").strftime("%m/%d/%Y"), companies
+    )
+    principal_addresses = copy_earlier(
+        rng, make_addresses(rng, companies), address_collision_rate, noise
+    )
+
+    # Reused agents and owners come from a pool about 2% the size of the registry
+    people = (
+        pick(rng, FIRST_NAMES, companies)
+        + "  "
+        + pick(rng, LAST_NAMES, companies)
+        + " "
+        + company_ids
+    )
+    agents = people + " " + make_addresses(rng, companies)
+    pool = rng.integers(0, max(companies // 50, 1), companies)
+    reused = rng.random(companies) < agent_reuse
+    noisy = reused & (rng.random(companies) < noise)
+    people[reused] = people.iloc[pool[reused]].to_numpy()
+    agents[reused] = agents.iloc[pool[reused]].to_numpy()
+    people[noisy] = people[noisy].str.title()
+    agents[noisy] = add_noise(rng, agents[noisy])
+
+    entity_types = rng.choice(
+        list(ENTITY_TYPE_SHARES), companies, p=list(ENTITY_TYPE_SHARES.values())
+    )
+    df = pd.DataFrame(
+        {
+            "company_id": company_ids,
+            "company_name": company_names,
+            "title": company_names + "," + filing_types,
+            "owner_name": people.where(entity_types == "owner_name"),
+            "filing_type": filing_types,
+            "filing_date": filing_dates,
+            "record_num": company_ids.str.zfill(10),
+            "status": "Active",
+            "standing": "Good Standing",
+            "alert": False,
+            "can_reinstate": False,
+            "can_file_ar": False,
+            "can_always_file_ar": False,
+            "can_file_reinstatement": False,
+            "standing_ar": "Good",
+            "standing_ra": "Good",
+            "standing_other": "Good",
+            "formed_in": "NORTH DAKOTA",
+            "term_of_duration": "Perpetual",
+            "initial_filing_date": filing_dates,
+            "delayed_effective_date": None,
+            "principal_address": principal_addresses,
+            "mailing_address": principal_addresses,
+            "ar_due_date": "11/15/2024",
+            "registered_agent": agents.where(entity_types == "registered_agent"),
+            "commercial_registered_agent": pick(
+                rng, COMMERCIAL_AGENTS, companies
+            ).where(entity_types == "commercial_registered_agent"),
+            "retrieved_at": pd.Timestamp("2023-12-18 02:03:26"),
+        }
+    )
+    return df[[field.name for field in dataclasses.fields(CompanyInfoItem)]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=100_000)
+    parser.add_argument("--agent-reuse", type=float, default=0.5)
+    parser.add_argument("--address-collision-rate", type=float, default=0.1)
+    parser.add_argument("--noise", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="tmp/data/synthetic/active_companies.csv")
+    args = parser.parse_args()
+
+    df = generate_registry(
+        args.companies,
+        agent_reuse=args.agent_reuse,
+        address_collision_rate=args.address_collision_rate,
+        noise=args.noise,
+        seed=args.seed,
+    )
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(args.out, index=False)
+    print(f"Wrote {len(df)} companies to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
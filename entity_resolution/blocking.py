@@ -0,0 +1,46 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def address_key(address) -> Optional[str]:
+    """
+    Return the blocking key for an address, or None if the address cannot be matched.
+
+    Parameters:
+    - address: The raw address value.
+    """
+    if isinstance(address, str) and address:
+        return address
+    return None
+
+
+def address_blocks(addresses) -> np.ndarray:
+    """
+    Return the address block of every row: a code shared by the rows with the same address key,
+    -1 for rows whose address cannot be matched. Codes are numbered by first appearance.
+
+    Parameters:
+    - addresses: The raw address of every row.
+    """
+    keys = pd.Series(addresses, dtype=object).map(address_key)
+    return pd.factorize(keys)[0]
+
+
+def block_firsts(blocks: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """
+    Return the first node of the block of every row, -1 for rows in no block. Linking every node
+    of a block to its first node merges the block with one link per node instead of every pair.
+
+    Parameters:
+    - blocks: The block code of every row, negative for rows in no block.
+    - nodes: The node id of every row.
+    """
+    in_block = blocks >= 0
+    firsts = np.full(len(blocks), -1, dtype=np.int64)
+    _, first_rows, inverse = np.unique(
+        blocks[in_block], return_index=True, return_inverse=True
+    )
+    firsts[in_block] = nodes[in_block][first_rows][inverse]
+    return firsts
@@ -0,0 +1,360 @@
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution.blocking import address_blocks, block_firsts
+from entity_resolution.constants import MAX_SHARED_ADDRESSES
+from entity_resolution.graph import connected_components
+
+
+class UnionFind:
+    """
+    Array-based disjoint-set forest over integer node ids, with path compression and union by rank
+    for single unions and vectorized finds and unions for batches of nodes.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Initialize a UnionFind where every node is its own set.
+
+        Parameters:
+        - size: The number of nodes.
+        """
+        self.parent = np.arange(size, dtype=np.int64)
+        self.rank = np.zeros(size, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def grow(self, size: int) -> None:
+        """
+        Add singleton sets for new nodes up to the given number of nodes.
+
+        Parameters:
+        - size: The new number of nodes.
+        """
+        if size > len(self.parent):
+            self.parent = np.concatenate(
+                [self.parent, np.arange(len(self.parent), size, dtype=np.int64)]
+            )
+            self.rank = np.concatenate(
+                [self.rank, np.zeros(size - len(self.rank), dtype=np.int8)]
+            )
+
+    def find(self, node: int) -> int:
+        """
+        Return the root of the set containing node, compressing the path to it.
+
+        Parameters:
+        - node: The integer node id.
+        """
+        parent = self.parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return int(root)
+
+    def union(self, node1: int, node2: int) -> int:
+        """
+        Merge the sets containing node1 and node2 and return the root of the merged set.
+
+        Parameters:
+        - node1: The first integer node id.
+        - node2: The second integer node id.
+        """
+        root1, root2 = self.find(node1), self.find(node2)
+        if root1 == root2:
+            return root1
+        if self.rank[root1] < self.rank[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        if self.rank[root1] == self.rank[root2]:
+            self.rank[root1] += 1
+        return root1
+
+    def find_many(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        Return the root of the set containing every node, compressing the paths of the nodes.
+
+        Parameters:
+        - nodes: An array of integer node ids.
+        """
+        parent = self.parent
+        roots = parent[nodes]
+        while True:
+            grandparents = parent[roots]
+            if np.array_equal(grandparents, roots):
+                break
+            roots = grandparents
+        parent[nodes] = roots
+        return roots
+
+    def union_many(self, nodes1, nodes2) -> None:
+        """
+        Merge the sets of every aligned pair of nodes. The roots the pairs link are merged as the
+        connected components of a graph over those roots only, so a batch costs time in its own
+        size rather than in the size of the forest.
+
+        Parameters:
+        - nodes1: An array of integer node ids.
+        - nodes2: An array of integer node ids aligned with nodes1.
+        """
+        nodes1 = np.asarray(nodes1, dtype=np.int64)
+        nodes2 = np.asarray(nodes2, dtype=np.int64)
+        roots, root_ids = np.unique(
+            np.concatenate([self.find_many(nodes1), self.find_many(nodes2)]),
+            return_inverse=True,
+        )
+        components = connected_components(
+            len(roots), root_ids[: len(nodes1)], root_ids[len(nodes1) :]
+        )
+        # Components are numbered by their lowest root, which becomes the root of the merged set
+        _, lowest = np.unique(components, return_index=True)
+        self.parent[roots] = roots[lowest][components]
+
+    def roots(self) -> np.ndarray:
+        """
+        Return the root of every node, fully compressing the forest with vectorized pointer jumping.
+        """
+        parent = self.parent
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                return parent
+            parent[:] = grandparent
+
+    def labels(self) -> np.ndarray:
+        """
+        Return a dense cluster id (0..n_clusters-1) for every node, numbered by first appearance.
+        """
+        _, first_index, inverse = np.unique(
+            self.roots(), return_index=True, return_inverse=True
+        )
+        # Renumber so cluster ids follow the order in which clusters first appear
+        order = np.argsort(np.argsort(first_index))
+        return order[inverse]
+
+
+class NodeIndex:
+    """
+    Integer node ids of the entities and companies of a set of rows, laid out like EntityGraph:
+    entities keyed by name first, then companies keyed by company_id, so that companies sharing
+    a name stay apart and clusters are the connected components of the graph.
+    """
+
+    def __init__(self, entity_names, company_ids) -> None:
+        """
+        Intern the entity names and company_ids of the rows.
+
+        Parameters:
+        - entity_names: The entity name of every row.
+        - company_ids: The company_id of every row, as strings.
+        """
+        self.entity_index = pd.Index(pd.unique(np.asarray(entity_names, dtype=object)))
+        self.company_index = pd.Index(pd.unique(np.asarray(company_ids, dtype=object)))
+        self.n_entities = len(self.entity_index)
+
+    def __len__(self) -> int:
+        return self.n_entities + len(self.company_index)
+
+    def entity_nodes(self, names) -> np.ndarray:
+        """
+        Return the node ids of entities by name, -1 for unknown names.
+
+        Parameters:
+        - names: The entity names.
+        """
+        return self.entity_index.get_indexer(pd.Index(names, dtype=object))
+
+    def company_nodes(self, company_ids) -> np.ndarray:
+        """
+        Return the node ids of companies by company_id, -1 for unknown companies.
+
+        Parameters:
+        - company_ids: The company ids, as strings.
+        """
+        nodes = self.company_index.get_indexer(pd.Index(company_ids, dtype=object))
+        return np.where(nodes >= 0, nodes + self.n_entities, -1)
+
+
+def union_rows(
+    forest: UnionFind,
+    entity_nodes: np.ndarray,
+    company_nodes: np.ndarray,
+    addresses,
+) -> pd.DataFrame:
+    """
+    Merge the entity and the company of every row, and every company with the first company at
+    its address. Returns the address and first company node of every address shared by several
+    companies, in input order.
+
+    Parameters:
+    - forest: The UnionFind over the node ids.
+    - entity_nodes: The entity node id of every row.
+    - company_nodes: The company node id of every row.
+    - addresses: The principal address of every row.
+    """
+    forest.union_many(entity_nodes, company_nodes)
+    blocks = address_blocks(addresses)
+    firsts = block_firsts(blocks, company_nodes)
+    linked = (firsts >= 0) & (firsts != company_nodes)
+    forest.union_many(firsts[linked], company_nodes[linked])
+    # Block codes follow the first appearance of every address
+    return (
+        pd.DataFrame(
+            {
+                "block": blocks[linked],
+                "address": np.asarray(addresses, dtype=object)[linked],
+                "node": firsts[linked],
+            }
+        )
+        .drop_duplicates("block")
+        .sort_values("block")[["address", "node"]]
+    )
+
+
+def cluster_companies(
+    df: pd.DataFrame,
+    company_links: Iterable[tuple[str, str]] = (),
+    entity_links: Iterable[tuple[str, str]] = (),
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Cluster companies connected through shared entities or addresses.
+
+    Returns a company_id -> cluster_id table and a table of per-cluster stats.
+
+    Parameters:
+    - df: The prepared data with company_id, company_name, entity_name, entity_type and
+      principal_address columns.
+    - company_links: Additional pairs of linked company_ids, e.g. similar addresses.
+    - entity_links: Additional pairs of linked entity names, e.g. similar names.
+    """
+    entity_names = df["entity_name"].astype(str).to_numpy()
+    company_ids = df["company_id"].astype(str).to_numpy()
+    nodes = NodeIndex(entity_names, company_ids)
+    company_nodes = nodes.company_nodes(company_ids)
+
+    forest = UnionFind(len(nodes))
+    shared_addresses = union_rows(
+        forest,
+        nodes.entity_nodes(entity_names),
+        company_nodes,
+        df["principal_address"].to_numpy(),
+    )
+    for node_ids, links in (
+        (nodes.company_nodes, list(company_links)),
+        (nodes.entity_nodes, list(entity_links)),
+    ):
+        if links:
+            linked1, linked2 = zip(*links)
+            forest.union_many(node_ids(linked1), node_ids(linked2))
+
+    node_clusters = forest.labels()
+
+    clusters = pd.DataFrame(
+        {
+            "company_id": df["company_id"].to_numpy(),
+            "cluster_id": node_clusters[company_nodes],
+        }
+    ).drop_duplicates("company_id")
+
+    shared_addresses = pd.DataFrame(
+        {
+            "cluster_id": node_clusters[shared_addresses["node"].to_numpy()],
+            "address": shared_addresses["address"].to_numpy(),
+        },
+        columns=["cluster_id", "address"],
+    )
+
+    rows = pd.DataFrame(
+        {
+            "cluster_id": node_clusters[company_nodes],
+            "company_id": df["company_id"].to_numpy(),
+            "entity_type": df["entity_type"].astype(str).to_numpy(),
+        }
+    )
+    return clusters, summarize_clusters(node_clusters, rows, shared_addresses)
+
+
+def summarize_clusters(
+    node_clusters: np.ndarray, rows: pd.DataFrame, shared_addresses: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Return the per-cluster stats: size, number of companies, entity types and shared addresses.
+    Only the first MAX_SHARED_ADDRESSES shared addresses of a cluster are listed, so that large
+    clusters keep a bounded stats row; n_shared_addresses counts all of them.
+
+    Parameters:
+    - node_clusters: The cluster id of every node.
+    - rows: The cluster_id, company_id and entity_type of every input row.
+    - shared_addresses: The cluster_id of every address shared by several companies, in input order.
+    """
+    cluster_stats = pd.DataFrame(
+        {
+            "size": np.bincount(node_clusters),
+            "n_companies": rows.groupby("cluster_id")["company_id"].nunique(),
+            "entity_types": rows.groupby("cluster_id")["entity_type"].agg(
+                lambda types: " | ".join(sorted(set(types)))
+            ),
+            "n_shared_addresses": shared_addresses.groupby("cluster_id").size(),
+            "shared_addresses": shared_addresses.groupby("cluster_id")
+            .head(MAX_SHARED_ADDRESSES)
+            .groupby("cluster_id")["address"]
+            .agg(" | ".join),
+        }
+    )
+    return (
+        cluster_stats.fillna({"n_shared_addresses": 0, "shared_addresses": ""})
+        .astype({"n_shared_addresses": "int64"})
+        .rename_axis("cluster_id")
+        .reset_index()
+    )
+
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a table to Parquet if the path ends with .parquet, otherwise to CSV.
+
+    Parameters:
+    - df: The table to write.
+    - path: The output file path.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if Path(path).suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """
+    Read a table written by write_table.
+
+    Parameters:
+    - path: The input file path.
+    """
+    if Path(path).suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_cluster_tables(
+    clusters: pd.DataFrame, cluster_stats: pd.DataFrame, path: str
+) -> str:
+    """
+    Write the company -> cluster table, and the cluster stats next to it with a _stats suffix.
+    Returns the path of the stats table.
+
+    Parameters:
+    - clusters: The company_id -> cluster_id table.
+    - cluster_stats: The per-cluster stats.
+    - path: The path of the company -> cluster table.
+    """
+    stats_path = str(Path(path).with_stem(f"{Path(path).stem}_stats"))
+    write_table(clusters, path)
+    write_table(cluster_stats, stats_path)
+    return stats_path
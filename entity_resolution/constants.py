@@ -0,0 +1,10 @@
+# Defaults shared by the ER modules and the CLI. This module has no dependencies, so that the
+# CLI can show them in its help without importing pandas, NetworkX or pyvis.
+
+DEFAULT_GH_PAGES_PATH = "docs/index.html"
+RENDER_MODES = ("single", "split")
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_MIN_COMPONENT_SIZE = 3
+DEFAULT_ER_STATE_PATH = "tmp/state/er_state.sqlite"
+# The shared addresses listed in the stats of a cluster; n_shared_addresses counts all of them
+MAX_SHARED_ADDRESSES = 10
@@ -1,21 +1,90 @@
 import argparse
+import json
+import shutil
 from pathlib import Path
-import pandas as pd
-import networkx as nx
-from pyvis.network import Network
-from itertools import combinations
 import numpy as np
+import pandas as pd
 import logging
+from typing import Callable, Optional
 
-DEFAULT_GH_PAGES_PATH = "docs/index.html"
+from entity_resolution.blocking import address_blocks
+from entity_resolution.constants import (
+    DEFAULT_GH_PAGES_PATH,
+    DEFAULT_MIN_COMPONENT_SIZE,
+    RENDER_MODES,
+)
+from entity_resolution.clustering import cluster_companies, write_cluster_tables
+from entity_resolution.graph import (
+    SAME_ADDRESS,
+    SIMILAR_ADDRESS,
+    SIMILAR_NAME,
+    EntityGraph,
+    block_pairs,
+)
+from entity_resolution.incremental import DEFAULT_ER_STATE_PATH, IncrementalResolver
+from entity_resolution.metrics import StageMetrics, file_size
+from entity_resolution.preparation import prepare_entities, read_companies
+from entity_resolution.query import build_cluster_index
+from entity_resolution.streaming import DEFAULT_CHUNK_SIZE, stream_clusters
+from entity_resolution.matching import (
+    FuzzyMatcher,
+    address_blocking_keys,
+    name_blocking_keys,
+    normalize_address,
+    normalize_text,
+)
 
 
 class EntityResolutionRunner:
-    def __init__(self, in_file_path: str, out_plot_path: str) -> None:
+    def __init__(
+        self,
+        in_file_path: str,
+        out_plot_path: str,
+        out_cluster_path: Optional[str] = None,
+        fuzzy_threshold: float = 0.0,
+        gh_pages_path: Optional[str] = DEFAULT_GH_PAGES_PATH,
+        streaming: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        render_mode: str = "single",
+        min_component_size: int = DEFAULT_MIN_COMPONENT_SIZE,
+        since: Optional[str] = None,
+        er_state_path: str = DEFAULT_ER_STATE_PATH,
+        workers: int = 1,
+        metrics_path: Optional[str] = None,
+        index_path: Optional[str] = None,
+    ) -> None:
         """
         Initialize the EntityResolutionRunner.
+        In streaming mode the input is clustered in chunks and no plot is generated.
+        The "split" render mode writes an index page plus one page per connected component
+        instead of a single page with the whole graph.
+        With since, the delta from that previous snapshot is applied to the ER state stored at
+        er_state_path, and only the cluster tables and a change report are written.
+        Fuzzy matching blocks are scored by a pool of worker processes if workers > 1.
+        The time and counters of every stage are collected in metrics, and written as JSON to
+        metrics_path if given.
+        If index_path is given, the resolved clusters are indexed there for lookups.
         """
+        if streaming and not out_cluster_path:
+            raise ValueError("Streaming ER needs an output cluster path")
+        if since and not out_cluster_path:
+            raise ValueError("Incremental ER needs an output cluster path")
+        if since and streaming:
+            raise ValueError("Incremental ER cannot run in streaming mode")
+        if index_path and not out_cluster_path:
+            raise ValueError("The cluster index needs an output cluster path")
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Invalid render mode: {render_mode}")
         self.in_file_path, self.out_plot_file_name = in_file_path, out_plot_path
+        self.out_cluster_path = out_cluster_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.gh_pages_path = gh_pages_path
+        self.streaming, self.chunk_size = streaming, chunk_size
+        self.render_mode, self.min_component_size = render_mode, min_component_size
+        self.since, self.er_state_path = since, er_state_path
+        self.workers = workers
+        self.metrics, self.metrics_path = StageMetrics(), metrics_path
+        self.index_path = index_path
         self.out_plot_dir_path = Path(out_plot_path).parent.mkdir(
             parents=True, exist_ok=True
         )
@@ -25,143 +94,311 @@ class EntityResolutionRunner:
         """
         Prepare the data for entity resolution.
         """
-        df = pd.read_csv(
-            self.in_file_path,
-            usecols=[
-                "company_id",
-                "company_name",
-                "owner_name",
-                "registered_agent",
-                "commercial_registered_agent",
-                "principal_address",
-            ],
-        )
-        df["entity_name"] = (
-            df[["commercial_registered_agent", "registered_agent", "owner_name"]]
-            .bfill(axis=1)
-            .iloc[:, 0]
-        )
-        conditions = [
-            df["commercial_registered_agent"].notnull(),
-            df["registered_agent"].notnull()
-            & df["commercial_registered_agent"].isnull(),
-            df["owner_name"].notnull()
-            & df["registered_agent"].isnull()
-            & df["commercial_registered_agent"].isnull(),
-        ]
-        df["entity_type"] = np.select(
-            conditions,
-            ["Commercial Registered Agent", "Registered Agent", "Owner"],
-            default=np.nan,
-        )
-        # Drop rows where entity_name is empty
-        self.df_filtered = df.dropna(subset=["entity_name"], how="all")
-
-    def __format_subgraphs(self, G):
-        # Get connected components (subgraphs) and assign colors
-        components = list(nx.weakly_connected_components(G))
-        colors = [
-            f"#{i:02x}{(i * 3) % 256:02x}{(i * 5) % 256:02x}"
-            for i in range(len(components))
-        ]
+        self.df_filtered = prepare_entities(read_companies(self.in_file_path))
+        self.metrics.count(rows_loaded=len(self.df_filtered))
 
-        # Assign colors to nodes and edges based on connected component
-        for i, component in enumerate(components):
-            for node in component:
-                node_attributes = G.nodes[node]
-                self.net.add_node(
-                    node,
-                    color=colors[i],
-                    label=node_attributes.get("label", ""),
-                    title=node_attributes.get("title", ""),
-                    font={"color": "black", "size": 10},
-                )
-            for edge in G.edges:
-                if edge[0] in component and edge[1] in component:
-                    edge_attributes = G.edges[edge]
-                    color = (
-                        colors[i]
-                        if edge_attributes["relationship"] != "same_address"
-                        else edge_attributes["color"]
-                    )
-                    self.net.add_edge(
-                        edge[0],
-                        edge[1],
-                        color=color,
-                        label=edge_attributes.get("label", ""),
-                    )
-
-    def __create_edge_based_on_address(self, G, company_addresses):
-        # Create edges based on address similarity and different company_name
-        for (node1, address1), (node2, address2) in combinations(company_addresses, 2):
-            if address1 == address2:
-                has_edge1_to_2 = G.has_edge(str(node1), str(node2))
-                has_edge2_to_1 = G.has_edge(str(node2), str(node1))
-
-                if not (has_edge1_to_2 or has_edge2_to_1):
-                    G.add_edge(
-                        str(node1),
-                        str(node2),
-                        relationship="same_address",
-                        label="Same Address",
-                        color="red",
-                    )
+    def __format_subgraphs(self, G: EntityGraph, options: dict) -> dict:
+        from entity_resolution.rendering import component_colors, network_data
+
+        # Get connected components (subgraphs) and assign colors in a single pass
+        node_components = G.components()
+        n_components = int(node_components.max()) + 1 if len(node_components) else 0
+        self.metrics.count(components=n_components)
+        colors = np.array(component_colors(n_components), dtype=object)
+        return network_data(G, colors[node_components].tolist(), options)
+
+    def __create_edge_based_on_address(self, G: EntityGraph) -> EntityGraph:
+        # Create edges between different companies sharing the same address block
+        companies = pd.DataFrame(
+            {
+                "block": address_blocks(self.df_filtered["principal_address"]),
+                "node": G.company_nodes(self.df_filtered["company_id"]),
+            }
+        ).drop_duplicates()
+        nodes1, nodes2 = block_pairs(
+            companies["block"].to_numpy(), companies["node"].to_numpy()
+        )
+        G.add_links(nodes1, nodes2, SAME_ADDRESS)
+        n_blocks = companies["block"].max() + 1 if len(companies) else 0
+        self.logger.info(
+            f"Compared {len(nodes1)} address pairs across {n_blocks} address blocks"
+        )
+        self.metrics.count(address_blocks=n_blocks, address_pairs=len(nodes1))
         return G
 
-    def __generate_graph(self) -> None:
+    def __create_edges_based_on_similarity(self, G: EntityGraph) -> EntityGraph:
+        # Create edges between similar addresses and names that are not linked yet
+        for relationship, nodes, pairs in (
+            (SIMILAR_ADDRESS, G.company_nodes, self.similar_addresses),
+            (SIMILAR_NAME, G.entity_nodes, self.similar_names),
+        ):
+            if pairs:
+                nodes1, nodes2 = zip(*pairs)
+                G.add_links(nodes(nodes1), nodes(nodes2), relationship)
+        return G
+
+    def __match_fuzzy(self) -> None:
         """
-        Generate a directed graph for entity resolution.
+        Find companies with similar addresses and entities with similar names.
         """
-        G = nx.DiGraph()
+        self.similar_addresses, self.similar_names = [], []
+        if not self.fuzzy_threshold:
+            return
+        matcher = FuzzyMatcher(threshold=self.fuzzy_threshold, workers=self.workers)
 
-        # Create a set to store unique addresses for companies
-        company_addresses = set()
+        companies = (
+            self.df_filtered[["company_id", "principal_address"]]
+            .dropna(subset=["principal_address"])
+            .astype(str)
+            .drop_duplicates()
+        )
+        normalized = normalize_address(companies["principal_address"])
+        pairs = matcher.match(normalized.tolist(), address_blocking_keys(normalized))
+        company_ids = companies["company_id"].to_numpy()
+        self.similar_addresses = list(
+            dict.fromkeys(
+                (node1, node2)
+                for node1, node2 in zip(
+                    company_ids[pairs["left"]], company_ids[pairs["right"]]
+                )
+                if node1 != node2
+            )
+        )
 
-        for _, row in self.df_filtered.iterrows():
-            company_name = row["company_name"]
-            company_id = row["company_id"]
-            entity_name = row["entity_name"]
-            entity_type = row["entity_type"]
-            address = row["principal_address"]
+        entity_names = self.df_filtered["entity_name"].astype(str).unique()
+        normalized = normalize_text(pd.Series(entity_names))
+        pairs = matcher.match(normalized.tolist(), name_blocking_keys(normalized))
+        self.similar_names = list(
+            zip(entity_names[pairs["left"]], entity_names[pairs["right"]])
+        )
 
-            if entity_name:
-                G.add_node(
-                    str(entity_name),
-                    title=f"Name: {entity_name} | Relationship: {entity_type}",
-                )
+        self.logger.info(
+            f"Scored {matcher.pairs_compared} fuzzy candidate pairs: "
+            f"{len(self.similar_addresses)} similar addresses, "
+            f"{len(self.similar_names)} similar names, "
+            f"{matcher.blocks_skipped} oversized blocks skipped"
+        )
+        self.metrics.count(
+            candidate_pairs=matcher.pairs_compared,
+            blocks_skipped=matcher.blocks_skipped,
+            similar_addresses=len(self.similar_addresses),
+            similar_names=len(self.similar_names),
+        )
 
-            G.add_node(
-                str(company_name),
-                label=f"Company: {company_name}",
-                title=f"Company ID: {company_id}",
+    def __cluster_entities(self) -> None:
+        """
+        Cluster connected companies and write the company -> cluster table and cluster stats.
+        """
+        clusters, cluster_stats = cluster_companies(
+            self.df_filtered, self.similar_addresses, self.similar_names
+        )
+        self.__write_clusters(clusters, cluster_stats)
+
+    def __stream_clusters(self) -> None:
+        """
+        Cluster the input in chunks and write the company -> cluster table and cluster stats.
+        """
+        clusters, cluster_stats = stream_clusters(
+            self.in_file_path, self.chunk_size, self.fuzzy_threshold, self.workers
+        )
+        self.__write_clusters(clusters, cluster_stats)
+
+    def __apply_delta(self) -> None:
+        """
+        Apply the delta since the previous snapshot to the ER state and write the company -> cluster
+        table, the cluster stats and the change report.
+        """
+        resolver = IncrementalResolver(
+            self.er_state_path, self.fuzzy_threshold, self.workers
+        )
+        try:
+            clusters, cluster_stats, changes = resolver.resolve(
+                self.since, self.in_file_path
             )
+        finally:
+            resolver.store.close()
+        self.__write_clusters(clusters, cluster_stats)
+        out_cluster_path = Path(self.out_cluster_path)
+        changes_path = out_cluster_path.with_name(
+            f"{out_cluster_path.stem}_changes.json"
+        )
+        changes_path.write_text(json.dumps(changes, indent=2))
+        self.metrics.count(
+            added=changes["added"],
+            removed=changes["removed"],
+            changed=changes["changed"],
+            recomputed_companies=changes["recomputed_companies"],
+            bytes_written=file_size(str(changes_path)),
+        )
+        self.logger.info(f"Wrote the cluster change report to {changes_path}")
 
-            G.add_edge(
-                str(entity_name),
-                str(company_name),
-                relationship=f"{entity_type}",
-                label=f"{entity_type}",
+    def __write_clusters(
+        self, clusters: pd.DataFrame, cluster_stats: pd.DataFrame
+    ) -> None:
+        """
+        Write the company -> cluster table, and the cluster stats next to it.
+
+        Parameters:
+        - clusters: The company_id -> cluster_id table.
+        - cluster_stats: The per-cluster stats.
+        """
+        stats_path = write_cluster_tables(
+            clusters, cluster_stats, self.out_cluster_path
+        )
+        self.metrics.count(
+            companies=len(clusters),
+            clusters=len(cluster_stats),
+            bytes_written=file_size(self.out_cluster_path, stats_path),
+        )
+        self.logger.info(
+            f"Resolved {len(clusters)} companies into {len(cluster_stats)} clusters"
+        )
+
+    def __build_index(self) -> None:
+        """
+        Index the resolved clusters by entity name, address and company_id for lookups.
+        """
+        n_companies = build_cluster_index(
+            self.in_file_path, self.out_cluster_path, self.index_path, self.chunk_size
+        )
+        self.metrics.count(
+            companies=n_companies, bytes_written=file_size(self.index_path)
+        )
+        self.logger.info(f"Indexed {n_companies} companies in {self.index_path}")
+
+    def __build_graph(self) -> None:
+        """
+        Build the directed graph of companies and their related entities.
+        """
+        self.G = EntityGraph.from_entities(self.df_filtered)
+        self.metrics.count(
+            nodes=self.G.number_of_nodes(), edges=self.G.number_of_edges()
+        )
+
+    def __add_match_edges(self) -> None:
+        """
+        Link companies sharing an address and pairs found by fuzzy matching.
+        """
+        self.G = self.__create_edge_based_on_address(self.G)
+        self.G = self.__create_edges_based_on_similarity(self.G)
+        self.metrics.count(edges=self.G.number_of_edges())
+
+    def __format_graph(self) -> None:
+        """
+        Collect the graph data of every connected component with the pyvis network options.
+        """
+        from pyvis.network import Network
+
+        net = Network(notebook=False, directed=True, height="1200px", width="100%")
+        net.set_edge_smooth("dynamic")
+        net.toggle_physics(True)
+        net.force_atlas_2based(overlap=1)
+        self.network_data = self.__format_subgraphs(
+            self.G, json.loads(net.options.to_json())
+        )
+
+    def __save_graph(self) -> None:
+        """
+        Write the graph data and page to the plot path once, and copy them for GitHub Pages.
+        """
+        from entity_resolution.rendering import copy_network, write_network
+
+        written = write_network(self.network_data, self.out_plot_file_name)
+        if (
+            self.gh_pages_path
+            and Path(self.gh_pages_path).resolve()
+            != Path(self.out_plot_file_name).resolve()
+        ):
+            written += copy_network(written, self.gh_pages_path)
+        self.metrics.count(
+            bytes_written=file_size(*written),
+            # What a browser downloads from nginx: the page and the compressed data
+            bytes_served=file_size(written[0], written[2]),
+        )
+
+    def __render_components(self) -> None:
+        """
+        Render the index and per-component pages, and copy them for GitHub Pages.
+        """
+        from entity_resolution.rendering import render_components
+
+        written = render_components(
+            self.G, self.out_plot_file_name, self.min_component_size
+        )
+        self.logger.info(f"Rendered {len(written) - 1} component pages")
+        self.metrics.count(pages=len(written) - 1, bytes_written=file_size(*written))
+        index_path = Path(self.out_plot_file_name)
+        if (
+            self.gh_pages_path
+            and Path(self.gh_pages_path).resolve() != index_path.resolve()
+        ):
+            gh_pages_path = Path(self.gh_pages_path)
+            pages_dir = index_path.with_name(f"{index_path.stem}_components")
+            gh_pages_dir = gh_pages_path.with_name(pages_dir.name)
+            # The index links to the component pages by their directory name
+            if gh_pages_dir.resolve() != pages_dir.resolve():
+                shutil.rmtree(gh_pages_dir, ignore_errors=True)
+                shutil.copytree(pages_dir, gh_pages_dir)
+            shutil.copyfile(index_path, gh_pages_path)
+
+    def __timed(self, name: str, stage: Callable[[], None]) -> Callable[[], None]:
+        """
+        Return the stage wrapped to record its time and counters in the metrics.
+        """
+
+        def timed_stage() -> None:
+            with self.metrics.stage(name):
+                stage()
+            stage_metrics = self.metrics.stages[name]
+            counters = ", ".join(
+                f"{counter}={value}"
+                for counter, value in stage_metrics["counters"].items()
+            )
+            self.logger.info(
+                f"Stage {name} took {stage_metrics['seconds']:.2f}s"
+                + (f": {counters}" if counters else "")
             )
 
-            # Only consider addresses for companies
-            if address:
-                company_addresses.add((company_name, address))
+        return timed_stage
 
-        G = self.__create_edge_based_on_address(G, company_addresses)
+    def stages(self) -> list[tuple[str, Callable[[], None]]]:
+        """
+        Return the named stages of the ER pipeline in execution order, each recording its
+        time and counters in the metrics.
+        """
+        return [(name, self.__timed(name, stage)) for name, stage in self.__stages()]
 
-        # Create a pyvis Network from the NetworkX graph
-        self.net = Network(notebook=False, directed=True, height="1200px", width="100%")
-        # self.net.from_nx(G)
-        self.__format_subgraphs(G)
+    def __stages(self) -> list[tuple[str, Callable[[], None]]]:
+        stages = self.__cluster_stages()
+        if self.index_path:
+            stages.append(("build_index", self.__build_index))
+        return stages
 
-        self.net.set_edge_smooth("dynamic")
-        self.net.toggle_physics(True)
-        self.net.force_atlas_2based(overlap=1)
-        self.net.save_graph(self.out_plot_file_name)
-        self.net.save_graph(DEFAULT_GH_PAGES_PATH)  # Save latest copy for GitHub Pages
+    def __cluster_stages(self) -> list[tuple[str, Callable[[], None]]]:
+        if self.since:
+            return [("apply_delta", self.__apply_delta)]
+        if self.streaming:
+            return [("stream_clusters", self.__stream_clusters)]
+        stages = [
+            ("prepare_data", self.__prepare_data),
+            ("fuzzy_matching", self.__match_fuzzy),
+            ("build_graph", self.__build_graph),
+            ("match_edges", self.__add_match_edges),
+        ]
+        if self.render_mode == "split":
+            stages.append(("render_components", self.__render_components))
+        else:
+            stages.append(("format_subgraphs", self.__format_graph))
+            stages.append(("save_html", self.__save_graph))
+        if self.out_cluster_path:
+            stages.append(("cluster_entities", self.__cluster_entities))
+        return stages
 
     def run_er(self) -> None:
         self.logger.info("Running ER pipeline...")
-        self.__prepare_data()
-        self.__generate_graph()
+        for _, stage in self.stages():
+            stage()
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path)
+            self.logger.info(f"Wrote ER metrics to {self.metrics_path}")
         self.logger.info("Done...")
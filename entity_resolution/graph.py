@@ -0,0 +1,363 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Node kinds
+ENTITY, COMPANY = 0, 1
+# Relationship codes of the links found by matching; entity types get the following codes
+SAME_ADDRESS, SIMILAR_ADDRESS, SIMILAR_NAME = 0, 1, 2
+MATCH_RELATIONSHIPS = ("same_address", "similar_address", "similar_name")
+MATCH_LABELS = ("Same Address", "Similar Address", "Similar Name")
+
+
+class EntityGraph:
+    """
+    Compact directed graph of entities and the companies they relate to, over interned integer
+    node ids.
+
+    Entities are keyed by their name and companies by their company_id, so that companies
+    sharing a name stay apart. Entities are numbered first, then companies. The kind, key and
+    name of every node are kept in arrays, and the edges in COO arrays of source, target and
+    relationship code. Labels and titles are only generated when the graph is exported, by
+    to_networkx or the pyvis adapter in entity_resolution.rendering.
+    """
+
+    def __init__(
+        self,
+        entity_keys: np.ndarray,
+        company_keys: np.ndarray,
+        company_names: np.ndarray,
+        entity_relationships: np.ndarray,
+        relationships: list[str],
+    ) -> None:
+        """
+        Initialize an EntityGraph without edges.
+
+        Parameters:
+        - entity_keys: The name of every entity.
+        - company_keys: The company_id of every company.
+        - company_names: The name of every company, aligned with company_keys.
+        - entity_relationships: The relationship code shown in the title of every entity.
+        - relationships: The relationship of every code, starting with MATCH_RELATIONSHIPS.
+        """
+        self.n_entities = len(entity_keys)
+        self.kinds = np.repeat(
+            np.array([ENTITY, COMPANY], dtype=np.int8),
+            [len(entity_keys), len(company_keys)],
+        )
+        self.keys = np.concatenate([entity_keys, company_keys]).astype(object)
+        self.names = np.concatenate([entity_keys, company_names]).astype(object)
+        # The relationship code of every entity, -1 for companies
+        self.node_relationships = np.concatenate(
+            [entity_relationships, np.full(len(company_keys), -1, dtype=np.int16)]
+        )
+        self.relationships = relationships
+        self.entity_index = pd.Index(entity_keys)
+        self.company_index = pd.Index(company_keys)
+        self.sources = np.empty(0, dtype=np.int64)
+        self.targets = np.empty(0, dtype=np.int64)
+        self.edge_relationships = np.empty(0, dtype=np.int16)
+
+    @classmethod
+    def from_entities(cls, df: pd.DataFrame) -> "EntityGraph":
+        """
+        Build the graph of entities and companies with an edge from the entity of every company
+        to the company, coded by the entity type.
+
+        Parameters:
+        - df: The prepared data with company_id, company_name, entity_name and entity_type columns.
+        """
+        entity_codes, entity_keys = pd.factorize(df["entity_name"].astype(str))
+        company_codes, company_keys = pd.factorize(df["company_id"].astype(str))
+        type_codes, entity_types = pd.factorize(df["entity_type"].astype(str))
+        type_codes = (type_codes + len(MATCH_RELATIONSHIPS)).astype(np.int16)
+
+        # Companies listed more than once keep the name of their first row
+        _, first_rows = np.unique(company_codes, return_index=True)
+        company_names = df["company_name"].astype(str).to_numpy()[first_rows]
+        # Entities are titled with the relationship of their last row
+        entity_relationships = np.zeros(len(entity_keys), dtype=np.int16)
+        entity_relationships[entity_codes] = type_codes
+
+        graph = cls(
+            entity_keys.to_numpy(),
+            company_keys.to_numpy(),
+            company_names,
+            entity_relationships,
+            [*MATCH_RELATIONSHIPS, *entity_types],
+        )
+        sources = entity_codes.astype(np.int64)
+        targets = graph.n_entities + company_codes.astype(np.int64)
+        _, first_edges = np.unique(
+            sources * graph.number_of_nodes() + targets, return_index=True
+        )
+        first_edges.sort()
+        graph.sources = sources[first_edges]
+        graph.targets = targets[first_edges]
+        graph.edge_relationships = type_codes[first_edges]
+        return graph
+
+    def number_of_nodes(self) -> int:
+        return len(self.kinds)
+
+    def number_of_edges(self) -> int:
+        return len(self.sources)
+
+    def entity_nodes(self, names) -> np.ndarray:
+        """
+        Return the node ids of entities by name, -1 for unknown names.
+
+        Parameters:
+        - names: The entity names.
+        """
+        return self.entity_index.get_indexer(pd.Index(names).astype(str))
+
+    def company_nodes(self, company_ids) -> np.ndarray:
+        """
+        Return the node ids of companies by company_id, -1 for unknown companies.
+
+        Parameters:
+        - company_ids: The company ids.
+        """
+        nodes = self.company_index.get_indexer(pd.Index(company_ids).astype(str))
+        return np.where(nodes >= 0, nodes + self.n_entities, -1)
+
+    def add_links(self, nodes1, nodes2, relationship: int) -> int:
+        """
+        Add an edge for every pair of linked nodes that are not linked in either direction yet,
+        and return the number of edges added.
+
+        Parameters:
+        - nodes1: The node ids of the first nodes.
+        - nodes2: The node ids of the second nodes, aligned with nodes1.
+        - relationship: The relationship code of the links, e.g. SAME_ADDRESS.
+        """
+        nodes1 = np.asarray(nodes1, dtype=np.int64)
+        nodes2 = np.asarray(nodes2, dtype=np.int64)
+        n_nodes = self.number_of_nodes()
+        pair_keys = np.minimum(nodes1, nodes2) * n_nodes + np.maximum(nodes1, nodes2)
+        linked_keys = np.minimum(self.sources, self.targets) * n_nodes + np.maximum(
+            self.sources, self.targets
+        )
+        new = (
+            (nodes1 != nodes2)
+            & (nodes1 >= 0)
+            & (nodes2 >= 0)
+            & ~np.isin(pair_keys, linked_keys)
+        )
+        # Keep the first of duplicate pairs, in order
+        _, first = np.unique(pair_keys[new], return_index=True)
+        first.sort()
+        new_pairs = np.flatnonzero(new)[first]
+        self.sources = np.concatenate([self.sources, nodes1[new_pairs]])
+        self.targets = np.concatenate([self.targets, nodes2[new_pairs]])
+        self.edge_relationships = np.concatenate(
+            [
+                self.edge_relationships,
+                np.full(len(new_pairs), relationship, dtype=np.int16),
+            ]
+        )
+        return len(new_pairs)
+
+    def degrees(self) -> np.ndarray:
+        """
+        Return the number of edges of every node, in either direction.
+        """
+        n_nodes = self.number_of_nodes()
+        return np.bincount(self.sources, minlength=n_nodes) + np.bincount(
+            self.targets, minlength=n_nodes
+        )
+
+    def components(self) -> np.ndarray:
+        """
+        Return the weakly connected component of every node, numbered by their lowest node id.
+        """
+        return connected_components(self.number_of_nodes(), self.sources, self.targets)
+
+    def adjacency(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the undirected adjacency of the graph in CSR form, as (indptr, indices).
+        """
+        return csr_adjacency(self.number_of_nodes(), self.sources, self.targets)
+
+    def node_labels(self, nodes: np.ndarray) -> list[str]:
+        """
+        Return the label of every given node: the entity name, or the company name.
+
+        Parameters:
+        - nodes: The node ids.
+        """
+        return [
+            f"Company: {name}" if kind == COMPANY else str(name)
+            for kind, name in zip(
+                self.kinds[nodes].tolist(), self.names[nodes].tolist()
+            )
+        ]
+
+    def node_titles(self, nodes: np.ndarray) -> list[str]:
+        """
+        Return the title of every given node: the entity name and relationship, or the company_id.
+
+        Parameters:
+        - nodes: The node ids.
+        """
+        relationships = self.relationships
+        return [
+            f"Company ID: {key}"
+            if code < 0
+            else f"Name: {key} | Relationship: {relationships[code]}"
+            for key, code in zip(
+                self.keys[nodes].tolist(), self.node_relationships[nodes].tolist()
+            )
+        ]
+
+    def edge_labels(self, edges: np.ndarray) -> list[str]:
+        """
+        Return the label of every given edge: the entity type, or the kind of match.
+
+        Parameters:
+        - edges: The edge ids.
+        """
+        labels = [*MATCH_LABELS, *self.relationships[len(MATCH_LABELS) :]]
+        return [labels[code] for code in self.edge_relationships[edges].tolist()]
+
+    def to_networkx(self, nodes: Optional[np.ndarray] = None):
+        """
+        Export the graph, or the subgraph of the given nodes, as a NetworkX DiGraph keyed by node id,
+        with name, label and title node attributes and relationship and label edge attributes.
+
+        Parameters:
+        - nodes: The node ids to export, all by default.
+        """
+        import networkx as nx
+
+        selected = np.zeros(self.number_of_nodes(), dtype=bool)
+        selected[slice(None) if nodes is None else nodes] = True
+        nodes = np.flatnonzero(selected)
+        edges = np.flatnonzero(selected[self.sources] & selected[self.targets])
+        G = nx.DiGraph()
+        G.add_nodes_from(
+            (node, {"name": name, "label": label, "title": title})
+            for node, name, label, title in zip(
+                nodes.tolist(),
+                self.names[nodes].tolist(),
+                self.node_labels(nodes),
+                self.node_titles(nodes),
+            )
+        )
+        G.add_edges_from(
+            (source, target, {"relationship": self.relationships[code], "label": label})
+            for source, target, code, label in zip(
+                self.sources[edges].tolist(),
+                self.targets[edges].tolist(),
+                self.edge_relationships[edges].tolist(),
+                self.edge_labels(edges),
+            )
+        )
+        return G
+
+
+def block_pairs(blocks: np.ndarray, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return every pair of nodes in the same block, as two aligned arrays of node ids.
+    Blocks of the same size are paired at once, as the rows of a matrix.
+
+    Parameters:
+    - blocks: The block code of every node, negative for nodes in no block.
+    - nodes: The node ids, unique within every block.
+    """
+    in_block = blocks >= 0
+    order = np.argsort(blocks[in_block], kind="stable")
+    blocks, nodes = blocks[in_block][order], nodes[in_block][order]
+    starts = (
+        np.flatnonzero(np.r_[True, blocks[1:] != blocks[:-1]]) if len(blocks) else []
+    )
+    sizes = np.diff(np.r_[starts, len(blocks)])
+    pairs1, pairs2 = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for size in np.unique(sizes[sizes > 1]):
+        members = nodes[starts[sizes == size][:, None] + np.arange(size)]
+        left, right = np.triu_indices(size, 1)
+        pairs1.append(members[:, left].ravel())
+        pairs2.append(members[:, right].ravel())
+    return np.concatenate(pairs1), np.concatenate(pairs2)
+
+
+def connected_components(
+    n_nodes: int, sources: np.ndarray, targets: np.ndarray
+) -> np.ndarray:
+    """
+    Return the connected component of every node of the undirected graph of the edges,
+    numbered by their lowest node id.
+
+    The roots of linked components are hooked under the lower root and the forest is flattened
+    by pointer jumping, in whole-array steps, until no edge joins two components.
+
+    Parameters:
+    - n_nodes: The number of nodes.
+    - sources: The source node id of every edge.
+    - targets: The target node id of every edge.
+    """
+    parent = np.arange(n_nodes, dtype=np.int64)
+    while True:
+        roots1, roots2 = parent[sources], parent[targets]
+        unlinked = roots1 != roots2
+        if not unlinked.any():
+            break
+        roots1, roots2 = roots1[unlinked], roots2[unlinked]
+        np.minimum.at(parent, np.maximum(roots1, roots2), np.minimum(roots1, roots2))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    # Every root is the lowest node id of its component
+    _, components = np.unique(parent, return_inverse=True)
+    return components
+
+
+def csr_adjacency(
+    n_nodes: int, sources: np.ndarray, targets: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the undirected adjacency of the edges in CSR form: the neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]], in edge order.
+
+    Parameters:
+    - n_nodes: The number of nodes.
+    - sources: The source node id of every edge.
+    - targets: The target node id of every edge.
+    """
+    rows = np.concatenate([sources, targets])
+    columns = np.concatenate([targets, sources])
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+    return indptr, columns[order]
+
+
+def breadth_first_order(
+    indptr: np.ndarray, indices: np.ndarray, start: int
+) -> np.ndarray:
+    """
+    Return the nodes reachable from start in breadth-first order, expanding a whole level of
+    the CSR adjacency at a time.
+
+    Parameters:
+    - indptr: The CSR index pointers.
+    - indices: The CSR neighbours.
+    - start: The node to start from.
+    """
+    visited = np.zeros(len(indptr) - 1, dtype=bool)
+    visited[start] = True
+    order, frontier = [np.array([start])], np.array([start])
+    while len(frontier):
+        starts, counts = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        neighbours = indices[offsets + np.arange(counts.sum())]
+        neighbours = neighbours[~visited[neighbours]]
+        _, first = np.unique(neighbours, return_index=True)
+        frontier = neighbours[np.sort(first)]
+        visited[frontier] = True
+        order.append(frontier)
+    return np.concatenate(order)
@@ -0,0 +1,838 @@
+import datetime
+import json
+import logging
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution.clustering import (
+    NodeIndex,
+    UnionFind,
+    cluster_companies,
+    summarize_clusters,
+    union_rows,
+)
+from entity_resolution.constants import DEFAULT_ER_STATE_PATH
+from entity_resolution.matching import (
+    FuzzyMatcher,
+    address_blocking_keys,
+    name_blocking_keys,
+    normalize_address,
+    normalize_text,
+)
+from entity_resolution.preparation import prepare_entities, read_companies
+
+# Bumped when the prepared entities or the node keys change, so that states stored by older
+# versions are rebuilt
+STATE_VERSION = 3
+# The columns of a company that its edges and stats depend on
+ROW_COLUMNS = ["entity_name", "entity_type", "principal_address"]
+BLOCK_COLUMNS = ["address_block", "name_block"]
+LINK_COLUMNS = ["kind", "block_key", "node1", "node2"]
+
+
+def to_nullable(values: pd.Series) -> pd.Series:
+    """
+    Return the values as objects with None for missing values.
+
+    Parameters:
+    - values: The values.
+    """
+    values = values.astype(object)
+    return values.where(values.notna(), None)
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """
+    Read the prepared companies of a snapshot, indexed by company_id.
+    Companies listed more than once keep their first row.
+
+    Parameters:
+    - path: The CSV or Parquet snapshot.
+    """
+    df = prepare_entities(read_companies(path))
+    df = df.assign(company_id=df["company_id"].astype(str)).drop_duplicates(
+        "company_id"
+    )
+    return df.set_index("company_id").assign(
+        entity_name=lambda df: df["entity_name"].astype(str),
+        entity_type=lambda df: df["entity_type"].astype(str),
+        principal_address=lambda df: to_nullable(df["principal_address"]),
+    )[ROW_COLUMNS]
+
+
+def add_block_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the fuzzy matching block of every company address and entity name.
+
+    Parameters:
+    - df: The prepared companies.
+    """
+    return df.assign(
+        address_block=to_nullable(
+            address_blocking_keys(normalize_address(df["principal_address"]))
+        ),
+        name_block=to_nullable(name_blocking_keys(normalize_text(df["entity_name"]))),
+    )
+
+
+def match_links(
+    address_rows: pd.DataFrame,
+    name_rows: pd.DataFrame,
+    fuzzy_threshold: float,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """
+    Return the similar address links between companies, by company_id, and the similar name links
+    between entities, by name, with the kind and key of the block they were found in.
+
+    Parameters:
+    - address_rows: The companies whose addresses are matched, indexed by company_id.
+    - name_rows: The companies whose entity names are matched.
+    - fuzzy_threshold: The minimum similarity of a match.
+    - workers: The number of processes scoring fuzzy matching blocks.
+    """
+    matcher = FuzzyMatcher(threshold=fuzzy_threshold, workers=workers)
+
+    addresses = address_rows[["principal_address", "address_block"]].dropna()
+    pairs = matcher.match(
+        normalize_address(addresses["principal_address"]).tolist(),
+        addresses["address_block"].tolist(),
+    )
+    company_ids = addresses.index.to_numpy()
+    address_links = pd.DataFrame(
+        {
+            "kind": "address",
+            "block_key": addresses["address_block"].to_numpy()[pairs["left"]],
+            "node1": company_ids[pairs["left"]],
+            "node2": company_ids[pairs["right"]],
+        },
+        columns=LINK_COLUMNS,
+    )
+
+    names = name_rows[["entity_name", "name_block"]].dropna().drop_duplicates()
+    names = names.drop_duplicates("entity_name")
+    pairs = matcher.match(
+        normalize_text(names["entity_name"]).tolist(), names["name_block"].tolist()
+    )
+    entity_names = names["entity_name"].to_numpy()
+    name_links = pd.DataFrame(
+        {
+            "kind": "name",
+            "block_key": names["name_block"].to_numpy()[pairs["left"]],
+            "node1": entity_names[pairs["left"]],
+            "node2": entity_names[pairs["right"]],
+        },
+        columns=LINK_COLUMNS,
+    )
+    return pd.concat([address_links, name_links], ignore_index=True)
+
+
+def diff_snapshots(
+    old: pd.DataFrame, new: pd.DataFrame
+) -> tuple[pd.Index, pd.Index, pd.Index, pd.DataFrame]:
+    """
+    Diff two snapshots by company_id. Returns the removed, added and changed company_ids, and the
+    companies of the new snapshot with their blocks, kept from the old snapshot for unchanged rows.
+
+    Parameters:
+    - old: The stored companies, with their blocks.
+    - new: The companies of the new snapshot.
+    """
+    removed = old.index.difference(new.index)
+    added = new.index.difference(old.index)
+    common = old.index.intersection(new.index)
+    is_changed = (
+        (
+            old.loc[common, ROW_COLUMNS].fillna("")
+            != new.loc[common, ROW_COLUMNS].fillna("")
+        )
+        .any(axis=1)
+        .to_numpy()
+    )
+    changed = common[is_changed]
+    current = pd.concat(
+        [
+            old.loc[common[~is_changed], ROW_COLUMNS + BLOCK_COLUMNS],
+            add_block_keys(new.loc[added.union(changed)]),
+        ]
+    )
+    return removed, added, changed, current
+
+
+def link_nodes(links: pd.DataFrame, kind: str) -> np.ndarray:
+    """
+    Return the distinct nodes of the links of a kind: company_ids for "address" links, entity
+    names for "name" links.
+
+    Parameters:
+    - links: The fuzzy links.
+    - kind: The kind of links.
+    """
+    return pd.unique(
+        links.loc[links["kind"] == kind, ["node1", "node2"]].to_numpy().ravel()
+    )
+
+
+def link_touches(links: pd.DataFrame, kind: str, keys: pd.Index) -> pd.Series:
+    """
+    Return whether every link is of a kind and has a node among the keys.
+
+    Parameters:
+    - links: The fuzzy links.
+    - kind: The kind of links.
+    - keys: The company_ids or entity names.
+    """
+    return (links["kind"] == kind) & (
+        links["node1"].isin(keys) | links["node2"].isin(keys)
+    )
+
+
+def component_overlaps(members: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return the number of companies of every recomputed component in every old cluster, largest
+    overlaps first.
+
+    Parameters:
+    - members: The component, old cluster_id (null for added companies) and number of companies
+      of every recomputed company and stable cluster reached.
+    """
+    return (
+        members.dropna(subset=["old_id"])
+        .astype({"old_id": "int64"})
+        .groupby(["component", "old_id"])["companies"]
+        .sum()
+        .reset_index()
+        .sort_values(["companies", "old_id"], ascending=[False, True])
+    )
+
+
+def summarize_state(companies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return the per-cluster stats of a resolved state, like cluster_companies does for a full run.
+
+    Parameters:
+    - companies: The prepared companies indexed by company_id, with their cluster_id.
+    """
+    # The nodes are the distinct entities, then the companies, like in cluster_companies
+    node_clusters = pd.concat(
+        [
+            companies.drop_duplicates("entity_name")["cluster_id"],
+            companies["cluster_id"],
+        ]
+    )
+    # summarize_clusters expects dense cluster ids, incremental ones have gaps
+    cluster_index = pd.Index(pd.unique(node_clusters))
+
+    addresses = companies.dropna(subset=["principal_address"])
+    n_companies = addresses.groupby("principal_address", sort=False).size()
+    shared = n_companies.index[n_companies > 1]
+    address_clusters = addresses.drop_duplicates("principal_address").set_index(
+        "principal_address"
+    )["cluster_id"]
+    shared_addresses = pd.DataFrame(
+        {
+            "cluster_id": cluster_index.get_indexer(address_clusters.reindex(shared)),
+            "address": shared,
+        },
+        columns=["cluster_id", "address"],
+    )
+
+    rows = pd.DataFrame(
+        {
+            "cluster_id": cluster_index.get_indexer(companies["cluster_id"]),
+            "company_id": companies.index,
+            "entity_type": companies["entity_type"].astype(str).to_numpy(),
+        }
+    )
+    cluster_stats = summarize_clusters(
+        cluster_index.get_indexer(node_clusters), rows, shared_addresses
+    )
+    cluster_stats["cluster_id"] = cluster_index[cluster_stats["cluster_id"]]
+    return cluster_stats.sort_values("cluster_id", ignore_index=True)
+
+
+class ERStateStore:
+    """
+    Local SQLite store of the ER state of the last resolved snapshot.
+
+    It keeps the prepared row of every company, which holds its entity -> company edge and its
+    address, the blocks of its address and entity name, and its cluster, plus the fuzzy links
+    with the block they were matched in, so that a delta only touches the rows and blocks it changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open (or create) the state store.
+
+        Parameters:
+        - path: The path of the SQLite database file.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.__create_tables()
+
+    def __create_tables(self) -> None:
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS companies (
+                company_id TEXT PRIMARY KEY,
+                entity_name TEXT NOT NULL,
+                entity_type TEXT NOT NULL,
+                principal_address TEXT,
+                address_block TEXT,
+                name_block TEXT,
+                cluster_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS companies_cluster ON companies (cluster_id);
+            CREATE TABLE IF NOT EXISTS links (
+                kind TEXT NOT NULL,
+                block_key TEXT NOT NULL,
+                node1 TEXT NOT NULL,
+                node2 TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS links_block ON links (kind, block_key);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+
+    def meta(self) -> dict:
+        """
+        Return the metadata of the stored state: its version, snapshot, fuzzy threshold and next
+        cluster id.
+        """
+        return {
+            key: json.loads(value)
+            for key, value in self.connection.execute("SELECT key, value FROM meta")
+        }
+
+    def load(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Return the stored companies, indexed by company_id, and fuzzy links.
+        """
+        companies = pd.read_sql(
+            "SELECT * FROM companies", self.connection, index_col="company_id"
+        )
+        links = pd.read_sql(
+            f"SELECT {', '.join(LINK_COLUMNS)} FROM links", self.connection
+        )
+        return companies, links
+
+    def __write(self, companies: pd.DataFrame, links: pd.DataFrame, meta: dict):
+        columns = ["company_id", *ROW_COLUMNS, *BLOCK_COLUMNS, "cluster_id"]
+        rows = companies.reset_index()[columns].astype(object)
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO companies VALUES ({', '.join('?' * len(columns))})",
+            rows.where(rows.notna(), None).itertuples(index=False, name=None),
+        )
+        self.connection.executemany(
+            "INSERT INTO links VALUES (?, ?, ?, ?)",
+            links[LINK_COLUMNS].astype(object).itertuples(index=False, name=None),
+        )
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            ((key, json.dumps(value)) for key, value in meta.items()),
+        )
+
+    def replace(self, companies: pd.DataFrame, links: pd.DataFrame, meta: dict):
+        """
+        Replace the stored state. The tables are recreated, as the state may have been stored
+        by an older version.
+
+        Parameters:
+        - companies: The companies indexed by company_id, with their blocks and cluster_id.
+        - links: The fuzzy links.
+        - meta: The metadata of the state.
+        """
+        for table in ("companies", "links", "meta"):
+            self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+        self.__create_tables()
+        with self.connection:
+            self.__write(companies, links, meta)
+
+    def update(
+        self,
+        removed_ids: pd.Index,
+        companies: pd.DataFrame,
+        relabels: dict[int, int],
+        rematched_blocks: list[tuple[str, str]],
+        links: pd.DataFrame,
+        meta: dict,
+    ) -> None:
+        """
+        Apply a delta to the stored state in one transaction.
+
+        Parameters:
+        - removed_ids: The company_ids of removed companies.
+        - companies: The added or re-clustered companies, with their blocks and cluster_id.
+        - relabels: The new cluster_id of unchanged clusters merged into another one.
+        - rematched_blocks: The (kind, block_key) of the blocks whose links are replaced.
+        - links: The new links of the rematched blocks.
+        - meta: The metadata of the state.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM companies WHERE company_id = ?",
+                ((company_id,) for company_id in removed_ids),
+            )
+            self.connection.executemany(
+                "UPDATE companies SET cluster_id = ? WHERE cluster_id = ?",
+                ((new, old) for old, new in relabels.items()),
+            )
+            self.connection.executemany(
+                "DELETE FROM links WHERE kind = ? AND block_key = ?", rematched_blocks
+            )
+            self.__write(companies, links, meta)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class IncrementalResolver:
+    """
+    Resolve a snapshot by applying its delta against the previous snapshot to the persisted ER state.
+
+    Companies are diffed by company_id. Only the clusters of removed or changed companies, or of
+    companies whose fuzzy links changed, are recomputed, together with the added companies; the
+    other clusters are contracted to single nodes, so they can only be merged, never split. Fuzzy
+    matching is redone for the blocks of the changed rows only. TF-IDF weights are computed over
+    the rematched blocks, so scores close to the threshold can differ from a full run.
+    """
+
+    def __init__(
+        self,
+        state_path: str = DEFAULT_ER_STATE_PATH,
+        fuzzy_threshold: float = 0.0,
+        workers: int = 1,
+    ) -> None:
+        """
+        Initialize the IncrementalResolver.
+
+        Parameters:
+        - state_path: The path of the ER state store.
+        - fuzzy_threshold: The minimum similarity for linking similar addresses and names,
+          0 disables fuzzy matching.
+        - workers: The number of processes scoring fuzzy matching blocks.
+        """
+        self.store = ERStateStore(state_path)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.workers = workers
+        self.logger = logging.getLogger(__name__)
+
+    def __match_links(
+        self, address_rows: pd.DataFrame, name_rows: pd.DataFrame
+    ) -> pd.DataFrame:
+        if not self.fuzzy_threshold:
+            return pd.DataFrame(columns=LINK_COLUMNS)
+        return match_links(address_rows, name_rows, self.fuzzy_threshold, self.workers)
+
+    def __state_meta(self, snapshot_path: str, next_cluster_id: int) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "snapshot": str(Path(snapshot_path).resolve()),
+            "fuzzy_threshold": self.fuzzy_threshold,
+            "next_cluster_id": int(next_cluster_id),
+            "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def __resolve_in_full(self, snapshot_path: str) -> None:
+        """
+        Resolve a snapshot from scratch and store it as the state.
+
+        Parameters:
+        - snapshot_path: The CSV or Parquet snapshot.
+        """
+        companies = add_block_keys(read_snapshot(snapshot_path))
+        links = self.__match_links(companies, companies)
+        is_address_link = (links["kind"] == "address").to_numpy()
+        clusters, _ = cluster_companies(
+            companies.reset_index(),
+            zip(links["node1"][is_address_link], links["node2"][is_address_link]),
+            zip(links["node1"][~is_address_link], links["node2"][~is_address_link]),
+        )
+        companies["cluster_id"] = clusters.set_index("company_id")[
+            "cluster_id"
+        ].reindex(companies.index)
+        self.store.replace(
+            companies,
+            links,
+            self.__state_meta(snapshot_path, companies["cluster_id"].max() + 1),
+        )
+        self.logger.info(
+            f"Stored the ER state of {snapshot_path}: {len(companies)} companies, "
+            f"{len(links)} fuzzy links"
+        )
+
+    def resolve(
+        self, since_path: str, in_file_path: str
+    ) -> tuple[pd.DataFrame, pd.DataFrame, dict]:
+        """
+        Apply the delta between two snapshots to the ER state and return the company_id -> cluster_id
+        table, the per-cluster stats and the change report of the new snapshot.
+
+        The state is first built from the previous snapshot if it was stored for another snapshot,
+        fuzzy threshold or state version.
+
+        Parameters:
+        - since_path: The previous snapshot.
+        - in_file_path: The new snapshot.
+        """
+        meta = self.store.meta()
+        if (
+            meta.get("version") != STATE_VERSION
+            or meta.get("snapshot") != str(Path(since_path).resolve())
+            or meta.get("fuzzy_threshold") != self.fuzzy_threshold
+        ):
+            self.logger.info(f"No ER state for {since_path}, resolving it in full")
+            self.__resolve_in_full(since_path)
+            meta = self.store.meta()
+
+        old, links = self.store.load()
+        new = read_snapshot(in_file_path)
+        companies, changes = self.__apply_delta(
+            old, links, new, in_file_path, meta["next_cluster_id"]
+        )
+        changes = {"since": since_path, "snapshot": in_file_path, **changes}
+        clusters = companies["cluster_id"].rename_axis("company_id").reset_index()
+        return clusters, summarize_state(companies), changes
+
+    def __apply_delta(
+        self,
+        old: pd.DataFrame,
+        links: pd.DataFrame,
+        new: pd.DataFrame,
+        in_file_path: str,
+        next_cluster_id: int,
+    ) -> tuple[pd.DataFrame, dict]:
+        """
+        Recompute the clusters affected by the delta, store the new state and return its
+        companies with their cluster_id and the change report.
+
+        Parameters:
+        - old: The stored companies.
+        - links: The stored fuzzy links.
+        - new: The companies of the new snapshot.
+        - in_file_path: The new snapshot.
+        - next_cluster_id: The first unused cluster id.
+        """
+        removed, added, changed, current = diff_snapshots(old, new)
+        touched = added.union(changed)
+
+        # Rematch the blocks of the old and new rows of every changed company
+        delta_rows = pd.concat([old.loc[removed.union(changed)], current.loc[touched]])
+        rematched_blocks = [
+            ("address", block)
+            for block in delta_rows["address_block"].dropna().unique()
+        ] + [("name", block) for block in delta_rows["name_block"].dropna().unique()]
+        new_links, kept_links, lost_links = self.__rematch(
+            links, current, rematched_blocks
+        )
+
+        # Clusters losing a company, a changed row or a link are recomputed from their companies
+        affected = set(old.loc[removed.union(changed), "cluster_id"]) | set(
+            old.loc[
+                old["entity_name"].isin(link_nodes(lost_links, "name"))
+                | old.index.isin(link_nodes(lost_links, "address")),
+                "cluster_id",
+            ]
+        )
+        in_affected = old["cluster_id"].isin(affected)
+        stable = old[~in_affected]
+        dirty = current.loc[old.index[in_affected].intersection(new.index).union(added)]
+
+        members, stable_clusters, stable_components = self.__recluster(
+            dirty, old["cluster_id"], stable, kept_links, new_links
+        )
+        component_ids, next_cluster_id = self.__assign_cluster_ids(
+            members, next_cluster_id
+        )
+        dirty = dirty.assign(
+            cluster_id=members["component"][: len(dirty)].map(component_ids).to_numpy()
+        )
+        relabels = {
+            int(old_id): int(component_ids[component])
+            for old_id, component in zip(stable_clusters, stable_components)
+            if component_ids[component] != old_id
+        }
+        companies = pd.concat([stable, dirty]).reindex(new.index)
+        if relabels:
+            is_relabeled = companies["cluster_id"].isin(relabels)
+            companies.loc[is_relabeled, "cluster_id"] = companies.loc[
+                is_relabeled, "cluster_id"
+            ].map(relabels)
+        companies = companies.astype({"cluster_id": "int64"})
+
+        self.store.update(
+            removed,
+            dirty,
+            relabels,
+            rematched_blocks,
+            new_links,
+            self.__state_meta(in_file_path, next_cluster_id),
+        )
+
+        changes = {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "recomputed_companies": len(dirty),
+            "recomputed_clusters": len(affected),
+            **self.__change_report(members, component_ids, affected),
+        }
+        self.logger.info(
+            f"Applied {len(added)} added, {len(removed)} removed and {len(changed)} changed "
+            f"companies: recomputed {len(dirty)} companies, {len(changes['merged'])} merged "
+            f"and {len(changes['split'])} split clusters"
+        )
+        return companies, changes
+
+    def __rematch(
+        self,
+        links: pd.DataFrame,
+        current: pd.DataFrame,
+        rematched_blocks: list[tuple[str, str]],
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Redo the fuzzy matching of the rematched blocks and return their new links, the stored
+        links of the other blocks and the stored links that were not found again.
+
+        Parameters:
+        - links: The stored fuzzy links.
+        - current: The companies of the new snapshot, with their blocks.
+        - rematched_blocks: The (kind, block_key) of the blocks to rematch.
+        """
+        address_blocks = {
+            block for kind, block in rematched_blocks if kind == "address"
+        }
+        name_blocks = {block for kind, block in rematched_blocks if kind == "name"}
+        new_links = self.__match_links(
+            current[current["address_block"].isin(address_blocks)],
+            current[current["name_block"].isin(name_blocks)],
+        )
+        in_rematched = (
+            (links["kind"] == "address") & links["block_key"].isin(address_blocks)
+        ) | ((links["kind"] == "name") & links["block_key"].isin(name_blocks))
+        lost_links = links[in_rematched].merge(
+            new_links[["kind", "node1", "node2"]], how="left", indicator=True
+        )
+        return (
+            new_links,
+            links[~in_rematched],
+            lost_links[lost_links["_merge"] == "left_only"],
+        )
+
+    @staticmethod
+    def __recluster(
+        dirty: pd.DataFrame,
+        old_clusters: pd.Series,
+        stable: pd.DataFrame,
+        kept_links: pd.DataFrame,
+        new_links: pd.DataFrame,
+    ) -> tuple[pd.DataFrame, pd.Index, np.ndarray]:
+        """
+        Cluster the recomputed companies with the stable clusters they reach through an entity,
+        an address or a link, each contracted to a single node.
+
+        Returns the members of the components: the component, old cluster_id and number of
+        companies of every recomputed company, in order, then of every stable cluster reached.
+        Also returns the stable clusters reached and their components.
+
+        Parameters:
+        - dirty: The recomputed companies.
+        - old_clusters: The old cluster_id of every stored company.
+        - stable: The stored companies of the clusters that are not recomputed.
+        - kept_links: The stored links of the blocks that were not rematched.
+        - new_links: The links of the rematched blocks.
+        """
+        nodes = NodeIndex(dirty["entity_name"].to_numpy(), dirty.index.to_numpy())
+
+        # Links from a recomputed node, and new links which may join two stable clusters
+        used_links = pd.concat(
+            [
+                kept_links[
+                    link_touches(kept_links, "address", nodes.company_index)
+                    | link_touches(kept_links, "name", nodes.entity_index)
+                ],
+                new_links,
+            ]
+        )
+        stable_entities = (
+            stable.loc[
+                stable["entity_name"].isin(nodes.entity_index)
+                | stable["entity_name"].isin(link_nodes(used_links, "name")),
+                ["entity_name", "cluster_id"],
+            ]
+            .drop_duplicates("entity_name")
+            .set_index("entity_name")["cluster_id"]
+        )
+        stable_companies = stable.loc[
+            stable.index.isin(link_nodes(used_links, "address")), "cluster_id"
+        ]
+        stable_addresses = (
+            stable.loc[
+                stable["principal_address"].isin(dirty["principal_address"].dropna()),
+                ["principal_address", "cluster_id"],
+            ]
+            .drop_duplicates("principal_address")
+            .set_index("principal_address")["cluster_id"]
+        )
+        # Every stable cluster reached is contracted to a single node after the dirty nodes
+        stable_clusters = pd.Index(
+            pd.unique(
+                np.concatenate(
+                    [
+                        stable_entities.to_numpy(),
+                        stable_companies.to_numpy(),
+                        stable_addresses.to_numpy(),
+                    ]
+                )
+            )
+        )
+
+        def node_ids(keys, dirty_nodes, stable_keys: pd.Series) -> np.ndarray:
+            # The recomputed node of every key, or the node of its stable cluster, or -1
+            ids = dirty_nodes(keys)
+            cluster_nodes = stable_clusters.get_indexer(
+                stable_keys.reindex(keys).to_numpy()
+            )
+            return np.where(
+                ids >= 0,
+                ids,
+                np.where(cluster_nodes >= 0, len(nodes) + cluster_nodes, -1),
+            )
+
+        forest = UnionFind(len(nodes) + len(stable_clusters))
+        entity_nodes = nodes.entity_nodes(dirty["entity_name"])
+        company_nodes = nodes.company_nodes(dirty.index)
+        union_rows(
+            forest, entity_nodes, company_nodes, dirty["principal_address"].to_numpy()
+        )
+        # Entities shared with a stable cluster
+        shared_entities = stable_entities[
+            stable_entities.index.isin(nodes.entity_index)
+        ]
+        forest.union_many(
+            nodes.entity_nodes(shared_entities.index),
+            len(nodes) + stable_clusters.get_indexer(shared_entities),
+        )
+        # Companies sharing an address with a stable cluster
+        address_clusters = stable_clusters.get_indexer(
+            dirty["principal_address"].map(stable_addresses).to_numpy()
+        )
+        forest.union_many(
+            company_nodes[address_clusters >= 0],
+            len(nodes) + address_clusters[address_clusters >= 0],
+        )
+        for kind, dirty_nodes, stable_keys in (
+            ("address", nodes.company_nodes, stable_companies),
+            ("name", nodes.entity_nodes, stable_entities),
+        ):
+            kind_links = used_links[used_links["kind"] == kind]
+            nodes1 = node_ids(kind_links["node1"], dirty_nodes, stable_keys)
+            nodes2 = node_ids(kind_links["node2"], dirty_nodes, stable_keys)
+            both = (nodes1 >= 0) & (nodes2 >= 0)
+            forest.union_many(nodes1[both], nodes2[both])
+
+        components = forest.labels()
+        stable_components = components[len(nodes) :]
+        stable_sizes = stable["cluster_id"].value_counts()
+        members = pd.concat(
+            [
+                pd.DataFrame(
+                    {
+                        "component": components[company_nodes],
+                        "old_id": old_clusters.reindex(dirty.index).to_numpy(),
+                        "companies": 1,
+                    }
+                ),
+                pd.DataFrame(
+                    {
+                        "component": stable_components,
+                        "old_id": stable_clusters.to_numpy(),
+                        "companies": stable_sizes.reindex(stable_clusters).to_numpy(),
+                    }
+                ),
+            ],
+            ignore_index=True,
+        )
+        return members, stable_clusters, stable_components
+
+    @staticmethod
+    def __assign_cluster_ids(
+        members: pd.DataFrame, next_cluster_id: int
+    ) -> tuple[dict[int, int], int]:
+        """
+        Number the recomputed components, keeping the id of the old cluster they overlap most.
+        Larger components choose first; a component overlapping no old cluster left gets the next
+        unused id. Returns the cluster_id of every component and the next unused id.
+
+        Parameters:
+        - members: The component, old cluster_id (null for added companies) and number of
+          companies of every recomputed company and stable cluster reached.
+        - next_cluster_id: The first unused cluster id.
+        """
+        component_sizes = members.groupby("component")["companies"].sum()
+        component_old_ids = (
+            component_overlaps(members).groupby("component")["old_id"].agg(list)
+        )
+        component_ids, taken = {}, set()
+        for component in component_sizes.sort_values(
+            ascending=False, kind="stable"
+        ).index:
+            old_ids = component_old_ids.get(component, [])
+            free = [old_id for old_id in old_ids if old_id not in taken]
+            if free:
+                component_ids[component] = free[0]
+            else:
+                component_ids[component] = next_cluster_id
+                next_cluster_id += 1
+            taken.add(component_ids[component])
+        return component_ids, next_cluster_id
+
+    @staticmethod
+    def __change_report(
+        members: pd.DataFrame, component_ids: dict[int, int], affected: set[int]
+    ) -> dict:
+        """
+        Return the merged, split, new and dissolved clusters of the recomputed components.
+
+        Parameters:
+        - members: The component, old cluster_id and number of companies of every recomputed
+          company and stable cluster reached.
+        - component_ids: The cluster_id of every component.
+        - affected: The old clusters that were recomputed.
+        """
+        overlaps = component_overlaps(members)
+        component_old_ids = overlaps.groupby("component")["old_id"].agg(list)
+        merged = [
+            {
+                "cluster_id": int(component_ids[component]),
+                "merged_from": sorted(int(old_id) for old_id in old_ids),
+            }
+            for component, old_ids in component_old_ids.items()
+            if len(old_ids) > 1
+        ]
+        split_into = (
+            overlaps.assign(new_id=overlaps["component"].map(component_ids))
+            .groupby("old_id")["new_id"]
+            .agg(lambda ids: sorted(set(ids)))
+        )
+        return {
+            "merged": sorted(merged, key=lambda change: change["cluster_id"]),
+            "split": [
+                {"cluster_id": int(old_id), "split_into": [int(i) for i in ids]}
+                for old_id, ids in split_into.items()
+                if len(ids) > 1
+            ],
+            "new": sorted(
+                int(cluster_id)
+                for component, cluster_id in component_ids.items()
+                if component not in component_old_ids.index
+            ),
+            "dissolved": sorted(
+                int(old_id) for old_id in affected - set(overlaps["old_id"])
+            ),
+        }
@@ -0,0 +1,304 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution import parallel
+from entity_resolution.normalization import (
+    ADDRESS_ABBREVIATIONS,
+    ADDRESS_ABBREVIATION_PATTERN,
+    PUNCTUATION_PATTERN,
+    WHITESPACE_PATTERN,
+    ZIP_PLUS_FOUR_PATTERN,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """
+    Normalize text by upper-casing, replacing punctuation with spaces and collapsing whitespace.
+
+    Parameters:
+    - values: The raw text values.
+    """
+    return (
+        values.astype("string")
+        .str.upper()
+        .str.replace(PUNCTUATION_PATTERN, " ", regex=True)
+        .str.replace(WHITESPACE_PATTERN, " ", regex=True)
+        .str.strip()
+    )
+
+
+def normalize_address(values: pd.Series) -> pd.Series:
+    """
+    Normalize addresses: drop ZIP+4 extensions, abbreviate street and unit designators and
+    normalize case, punctuation and whitespace.
+
+    Parameters:
+    - values: The raw address values.
+    """
+    values = values.astype("string").str.replace(
+        ZIP_PLUS_FOUR_PATTERN, r"\1", regex=True
+    )
+    return normalize_text(values).str.replace(
+        ADDRESS_ABBREVIATION_PATTERN,
+        lambda match: ADDRESS_ABBREVIATIONS[match.group(1)],
+        regex=True,
+    )
+
+
+def address_blocking_keys(normalized: pd.Series) -> pd.Series:
+    """
+    Return a blocking key of ZIP code and street number for every normalized address.
+    Addresses missing either part get a missing key and are never compared.
+
+    Parameters:
+    - normalized: The normalized addresses.
+    """
+    zip_codes = normalized.str.extract(r"\b(\d{5})$", expand=False)
+    street_numbers = normalized.str.extract(r"^(\d+)\b", expand=False)
+    return zip_codes + " " + street_numbers
+
+
+def name_blocking_keys(normalized: pd.Series, prefix_length: int = 4) -> pd.Series:
+    """
+    Return a blocking key made of the leading characters of every normalized name,
+    ignoring spaces so that e.g. "C T CORPORATION" and "CT CORPORATION" share a block.
+
+    Parameters:
+    - normalized: The normalized names.
+    - prefix_length: The number of leading characters used as key.
+    """
+    keys = normalized.str.replace(" ", "", regex=False).str[:prefix_length]
+    return keys.where(keys.str.len() == prefix_length)
+
+
+def score_batch(
+    batch: slice, row_blocks: np.ndarray, tfidf: tuple, threshold: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score every same-block pair in a contiguous batch of rows and return the
+    pairs above the threshold.
+
+    Parameters:
+    - batch: The rows of the batch.
+    - row_blocks: The block id of every row.
+    - tfidf: The L2-normalized TF-IDF vectors of the rows in CSR form (indptr, indices, data).
+    - threshold: The minimum cosine similarity for a pair to match.
+    """
+    indptr, indices, data = tfidf
+    cells = slice(indptr[batch.start], indptr[batch.stop])
+    rows = np.arange(batch.start, batch.stop)
+    local_columns, _ = pd.factorize(indices[cells])
+    X = np.zeros((len(rows), local_columns.max() + 1), dtype=np.float32)
+    X[
+        np.repeat(rows - batch.start, np.diff(indptr[batch.start : batch.stop + 1])),
+        local_columns,
+    ] = data[cells]
+
+    scores = X @ X.T
+    same_block = row_blocks[batch, None] == row_blocks[None, batch]
+    left, right = np.nonzero(np.triu(same_block, k=1) & (scores >= threshold))
+    return rows[left], rows[right], scores[left, right]
+
+
+def score_shared_batches(
+    batches: list[tuple[int, int]], threshold: float
+) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Score batches of rows in a worker process, reading the TF-IDF vectors and row blocks
+    from shared memory.
+
+    Parameters:
+    - batches: The (start, stop) rows of every batch.
+    - threshold: The minimum cosine similarity for a pair to match.
+    """
+    arrays = parallel.shared_arrays
+    tfidf = (arrays["indptr"], arrays["indices"], arrays["data"])
+    return [
+        score_batch(slice(start, stop), arrays["row_blocks"], tfidf, threshold)
+        for start, stop in batches
+    ]
+
+
+class FuzzyMatcher:
+    """
+    Score candidate pairs inside blocks with character n-gram TF-IDF cosine similarity.
+
+    Small blocks are packed into batches that are scored with a single matrix product,
+    so the cost stays proportional to the number of records as long as blocks are small.
+    Batches never share a block, so they can be scored by a pool of worker processes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        ngram_size: int = 3,
+        batch_size: int = 256,
+        max_block_size: int = 1000,
+        workers: int = 1,
+    ) -> None:
+        """
+        Initialize the FuzzyMatcher.
+
+        Parameters:
+        - threshold: The minimum cosine similarity for a pair to match.
+        - ngram_size: The length of the character n-grams.
+        - batch_size: The number of records scored together in one matrix product.
+        - max_block_size: Blocks larger than this are skipped, as they are not selective.
+        - workers: The number of processes scoring batches, 1 scores them in this process.
+        """
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.batch_size = batch_size
+        self.max_block_size = max_block_size
+        self.workers = workers
+        self.pairs_compared: int = 0
+        self.blocks_skipped: int = 0
+
+    def __ngrams(self, texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the document index and integer code of every character n-gram of the
+        space-padded texts, computed over a fixed-width byte matrix.
+        """
+        padded = (" " + pd.Series(texts, dtype=object).astype(str) + " ").str.encode(
+            "ascii", "replace"
+        )
+        lengths = padded.str.len().to_numpy()
+        width = max(lengths.max(initial=0), self.ngram_size)
+        chars = (
+            np.array(padded.tolist(), dtype=f"S{width}")
+            .view(np.uint8)
+            .reshape(len(padded), width)
+        )
+
+        positions = width - self.ngram_size + 1
+        codes = np.zeros((len(padded), positions), dtype=np.int64)
+        for offset in range(self.ngram_size):
+            codes = (codes << 8) | chars[:, offset : offset + positions]
+        valid = np.arange(positions) < (lengths - self.ngram_size + 1)[:, None]
+        return np.nonzero(valid)[0], codes[valid]
+
+    def __tfidf(self, texts: Sequence[str]):
+        """
+        Build L2-normalized TF-IDF vectors in CSR form (indptr, indices, data).
+        """
+        doc_ids, codes = self.__ngrams(texts)
+        gram_ids, vocabulary = pd.factorize(codes)
+
+        # Unique (doc, gram) cells sorted by doc, with their term frequencies
+        cells, counts = np.unique(
+            doc_ids.astype(np.int64) * len(vocabulary) + gram_ids, return_counts=True
+        )
+        cell_docs, cell_grams = np.divmod(cells, len(vocabulary))
+
+        document_frequency = np.bincount(cell_grams, minlength=len(vocabulary))
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        data = counts * idf[cell_grams]
+        indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(cell_docs, minlength=len(texts)))]
+        )
+        norms = np.sqrt(np.bincount(cell_docs, weights=data**2, minlength=len(texts)))
+        data = data / norms[cell_docs]
+        return indptr, cell_grams, data.astype(np.float32)
+
+    def __score_in_parallel(
+        self, batches: list[tuple[int, int]], row_blocks: np.ndarray, tfidf: tuple
+    ) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Score the batches in a pool of worker processes mapping the TF-IDF vectors and row
+        blocks from shared memory.
+        """
+        indptr, indices, data = tfidf
+        # A few tasks per worker balance uneven batches without per-batch task overhead
+        tasks = [
+            [batches[i] for i in task]
+            for task in np.array_split(
+                np.arange(len(batches)), min(len(batches), self.workers * 4)
+            )
+        ]
+        with parallel.SharedArrays(
+            {
+                "indptr": indptr,
+                "indices": indices,
+                "data": data,
+                "row_blocks": row_blocks,
+            }
+        ) as shared, ProcessPoolExecutor(
+            self.workers,
+            initializer=parallel.attach_shared_arrays,
+            initargs=(shared.specs,),
+        ) as executor:
+            return [
+                result
+                for results in executor.map(
+                    score_shared_batches, tasks, repeat(self.threshold)
+                )
+                for result in results
+            ]
+
+    def match(self, texts: Sequence[str], block_keys: Sequence) -> pd.DataFrame:
+        """
+        Return the pairs of texts sharing a block key whose similarity reaches the threshold,
+        as a frame of left/right positions into texts and their score.
+
+        Parameters:
+        - texts: The normalized texts to match.
+        - block_keys: The blocking key of every text; missing keys are never compared.
+        """
+        matches = pd.DataFrame(
+            {
+                "left": np.empty(0, dtype=np.int64),
+                "right": np.empty(0, dtype=np.int64),
+                "score": np.empty(0, dtype=np.float32),
+            }
+        )
+        block_ids, _ = pd.factorize(pd.Series(block_keys, dtype=object))
+        block_sizes = np.bincount(block_ids[block_ids >= 0], minlength=1)
+        keep = (block_ids >= 0) & (block_sizes[np.maximum(block_ids, 0)] > 1)
+        oversized = block_sizes > self.max_block_size
+        if oversized.any():
+            logger.warning(
+                f"Skipped {int(oversized.sum())} blocks of more than {self.max_block_size} "
+                f"records ({int(block_sizes[oversized].sum())} records), their pairs are not scored"
+            )
+        self.blocks_skipped += int(oversized.sum())
+        keep &= ~oversized[np.maximum(block_ids, 0)]
+        if not keep.any():
+            return matches
+
+        # Order candidate rows by block so that whole blocks are contiguous and can be
+        # packed into batches; only candidate rows are vectorized
+        rows = np.flatnonzero(keep)
+        rows = rows[np.argsort(block_ids[rows], kind="stable")]
+        row_blocks = block_ids[rows]
+        texts = list(texts)
+        tfidf = self.__tfidf([texts[row] for row in rows])
+        boundaries = np.flatnonzero(np.diff(row_blocks)) + 1
+        block_starts = np.concatenate([[0], boundaries])
+        block_ends = np.concatenate([boundaries, [len(rows)]])
+        sizes = block_ends - block_starts
+        self.pairs_compared += int((sizes * (sizes - 1) // 2).sum())
+
+        batches = []
+        batch_start = 0
+        for block_end in block_ends:
+            if block_end - batch_start >= self.batch_size or block_end == len(rows):
+                batches.append((int(batch_start), int(block_end)))
+                batch_start = block_end
+
+        if self.workers > 1 and len(batches) > 1:
+            results = self.__score_in_parallel(batches, row_blocks, tfidf)
+        else:
+            results = [
+                score_batch(slice(start, stop), row_blocks, tfidf, self.threshold)
+                for start, stop in batches
+            ]
+
+        left, right, scores = (np.concatenate(parts) for parts in zip(*results))
+        return pd.DataFrame({"left": rows[left], "right": rows[right], "score": scores})
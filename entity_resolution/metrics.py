@@ -0,0 +1,104 @@
+import datetime
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Return the peak resident set size of this process in MB, if the platform reports it.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(max_rss / (1024**2 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageMetrics:
+    """
+    Wall time, peak memory and counters of every stage of a pipeline run.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize empty StageMetrics.
+        """
+        self.started_at = datetime.datetime.now()
+        self.stages: dict[str, dict] = {}
+        self.current: Optional[dict] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a stage; counters recorded meanwhile are attributed to it.
+
+        Parameters:
+        - name: The name of the stage.
+        """
+        self.current = self.stages.setdefault(name, {"seconds": 0.0, "counters": {}})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current["seconds"] = round(
+                self.current["seconds"] + time.perf_counter() - start, 4
+            )
+            self.current["peak_rss_mb"] = peak_rss_mb()
+            self.current = None
+
+    def count(self, **counters: int) -> None:
+        """
+        Add to the counters of the current stage, e.g. rows loaded or bytes written.
+
+        Parameters:
+        - counters: The increments by counter name.
+        """
+        if self.current is None:
+            return
+        stage_counters = self.current["counters"]
+        for name, value in counters.items():
+            stage_counters[name] = stage_counters.get(name, 0) + int(value)
+
+    def to_dict(self) -> dict:
+        """
+        Return the metrics of the run as a JSON-serializable dict.
+        """
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": round(
+                sum(stage["seconds"] for stage in self.stages.values()), 4
+            ),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def write(self, path: str) -> None:
+        """
+        Write the metrics of the run to a JSON file.
+
+        Parameters:
+        - path: The output file path.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+
+def file_size(*paths: Optional[str]) -> int:
+    """
+    Return the total size in bytes of the existing files among paths.
+
+    Parameters:
+    - paths: The file paths.
+    """
+    return sum(
+        Path(path).stat().st_size for path in paths if path and Path(path).is_file()
+    )
@@ -0,0 +1,158 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+ADDRESS_ABBREVIATIONS = {
+    "STREET": "ST",
+    "AVENUE": "AVE",
+    "ROAD": "RD",
+    "DRIVE": "DR",
+    "BOULEVARD": "BLVD",
+    "PARKWAY": "PKWY",
+    "HIGHWAY": "HWY",
+    "LANE": "LN",
+    "COURT": "CT",
+    "PLACE": "PL",
+    "SUITE": "STE",
+    "APARTMENT": "APT",
+    "FLOOR": "FL",
+    "NORTH": "N",
+    "SOUTH": "S",
+    "EAST": "E",
+    "WEST": "W",
+}
+ADDRESS_ABBREVIATION_PATTERN = re.compile(
+    r"\b(" + "|".join(ADDRESS_ABBREVIATIONS) + r")\b"
+)
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+ZIP_PLUS_FOUR_PATTERN = re.compile(r"\b(\d{5})-\d{4}\s*$")
+LEGAL_SUFFIXES = {
+    "LIMITED LIABILITY COMPANY": "LLC",
+    "L L C": "LLC",
+    "LLC": "LLC",
+    "INCORPORATED": "INC",
+    "INC": "INC",
+    "CORPORATION": "CORP",
+    "CORP": "CORP",
+    "LIMITED": "LTD",
+    "LTD": "LTD",
+}
+LEGAL_SUFFIX_PATTERN = re.compile(r"\b(" + "|".join(LEGAL_SUFFIXES) + r")$")
+STREET_SUFFIXES = (
+    "STREET|ST|AVENUE|AVE|ROAD|RD|DRIVE|DR|BOULEVARD|BLVD|PARKWAY|PKWY|HIGHWAY|HWY|LANE|LN|"
+    "COURT|CT|PLACE|PL|WAY|CIRCLE|CIR|TERRACE|TER|TRAIL|TRL|LOOP|SQUARE|SQ|PLAZA|PLZ|ALLEY|"
+    "CENTER|CTR|EXPRESSWAY|EXPY|FREEWAY|FWY|ROUTE|RTE|PIKE|TURNPIKE|ROW|RUN|PATH|WALK|CROSSING|XING"
+)
+DIRECTIONS = (
+    "N|S|E|W|NE|NW|SE|SW|NORTH|SOUTH|EAST|WEST|NORTHEAST|NORTHWEST|SOUTHEAST|SOUTHWEST"
+)
+# An agent blob is a name followed by an address that ends with the state and ZIP code
+AGENT_ADDRESS_END_PATTERN = re.compile(
+    r",?\s*[A-Z]{2}\s+\d{5}(?:-\d{4})?\s*$", re.IGNORECASE
+)
+# The address starts at a street number (a number not followed by another number, which is
+# still part of the name) or a PO box
+AGENT_ADDRESS_START_PATTERN = re.compile(
+    r"(?<=\s)(?:\d+\s+(?!\d+\b)|P\.?\s*O\.?\s*BOX\b)", re.IGNORECASE
+)
+# A plausible street start: a PO box, or a number followed by a few words or ordinals up to a
+# street suffix or a direction (e.g. "120 W SWEET AVE", "12 MAIN ST", "1461 BROADWAY N")
+STREET_START_PATTERN = re.compile(
+    r"P\.?\s*O\.?\s*BOX\b"
+    r"|\d+\s+(?:(?:\d+(?:ST|ND|RD|TH)|[A-Z][A-Z'&.-]*)\s+){0,4}?"
+    rf"(?:{STREET_SUFFIXES}|{DIRECTIONS})\b",
+    re.IGNORECASE,
+)
+# A number after a unit designator is a suite or unit number, not a street number
+UNIT_PATTERN = re.compile(
+    r"\b(?:STE|SUITE|APT|UNIT|FL|FLOOR|RM|ROOM|BLDG)\W*$|#\s*$", re.IGNORECASE
+)
+AGENT_CACHE_SIZE = 2**16
+
+
+def normalize_text_value(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a single text like matching.normalize_text, without pandas.
+
+    Parameters:
+    - value: The raw text.
+    """
+    if value is None:
+        return None
+    value = PUNCTUATION_PATTERN.sub(" ", str(value).upper())
+    return WHITESPACE_PATTERN.sub(" ", value).strip()
+
+
+def normalize_address_value(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a single address like matching.normalize_address, without pandas.
+
+    Parameters:
+    - value: The raw address.
+    """
+    if value is None:
+        return None
+    value = normalize_text_value(ZIP_PLUS_FOUR_PATTERN.sub(r"\1", str(value)))
+    return ADDRESS_ABBREVIATION_PATTERN.sub(
+        lambda match: ADDRESS_ABBREVIATIONS[match.group(1)], value
+    )
+
+
+def normalize_entity_name_value(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a single entity or company name like normalize_text_value, with its legal suffix
+    canonicalized (e.g. "Acme Corporation" and "ACME CORP." both become "ACME CORP").
+
+    Parameters:
+    - value: The raw name.
+    """
+    value = normalize_text_value(value)
+    if value is None:
+        return None
+    return LEGAL_SUFFIX_PATTERN.sub(lambda match: LEGAL_SUFFIXES[match.group(1)], value)
+
+
+@lru_cache(maxsize=AGENT_CACHE_SIZE)
+def parse_agent(value: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    Split an agent blob into its normalized name and its address, or None if it has no address.
+    Results are memoized, as a few commercial agents account for a large share of companies.
+
+    The address starts at the first street number or PO box that looks like a street start;
+    if none does, at the last one, so that numbers in a name do not cut it short:
+
+    >>> parse_agent("C T CORPORATION SYSTEM 120 W SWEET AVE BISMARCK, ND  58504")
+    ('C T CORPORATION SYSTEM', '120 W SWEET AVE BISMARCK, ND  58504')
+    >>> parse_agent("A 1 AUTO LLC 12 MAIN ST FARGO ND 58102")
+    ('A 1 AUTO LLC', '12 MAIN ST FARGO ND 58102')
+    >>> parse_agent("7 11 STORES INC 5 1ST AVE N FARGO, ND 58102")
+    ('7 11 STORES INC', '5 1ST AVE N FARGO, ND 58102')
+    >>> parse_agent("ROUTE 2 LOGISTICS LLC PO BOX 44 MINOT, ND 58702")
+    ('ROUTE 2 LOGISTICS LLC', 'PO BOX 44 MINOT, ND 58702')
+    >>> parse_agent("BRYCE ANDERSON PLLC 1461 BROADWAY N STE 103 FARGO, ND  58102")
+    ('BRYCE ANDERSON PLLC', '1461 BROADWAY N STE 103 FARGO, ND  58102')
+    >>> parse_agent("A 1 AUTO LLC 500 FOO BISMARCK ND 58501")
+    ('A 1 AUTO LLC', '500 FOO BISMARCK ND 58501')
+    >>> parse_agent("JOHN SMITH")
+    ('JOHN SMITH', None)
+
+    Parameters:
+    - value: The raw agent blob.
+    """
+    name, address = value, None
+    end = AGENT_ADDRESS_END_PATTERN.search(value)
+    if end:
+        starts = [
+            match.start()
+            for match in AGENT_ADDRESS_START_PATTERN.finditer(value, 0, end.start())
+            if value[: match.start()].strip()
+            and not UNIT_PATTERN.search(value, 0, match.start())
+        ]
+        start = next(
+            (start for start in starts if STREET_START_PATTERN.match(value, start)),
+            starts[-1] if starts else None,
+        )
+        if start is not None:
+            name, address = value[:start].rstrip(), value[start:].rstrip()
+    return normalize_entity_name_value(name) or None, address
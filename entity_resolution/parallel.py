@@ -0,0 +1,57 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# The arrays shared with a worker process, attached once by its initializer
+shared_arrays: dict[str, np.ndarray] = {}
+attached_blocks: list[shared_memory.SharedMemory] = []
+
+
+class SharedArrays:
+    """
+    NumPy arrays copied once into shared memory, so that worker processes map them instead of
+    receiving pickled copies with every task.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        """
+        Copy the arrays into new shared memory blocks.
+
+        Parameters:
+        - arrays: The arrays to share, by name.
+        """
+        self.blocks: list[shared_memory.SharedMemory] = []
+        self.specs: dict[str, tuple[str, tuple, str]] = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release and remove the shared memory blocks.
+        """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_shared_arrays(specs: dict[str, tuple[str, tuple, str]]) -> None:
+    """
+    Map the shared arrays into this worker process; used as the initializer of a process pool.
+
+    Parameters:
+    - specs: The shared memory block name, shape and dtype of every array, by name.
+    """
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        attached_blocks.append(block)
+        shared_arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
@@ -0,0 +1,125 @@
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution.normalization import normalize_entity_name_value, parse_agent
+
+ER_COLUMNS = [
+    "company_id",
+    "company_name",
+    "owner_name",
+    "registered_agent",
+    "commercial_registered_agent",
+    "principal_address",
+]
+
+
+def read_companies(path: str) -> pd.DataFrame:
+    """
+    Read the ER_COLUMNS of a crawled dataset, from Parquet if the path ends with .parquet,
+    otherwise from CSV.
+
+    Parameters:
+    - path: The dataset path.
+    """
+    if Path(path).suffix == ".parquet":
+        return pd.read_parquet(path, columns=ER_COLUMNS)
+    return pd.read_csv(path, usecols=ER_COLUMNS)
+
+
+def iter_companies(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Yield the ER_COLUMNS of a crawled dataset in chunks, from Parquet if the path ends
+    with .parquet, otherwise from CSV.
+
+    Parameters:
+    - path: The dataset path.
+    - chunk_size: The number of rows per chunk.
+    """
+    if Path(path).suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=chunk_size, columns=ER_COLUMNS
+        ):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=ER_COLUMNS, chunksize=chunk_size)
+
+
+def map_distinct(values: pd.Series, function, n_results: int = 1) -> list[pd.Series]:
+    """
+    Apply a function to every distinct non-null value of a column and broadcast its results back
+    to the rows, so that the cost depends on the number of distinct values, not of rows.
+
+    Parameters:
+    - values: The column.
+    - function: The function of a value, returning a tuple of n_results results.
+    - n_results: The number of results of the function.
+    """
+    codes, distinct_values = pd.factorize(values)
+    # Null values have code -1, which takes the trailing row of None results
+    results = np.array(
+        [function(value) for value in distinct_values] + [(None,) * n_results],
+        dtype=object,
+    ).reshape(-1, n_results)
+    return [
+        pd.Series(results[codes, i], index=values.index, dtype=object)
+        for i in range(n_results)
+    ]
+
+
+def parse_entities(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Split the agent or owner blobs of a column into normalized names, with canonical case,
+    whitespace and legal suffixes, and addresses (null when a blob has none).
+
+    Parameters:
+    - values: The raw entity blobs.
+    """
+    names, addresses = map_distinct(values, parse_agent, n_results=2)
+    return names, addresses
+
+
+def normalize_entity_names(values: pd.Series) -> pd.Series:
+    """
+    Normalize the entity or company names of a column like normalize_entity_name_value.
+
+    Parameters:
+    - values: The raw names.
+    """
+    (names,) = map_distinct(values, lambda value: (normalize_entity_name_value(value),))
+    return names
+
+
+def prepare_entities(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the entity_name, entity_address and entity_type of every company and drop companies
+    without an entity. The commercial registered agent takes precedence over the registered
+    agent, then the owner. Entity names are split from the address of the agent and normalized,
+    so that an agent keeps a single node when its address changes.
+
+    Parameters:
+    - df: The crawled data with at least the ER_COLUMNS.
+    """
+    df["entity_name"], df["entity_address"] = parse_entities(
+        df[["commercial_registered_agent", "registered_agent", "owner_name"]]
+        .bfill(axis=1)
+        .iloc[:, 0]
+    )
+    conditions = [
+        df["commercial_registered_agent"].notnull(),
+        df["registered_agent"].notnull() & df["commercial_registered_agent"].isnull(),
+        df["owner_name"].notnull()
+        & df["registered_agent"].isnull()
+        & df["commercial_registered_agent"].isnull(),
+    ]
+    df["entity_type"] = np.select(
+        conditions,
+        ["Commercial Registered Agent", "Registered Agent", "Owner"],
+        default=np.nan,
+    )
+    # Drop rows where entity_name is empty
+    return df.dropna(subset=["entity_name"], how="all")
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from entity_resolution.normalization import (
+    normalize_address_value,
+    normalize_entity_name_value,
+)
+
+DEFAULT_CLUSTER_INDEX_PATH = "tmp/clusters/cluster_index.sqlite"
+DEFAULT_LOOKUP_LIMIT = 100
+INDEX_CHUNK_SIZE = 100_000
+COMPANY_COLUMNS = (
+    "company_id",
+    "company_name",
+    "entity_name",
+    "entity_address",
+    "entity_type",
+    "principal_address",
+    "cluster_id",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_cluster_index(
+    in_file_path: str,
+    cluster_path: str,
+    index_path: str = DEFAULT_CLUSTER_INDEX_PATH,
+    chunk_size: int = INDEX_CHUNK_SIZE,
+) -> int:
+    """
+    Build the SQLite cluster index of an ER run from its input dataset and cluster tables, with
+    indexes on the normalized entity name, company name and address and on company_id, and return
+    the number of companies indexed. The previous index is replaced atomically.
+
+    Parameters:
+    - in_file_path: The CSV or Parquet dataset the clusters were resolved from.
+    - cluster_path: The company_id -> cluster_id table; the stats are read next to it.
+    - index_path: The path of the index.
+    - chunk_size: The number of input rows indexed at a time.
+    """
+    # pandas is only needed to build the index, not to query it
+    from entity_resolution.clustering import read_table
+    from entity_resolution.matching import normalize_address
+    from entity_resolution.preparation import (
+        iter_companies,
+        normalize_entity_names,
+        prepare_entities,
+    )
+
+    clusters = read_table(cluster_path)
+    company_clusters = clusters.set_index(clusters["company_id"].astype(str))[
+        "cluster_id"
+    ]
+    cluster_path = Path(cluster_path)
+    cluster_stats = read_table(
+        str(cluster_path.with_stem(f"{cluster_path.stem}_stats"))
+    )
+
+    Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    connection.executescript(
+        """
+        CREATE TABLE companies (
+            company_id TEXT PRIMARY KEY,
+            company_name TEXT,
+            entity_name TEXT,
+            entity_address TEXT,
+            entity_type TEXT,
+            principal_address TEXT,
+            cluster_id INTEGER NOT NULL,
+            name_key TEXT,
+            company_key TEXT,
+            address_key TEXT
+        );
+        CREATE TABLE clusters (
+            cluster_id INTEGER PRIMARY KEY,
+            size INTEGER,
+            n_companies INTEGER,
+            entity_types TEXT,
+            n_shared_addresses INTEGER,
+            shared_addresses TEXT
+        );
+        """
+    )
+    for chunk in iter_companies(in_file_path, chunk_size):
+        df = prepare_entities(chunk)
+        rows = df[list(COMPANY_COLUMNS[:-1])].assign(
+            company_id=df["company_id"].astype(str),
+            cluster_id=df["company_id"]
+            .astype(str)
+            .map(company_clusters)
+            .astype("Int64"),
+            # Entity names are normalized by prepare_entities already
+            name_key=df["entity_name"],
+            company_key=normalize_entity_names(df["company_name"]),
+            address_key=normalize_address(df["principal_address"]),
+        )
+        rows = rows[rows["cluster_id"].notna()].astype(object)
+        # Companies listed more than once keep their first row, like the cluster table
+        connection.executemany(
+            "INSERT OR IGNORE INTO companies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows.where(rows.notna(), None).itertuples(index=False, name=None),
+        )
+    stats = cluster_stats.astype(object)
+    connection.executemany(
+        "INSERT INTO clusters VALUES (?, ?, ?, ?, ?, ?)",
+        stats.where(stats.notna(), None).itertuples(index=False, name=None),
+    )
+    # Indexing after the bulk insert is faster than maintaining the indexes row by row
+    connection.executescript(
+        """
+        CREATE INDEX companies_name_key ON companies (name_key);
+        CREATE INDEX companies_company_key ON companies (company_key);
+        CREATE INDEX companies_address_key ON companies (address_key);
+        CREATE INDEX companies_cluster_id ON companies (cluster_id, company_id);
+        """
+    )
+    n_companies = connection.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+    connection.commit()
+    connection.close()
+    os.replace(tmp_path, index_path)
+    return n_companies
+
+
+class ClusterIndex:
+    """
+    Read-only lookups in a cluster index built by build_cluster_index: the companies and clusters of
+    an entity or company name, an address, a company_id or a cluster_id.
+
+    Only sqlite3 is used, so lookups take milliseconds without loading pandas or the graph.
+    """
+
+    def __init__(self, path: str = DEFAULT_CLUSTER_INDEX_PATH) -> None:
+        """
+        Open the cluster index.
+
+        Parameters:
+        - path: The path of the index.
+        """
+        if not Path(path).is_file():
+            raise FileNotFoundError(f"No cluster index at {path}, run run_er first")
+        # The HTTP server reads from several threads, so access is serialized with a lock
+        self.connection = sqlite3.connect(
+            f"{Path(path).resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+
+    def __query(self, sql: str, parameters: tuple) -> list[dict]:
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, parameters)]
+
+    def __companies(self, where: str, parameters: tuple, limit: int) -> list[dict]:
+        return self.__query(
+            f"SELECT {', '.join(COMPANY_COLUMNS)} FROM companies WHERE {where} "
+            "ORDER BY cluster_id, company_id LIMIT ?",
+            (*parameters, limit),
+        )
+
+    def __clusters_of(self, companies: list[dict]) -> list[dict]:
+        """
+        Group companies by cluster, with the stats of every cluster.
+        """
+        cluster_ids = list(
+            dict.fromkeys(company["cluster_id"] for company in companies)
+        )
+        stats = {
+            cluster["cluster_id"]: cluster
+            for cluster in self.__query(
+                "SELECT * FROM clusters WHERE cluster_id IN "
+                f"({', '.join('?' * len(cluster_ids))})",
+                tuple(cluster_ids),
+            )
+        }
+        return [
+            {
+                **stats.get(cluster_id, {"cluster_id": cluster_id}),
+                "companies": [
+                    company
+                    for company in companies
+                    if company["cluster_id"] == cluster_id
+                ],
+            }
+            for cluster_id in cluster_ids
+        ]
+
+    def by_name(self, name: str, limit: int = DEFAULT_LOOKUP_LIMIT) -> dict:
+        """
+        Return the clusters of the companies whose entity (owner or registered agent) or own
+        name normalizes to the same key as name, with canonical legal suffixes.
+
+        Parameters:
+        - name: The entity or company name.
+        - limit: The maximum number of companies returned.
+        """
+        key = normalize_entity_name_value(name)
+        companies = self.__companies(
+            "name_key = ? OR company_key = ?", (key, key), limit
+        )
+        return {"name": name, "key": key, "clusters": self.__clusters_of(companies)}
+
+    def by_address(self, address: str, limit: int = DEFAULT_LOOKUP_LIMIT) -> dict:
+        """
+        Return the clusters of the companies whose address normalizes to the same key as address.
+
+        Parameters:
+        - address: The address.
+        - limit: The maximum number of companies returned.
+        """
+        key = normalize_address_value(address)
+        companies = self.__companies("address_key = ?", (key,), limit)
+        return {
+            "address": address,
+            "key": key,
+            "clusters": self.__clusters_of(companies),
+        }
+
+    def company(self, company_id: str) -> Optional[dict]:
+        """
+        Return a company with the stats of its cluster, or None if it is not indexed.
+
+        Parameters:
+        - company_id: The id of the company.
+        """
+        companies = self.__companies("company_id = ?", (str(company_id),), 1)
+        if not companies:
+            return None
+        cluster = self.cluster(companies[0]["cluster_id"], limit=0)
+        return {**companies[0], "cluster": cluster}
+
+    def cluster(
+        self, cluster_id: int, limit: int = DEFAULT_LOOKUP_LIMIT
+    ) -> Optional[dict]:
+        """
+        Return the stats and companies of a cluster, or None if it does not exist.
+
+        Parameters:
+        - cluster_id: The id of the cluster.
+        - limit: The maximum number of companies returned.
+        """
+        stats = self.__query(
+            "SELECT * FROM clusters WHERE cluster_id = ?", (int(cluster_id),)
+        )
+        if not stats:
+            return None
+        companies = self.__companies("cluster_id = ?", (int(cluster_id),), limit)
+        return {**stats[0], "companies": companies} if limit else stats[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class ClusterIndexServer(ThreadingHTTPServer):
+    """
+    Local HTTP endpoint answering cluster index lookups with JSON:
+    GET /name?q=..., /address?q=..., /company/<company_id> and /cluster/<cluster_id>,
+    with an optional limit parameter.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], index: ClusterIndex) -> None:
+        """
+        Initialize the ClusterIndexServer.
+
+        Parameters:
+        - address: The (host, port) to listen on.
+        - index: The cluster index to query.
+        """
+        super().__init__(address, ClusterIndexRequestHandler)
+        self.index = index
+
+
+class ClusterIndexRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ClusterIndexServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parameters = {key: values[0] for key, values in parse_qs(url.query).items()}
+        route = url.path.strip("/").split("/")
+        try:
+            limit = int(parameters.get("limit", DEFAULT_LOOKUP_LIMIT))
+            result = self.lookup(route, parameters, limit)
+        except ValueError as error:
+            self.send(400, {"error": str(error)})
+            return
+        if result is None:
+            self.send(404, {"error": f"Nothing found for {url.path}"})
+        else:
+            self.send(200, result)
+
+    def lookup(self, route: list[str], parameters: dict, limit: int):
+        index = self.server.index
+        if route == ["name"] and parameters.get("q"):
+            return index.by_name(parameters["q"], limit)
+        if route == ["address"] and parameters.get("q"):
+            return index.by_address(parameters["q"], limit)
+        if len(route) == 2 and route[0] == "company":
+            return index.company(route[1])
+        if len(route) == 2 and route[0] == "cluster":
+            return index.cluster(int(route[1]), limit)
+        return None
+
+    def send(self, status: int, result: dict) -> None:
+        body = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
@@ -0,0 +1,428 @@
+import gzip
+import html
+import json
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from pyvis.edge import Edge
+from pyvis.network import Network
+from pyvis.node import Node
+
+from entity_resolution.constants import DEFAULT_MIN_COMPONENT_SIZE
+from entity_resolution.graph import (
+    COMPANY,
+    SAME_ADDRESS,
+    SIMILAR_ADDRESS,
+    SIMILAR_NAME,
+    EntityGraph,
+    breadth_first_order,
+    csr_adjacency,
+)
+
+SPRING_LAYOUT_MIN_NODES = 10
+SPRING_LAYOUT_MAX_NODES = 500
+NODE_SPACING = 60
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+# Links found by matching are drawn in their own color, other edges in their component's
+RELATIONSHIP_COLORS = {
+    SAME_ADDRESS: "red",
+    SIMILAR_ADDRESS: "orange",
+    SIMILAR_NAME: "orange",
+}
+NODE_FONT = {"color": "black", "size": 10}
+# The graph data of a page is written next to it as <page stem>_data.js, with a gzip copy
+GRAPH_DATA_SUFFIX = "_data.js"
+VIS_NETWORK_CSS = "https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css"
+VIS_NETWORK_JS = (
+    "https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js"
+)
+
+GRAPH_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="{css}" crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="{js}" crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+<style>
+body {{ font-family: sans-serif; margin: 0; }}
+#network {{ width: {width}; height: {height}; border: 1px solid lightgray; }}
+#progress {{ position: absolute; top: 1em; left: 1em; }}
+</style>
+</head>
+<body>
+<div id="progress">Loading...</div>
+<div id="network"></div>
+<script src="{data_name}"></script>
+<script>
+// Expand the columns of the graph data into one object per node or edge
+function rows(columns) {{
+    var names = Object.keys(columns);
+    var count = names.length ? columns[names[0]].length : 0;
+    var rows = new Array(count);
+    for (var i = 0; i < count; i++) {{
+        var row = {{}};
+        for (var j = 0; j < names.length; j++) {{
+            row[names[j]] = columns[names[j]][i];
+        }}
+        rows[i] = row;
+    }}
+    return rows;
+}}
+
+var nodes = rows(graphData.nodes);
+// Nodes are identified by their position
+nodes.forEach(function (node, i) {{ node.id = i; }});
+var network = new vis.Network(
+    document.getElementById("network"),
+    {{nodes: new vis.DataSet(nodes), edges: new vis.DataSet(rows(graphData.edges))}},
+    graphData.options
+);
+var progress = document.getElementById("progress");
+if (graphData.options.physics.enabled) {{
+    network.on("stabilizationProgress", function (params) {{
+        progress.textContent = Math.round(100 * params.iterations / params.total) + "%";
+    }});
+    network.once("stabilizationIterationsDone", function () {{
+        progress.style.display = "none";
+    }});
+}} else {{
+    progress.style.display = "none";
+}}
+</script>
+</body>
+</html>
+"""
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border-bottom: 1px solid #ddd; padding: 4px 12px; text-align: left; }}
+td.number {{ text-align: right; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{summary}</p>
+<table>
+<tr><th>#</th><th>Nodes</th><th>Companies</th><th>Main entity</th></tr>
+{rows}
+</table>
+<h2>Collapsed clusters</h2>
+<p>{collapsed}</p>
+</body>
+</html>
+"""
+
+
+def component_colors(n_components: int) -> list[str]:
+    """
+    Return the color of every component.
+
+    Parameters:
+    - n_components: The number of connected components.
+    """
+    return [
+        f"#{i:02x}{(i * 3) % 256:02x}{(i * 5) % 256:02x}" for i in range(n_components)
+    ]
+
+
+def add_to_network(
+    net: Network,
+    graph: EntityGraph,
+    node_colors: dict,
+    edges: np.ndarray,
+    positions: Optional[dict] = None,
+) -> None:
+    """
+    Write nodes and edges of the graph to the network exactly once, with their labels and titles.
+
+    Nodes and edges are appended directly because Network.add_node/add_edge scan the list of
+    node ids on every call, which is quadratic in the number of nodes.
+
+    Parameters:
+    - net: The pyvis Network.
+    - graph: The graph.
+    - node_colors: The color of every node id to write.
+    - edges: The ids of the edges to write, between nodes in node_colors.
+    - positions: Fixed (x, y) positions of the nodes, if precomputed.
+    """
+    nodes = np.fromiter(node_colors, dtype=np.int64, count=len(node_colors))
+    for node, color, label, title in zip(
+        node_colors,
+        node_colors.values(),
+        graph.node_labels(nodes),
+        graph.node_titles(nodes),
+    ):
+        position = {}
+        if positions is not None:
+            position = dict(zip(("x", "y"), positions[node]))
+        network_node = Node(
+            node,
+            net.shape,
+            label=label,
+            color=color,
+            font_color=net.font_color,
+            title=title,
+            font=NODE_FONT,
+            **position,
+        )
+        net.nodes.append(network_node.options)
+        net.node_ids.append(node)
+        net.node_map[node] = network_node.options
+
+    for source, target, code, label in zip(
+        graph.sources[edges].tolist(),
+        graph.targets[edges].tolist(),
+        graph.edge_relationships[edges].tolist(),
+        graph.edge_labels(edges),
+    ):
+        network_edge = Edge(
+            source,
+            target,
+            net.directed,
+            color=RELATIONSHIP_COLORS.get(code, node_colors[source]),
+            label=label,
+        )
+        net.edges.append(network_edge.options)
+
+
+def network_data(graph: EntityGraph, node_colors: list[str], options: dict) -> dict:
+    """
+    Return the nodes and edges of the whole graph as columns, with the vis.js options of the
+    network. Nodes are identified by their position, and the shape, font and arrows shared by
+    every node and edge are set once in the options.
+
+    Parameters:
+    - graph: The graph.
+    - node_colors: The color of every node.
+    - options: The vis.js options of the network.
+    """
+    nodes = np.arange(graph.number_of_nodes())
+    edges = np.arange(graph.number_of_edges())
+    edge_colors = np.array(node_colors, dtype=object)[graph.sources]
+    for code, color in RELATIONSHIP_COLORS.items():
+        edge_colors[graph.edge_relationships == code] = color
+    return {
+        "options": options
+        | {
+            "nodes": {"shape": "dot", "font": NODE_FONT},
+            "edges": options.get("edges", {}) | {"arrows": "to"},
+        },
+        "nodes": {
+            "label": graph.node_labels(nodes),
+            "title": graph.node_titles(nodes),
+            "color": list(node_colors),
+        },
+        "edges": {
+            "from": graph.sources.tolist(),
+            "to": graph.targets.tolist(),
+            "label": graph.edge_labels(edges),
+            "color": edge_colors.tolist(),
+        },
+    }
+
+
+def write_network(
+    data: dict,
+    page_path: str,
+    title: str = "Entity Relationships",
+    height: str = "1200px",
+    width: str = "100%",
+) -> list[str]:
+    """
+    Write the graph data once to a <page stem>_data.js file plus a gzip copy served by nginx
+    (gzip_static), and a page drawing it. Returns the paths of the written files, page first.
+
+    The data is a script rather than JSON fetched by the page, so that the page also opens
+    from a file:// URL.
+
+    Parameters:
+    - data: The graph data, as returned by network_data.
+    - page_path: The path of the page.
+    - title: The title of the page.
+    - height: The height of the network.
+    - width: The width of the network.
+    """
+    page_path = Path(page_path)
+    page_path.parent.mkdir(parents=True, exist_ok=True)
+    data_path = page_path.with_name(f"{page_path.stem}{GRAPH_DATA_SUFFIX}")
+    compressed_path = data_path.with_name(f"{data_path.name}.gz")
+    script = f"var graphData = {json.dumps(data, separators=(',', ':'))};\n".encode()
+    data_path.write_bytes(script)
+    compressed_path.write_bytes(gzip.compress(script, compresslevel=6, mtime=0))
+    page_path.write_text(
+        GRAPH_TEMPLATE.format(
+            title=html.escape(title),
+            css=VIS_NETWORK_CSS,
+            js=VIS_NETWORK_JS,
+            height=height,
+            width=width,
+            data_name=data_path.name,
+        ),
+        encoding="utf-8",
+    )
+    return [str(page_path), str(data_path), str(compressed_path)]
+
+
+def copy_network(written: list[str], page_path: str) -> list[str]:
+    """
+    Copy a page written by write_network to page_path, with its data files next to it under
+    their own names, which the page refers to. Returns the paths of the copied files.
+
+    Parameters:
+    - written: The paths returned by write_network.
+    - page_path: The path of the copied page.
+    """
+    page_path = Path(page_path)
+    page_path.parent.mkdir(parents=True, exist_ok=True)
+    targets = [page_path] + [
+        page_path.with_name(Path(path).name) for path in written[1:]
+    ]
+    copies = []
+    for path, target in zip(written, targets):
+        # A page copied into the same directory shares the data files
+        if target.resolve() != Path(path).resolve():
+            shutil.copyfile(path, target)
+            copies.append(str(target))
+    return copies
+
+
+def layout_component(
+    graph: EntityGraph, nodes: np.ndarray, edges: np.ndarray, degrees: np.ndarray
+) -> dict:
+    """
+    Return fixed (x, y) pixel positions for the nodes of a connected component.
+
+    Mid-sized components use a force-directed layout. Others are laid out in linear time on a
+    sunflower spiral in breadth-first order from the best connected node, so that nodes
+    spread evenly and neighbours of the hub stay close to it; components of a few nodes are
+    mostly an agent and its companies, which the spiral draws as a star.
+
+    Parameters:
+    - graph: The graph.
+    - nodes: The sorted node ids of the component.
+    - edges: The ids of the edges of the component.
+    - degrees: The degree of every node of the graph.
+    """
+    scale = NODE_SPACING * np.sqrt(len(nodes))
+    sources = np.searchsorted(nodes, graph.sources[edges])
+    targets = np.searchsorted(nodes, graph.targets[edges])
+    if SPRING_LAYOUT_MIN_NODES <= len(nodes) <= SPRING_LAYOUT_MAX_NODES:
+        # NetworkX is only needed for the force-directed layout
+        import networkx as nx
+
+        undirected = nx.Graph()
+        undirected.add_nodes_from(range(len(nodes)))
+        undirected.add_edges_from(zip(sources.tolist(), targets.tolist()))
+        positions = nx.spring_layout(undirected, seed=0, scale=scale)
+        return {
+            int(nodes[node]): (float(x), float(y)) for node, (x, y) in positions.items()
+        }
+
+    hub = int(np.argmax(degrees[nodes]))
+    order = breadth_first_order(*csr_adjacency(len(nodes), sources, targets), hub)
+    index = np.arange(len(order))
+    radius, angle = NODE_SPACING * np.sqrt(index), index * GOLDEN_ANGLE
+    xs, ys = radius * np.cos(angle), radius * np.sin(angle)
+    return dict(zip(nodes[order].tolist(), zip(xs.tolist(), ys.tolist())))
+
+
+def render_components(
+    graph: EntityGraph,
+    index_path: str,
+    min_component_size: int = DEFAULT_MIN_COMPONENT_SIZE,
+    title: str = "Entity Relationships",
+) -> list[str]:
+    """
+    Render an index page plus one page per connected component of at least min_component_size
+    nodes, with precomputed positions and physics disabled. Smaller components are collapsed
+    into a count on the index page. Returns the paths of the written files.
+
+    Component pages are written to a <index stem>_components directory next to the index.
+
+    Parameters:
+    - graph: The graph.
+    - index_path: The path of the index page.
+    - min_component_size: The minimum number of nodes of a component with its own page.
+    - title: The title of the index page.
+    """
+    index_path = Path(index_path)
+    pages_dir = index_path.with_name(f"{index_path.stem}_components")
+    shutil.rmtree(pages_dir, ignore_errors=True)
+    pages_dir.mkdir(parents=True)
+
+    node_components = graph.components()
+    sizes = np.bincount(node_components)
+    # Group the nodes and edges of every component, and order components by decreasing size
+    nodes_by_component = np.argsort(node_components, kind="stable")
+    node_starts = np.r_[0, np.cumsum(sizes)]
+    edge_components = node_components[graph.sources]
+    edges_by_component = np.argsort(edge_components, kind="stable")
+    edge_starts = np.r_[
+        0, np.cumsum(np.bincount(edge_components, minlength=len(sizes)))
+    ]
+    components = np.argsort(-sizes, kind="stable")
+    degrees = graph.degrees()
+
+    colors = component_colors(len(components))
+    written, rows = [str(index_path)], []
+    # One network is reused for every page, so its HTML template is compiled only once
+    net = Network(directed=True, height="1200px", width="100%", cdn_resources="remote")
+    net.toggle_physics(False)
+    net.options.edges.smooth.enabled = False
+    for i, component in enumerate(components):
+        if sizes[component] < min_component_size:
+            break
+        nodes = nodes_by_component[node_starts[component] : node_starts[component + 1]]
+        edges = edges_by_component[edge_starts[component] : edge_starts[component + 1]]
+        net.nodes, net.node_ids, net.node_map, net.edges = [], [], {}, []
+        add_to_network(
+            net,
+            graph,
+            dict.fromkeys(nodes.tolist(), colors[i]),
+            edges,
+            layout_component(graph, nodes, edges, degrees),
+        )
+        page_path = pages_dir / f"component_{i + 1:05d}.html"
+        net.write_html(str(page_path))
+        written.append(str(page_path))
+
+        main_entity = graph.names[nodes[np.argmax(degrees[nodes])]]
+        n_companies = int(np.count_nonzero(graph.kinds[nodes] == COMPANY))
+        rows.append(
+            f'<tr><td class="number">{i + 1}</td>'
+            f'<td class="number">{len(nodes)}</td>'
+            f'<td class="number">{n_companies}</td>'
+            f'<td><a href="{pages_dir.name}/{page_path.name}">'
+            f"{html.escape(str(main_entity))}</a></td></tr>"
+        )
+
+    collapsed_sizes, collapsed_counts = np.unique(
+        sizes[sizes < min_component_size], return_counts=True
+    )
+    collapsed = ", ".join(
+        f"{count} clusters of {size} nodes"
+        for size, count in zip(collapsed_sizes.tolist(), collapsed_counts.tolist())
+    )
+    index_path.write_text(
+        INDEX_TEMPLATE.format(
+            title=html.escape(title),
+            summary=(
+                f"{graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges, "
+                f"{len(components)} connected components, {len(rows)} with "
+                f"{min_component_size} or more nodes shown on their own page."
+            ),
+            rows="\n".join(rows),
+            collapsed=collapsed or "None",
+        ),
+        encoding="utf-8",
+    )
+    return written
@@ -0,0 +1,216 @@
+import logging
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution.blocking import address_key
+from entity_resolution.clustering import UnionFind, summarize_clusters
+from entity_resolution.constants import DEFAULT_CHUNK_SIZE
+from entity_resolution.matching import (
+    FuzzyMatcher,
+    address_blocking_keys,
+    name_blocking_keys,
+    normalize_address,
+    normalize_text,
+)
+from entity_resolution.preparation import iter_companies, prepare_entities
+
+
+class StreamingClusterer:
+    """
+    Cluster companies from a stream of prepared chunks without holding the input or a graph.
+
+    Between chunks it keeps only integer-keyed cluster state: the node id of every distinct entity
+    name and company_id, a union-find forest over those ids, the first company seen at every
+    address, and the company_id, company node and entity type of every row for the output tables.
+    Without fuzzy matching, the resulting clusters are the same as those of cluster_companies on
+    the whole input. Fuzzy matching runs once over the distinct addresses and entity names of all
+    chunks, while the batch runner weights address n-grams over its company rows, so address
+    scores close to the threshold can differ.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty StreamingClusterer.
+        """
+        # Entities and companies share one node id space, like in cluster_companies
+        self.entity_node_ids: dict[str, int] = {}
+        self.company_node_ids: dict[str, int] = {}
+        self.forest = UnionFind(0)
+        # dict keys keep first-seen order of addresses, like address_blocks codes
+        self.address_firsts: dict[str, int] = {}
+        self.shared_addresses: set[str] = set()
+        self.company_ids: list[np.ndarray] = []
+        self.company_nodes: list[np.ndarray] = []
+        self.entity_types: list[np.ndarray] = []
+        self.logger = logging.getLogger(__name__)
+
+    def __len__(self) -> int:
+        return len(self.entity_node_ids) + len(self.company_node_ids)
+
+    def __intern(
+        self,
+        node_ids: dict[str, int],
+        other_ids: dict[str, int],
+        keys: Iterable[str],
+        count: int,
+    ) -> np.ndarray:
+        """
+        Return the integer node id of every key, assigning the next free ids to unseen keys.
+
+        Parameters:
+        - node_ids: The node ids of the entities, or of the companies.
+        - other_ids: The node ids of the other kind of nodes.
+        - keys: The entity names, or company_ids.
+        - count: The number of keys.
+        """
+        offset = len(other_ids)
+        return np.fromiter(
+            (node_ids.setdefault(key, offset + len(node_ids)) for key in keys),
+            dtype=np.int64,
+            count=count,
+        )
+
+    def add_chunk(self, df: pd.DataFrame) -> None:
+        """
+        Merge the entities and addresses of a prepared chunk into the clusters.
+
+        Parameters:
+        - df: A chunk of prepared data with company_id, entity_name, entity_type and
+          principal_address columns.
+        """
+        entity_nodes = self.__intern(
+            self.entity_node_ids,
+            self.company_node_ids,
+            df["entity_name"].astype(str),
+            len(df),
+        )
+        company_nodes = self.__intern(
+            self.company_node_ids,
+            self.entity_node_ids,
+            df["company_id"].astype(str),
+            len(df),
+        )
+        self.forest.grow(len(self))
+        self.forest.union_many(entity_nodes, company_nodes)
+
+        # Linking every company at an address to the first one seen there merges the block
+        address_firsts = self.address_firsts
+        for company_node, address in zip(
+            company_nodes.tolist(), df["principal_address"]
+        ):
+            key = address_key(address)
+            if key is None:
+                continue
+            first = address_firsts.setdefault(key, company_node)
+            if first != company_node:
+                self.forest.union(first, company_node)
+                self.shared_addresses.add(key)
+
+        self.company_ids.append(df["company_id"].to_numpy())
+        self.company_nodes.append(company_nodes)
+        self.entity_types.append(df["entity_type"].astype(str).to_numpy())
+
+    def __match_fuzzy(self, fuzzy_threshold: float, workers: int) -> None:
+        """
+        Merge the clusters of similar addresses and similar entity names.
+
+        Parameters:
+        - fuzzy_threshold: The minimum similarity of a match.
+        - workers: The number of processes scoring fuzzy matching blocks.
+        """
+        matcher = FuzzyMatcher(threshold=fuzzy_threshold, workers=workers)
+
+        # Every company at an address is already merged with the first one seen there
+        normalized = normalize_address(pd.Series(list(self.address_firsts), dtype=str))
+        pairs = matcher.match(normalized.tolist(), address_blocking_keys(normalized))
+        firsts = np.fromiter(self.address_firsts.values(), dtype=np.int64)
+        self.forest.union_many(firsts[pairs["left"]], firsts[pairs["right"]])
+        n_similar_addresses = len(pairs)
+
+        entity_nodes = np.fromiter(self.entity_node_ids.values(), dtype=np.int64)
+        normalized = normalize_text(pd.Series(list(self.entity_node_ids), dtype=str))
+        pairs = matcher.match(normalized.tolist(), name_blocking_keys(normalized))
+        self.forest.union_many(
+            entity_nodes[pairs["left"]], entity_nodes[pairs["right"]]
+        )
+
+        self.logger.info(
+            f"Scored {matcher.pairs_compared} fuzzy candidate pairs: "
+            f"{n_similar_addresses} similar addresses, {len(pairs)} similar names, "
+            f"{matcher.blocks_skipped} oversized blocks skipped"
+        )
+
+    def clusters(
+        self, fuzzy_threshold: float = 0.0, workers: int = 1
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Return the company_id -> cluster_id table and the per-cluster stats of all chunks added.
+
+        Parameters:
+        - fuzzy_threshold: The minimum similarity for linking similar addresses and names,
+          0 disables fuzzy matching.
+        - workers: The number of processes scoring fuzzy matching blocks.
+        """
+        if fuzzy_threshold:
+            self.__match_fuzzy(fuzzy_threshold, workers)
+
+        node_clusters = self.forest.labels()
+        company_ids = np.concatenate(self.company_ids or [np.zeros(0)])
+        company_clusters = node_clusters[
+            np.concatenate(self.company_nodes or [np.zeros(0, dtype=np.int64)])
+        ]
+        clusters = pd.DataFrame(
+            {"company_id": company_ids, "cluster_id": company_clusters}
+        ).drop_duplicates("company_id")
+
+        shared_addresses = [
+            address
+            for address in self.address_firsts
+            if address in self.shared_addresses
+        ]
+        shared_addresses = pd.DataFrame(
+            {
+                "cluster_id": node_clusters[
+                    np.array(
+                        [self.address_firsts[address] for address in shared_addresses],
+                        dtype=np.int64,
+                    )
+                ],
+                "address": shared_addresses,
+            },
+            columns=["cluster_id", "address"],
+        )
+
+        rows = pd.DataFrame(
+            {
+                "cluster_id": company_clusters,
+                "company_id": company_ids,
+                "entity_type": np.concatenate(self.entity_types or [np.zeros(0)]),
+            }
+        )
+        return clusters, summarize_clusters(node_clusters, rows, shared_addresses)
+
+
+def stream_clusters(
+    in_file_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    fuzzy_threshold: float = 0.0,
+    workers: int = 1,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Cluster the companies of a crawled dataset read in chunks, so memory is bounded by the chunk size
+    plus the cluster state rather than the input size.
+
+    Parameters:
+    - in_file_path: The CSV or Parquet dataset of crawled companies.
+    - chunk_size: The number of rows read per chunk.
+    - fuzzy_threshold: The minimum similarity for linking similar addresses and names,
+      0 disables fuzzy matching.
+    - workers: The number of processes scoring fuzzy matching blocks.
+    """
+    clusterer = StreamingClusterer()
+    for chunk in iter_companies(in_file_path, chunk_size):
+        clusterer.add_chunk(prepare_entities(chunk))
+    return clusterer.clusters(fuzzy_threshold, workers)
@@ -1,12 +1,28 @@
 import typer
+import cProfile
+import json
 import os
+import shutil
+import tracemalloc
+from contextlib import contextmanager
 from datetime import date
-from scrapy.crawler import CrawlerProcess
-from scrapy.utils.project import get_project_settings
 import logging
+from typing import Optional
 
-from web_crawler.spiders import rest_spider
-from entity_resolution.er import EntityResolutionRunner, DEFAULT_GH_PAGES_PATH
+# Only constants are imported here: every command imports the crawler, ER or server stack it
+# runs itself, so that the CLI starts and shows its help without loading Scrapy or pandas
+from web_crawler.spiders.helpers.constants import (
+    DEFAULT_STATE_TTL_HOURS,
+    SOURCE_BASE_URL,
+)
+from entity_resolution.constants import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_ER_STATE_PATH,
+    DEFAULT_GH_PAGES_PATH,
+    DEFAULT_MIN_COMPONENT_SIZE,
+    RENDER_MODES,
+)
+from entity_resolution.query import DEFAULT_CLUSTER_INDEX_PATH, DEFAULT_LOOKUP_LIMIT
 
 app = typer.Typer(
     rich_markup_mode="rich",
@@ -15,10 +31,14 @@ app = typer.Typer(
     pretty_exceptions_show_locals=False,
 )
 
+# Scrapy resets the root logger level before web_crawler.extensions.RichLogging replaces this
+# handler, so the handler filters by level itself
+console_handler = logging.StreamHandler()
+console_handler.setLevel(logging.INFO)
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] - %(message)s",
-    handlers=[logging.StreamHandler()],
+    handlers=[console_handler],
 )
 
 today = str(date.today())
@@ -26,10 +46,15 @@ today = str(date.today())
 DEFAULT_SEARCH_TERM = "X"
 DEFAULT_OUT_DIR = f"tmp/data"
 DEFAULT_OUT_FILE_DIR = f"{DEFAULT_OUT_DIR}/{today}"
+DEFAULT_LATEST_DIR = f"{DEFAULT_OUT_DIR}/latest"
 DEFAULT_OUT_PLOT_DIR = f"tmp/plot/{today}"
+DEFAULT_OUT_CLUSTER_DIR = f"tmp/clusters/{today}"
 DEFAULT_OUT_FILE_NAME = "active_companies"
 DEFAULT_OUT_PLOT_FORMAT = "html"
 DEFAULT_OUT_FILE_FORMAT = "csv"
+DEFAULT_STATE_PATH = "tmp/state/crawl_state.sqlite"
+DEFAULT_REPLAY_STORE_PATH = "tmp/replay/api_responses.sqlite"
+DEFAULT_PROFILE_DIR = f"tmp/profile/{today}"
 
 
 @app.command("run_crawler")
@@ -47,36 +72,242 @@ def run_crawler(
         help="Provide the name for the file in which the crawled data has to be stored.",
     ),
     output_file_format: str = typer.Option(
-        default=DEFAULT_OUT_FILE_FORMAT, help="Provide the output file format."
+        default=DEFAULT_OUT_FILE_FORMAT,
+        help="Provide the output file format, e.g. csv, jsonlines or parquet.",
+    ),
+    prefixes: Optional[str] = typer.Option(
+        default=None,
+        help="Provide comma-separated search prefixes or ranges (e.g. A-Z,0-9) to crawl in parallel instead of a single search_param.",
+    ),
+    workers: int = typer.Option(
+        default=os.cpu_count() or 1,
+        help="Provide the number of crawler processes used with --prefixes.",
+    ),
+    incremental: bool = typer.Option(
+        default=False,
+        help="Only request details of new, changed or stale companies, reusing the rest from the crawl state store.",
+    ),
+    state_path: str = typer.Option(
+        default=DEFAULT_STATE_PATH,
+        help="Provide the path of the crawl state store used with --incremental.",
+    ),
+    ttl_hours: float = typer.Option(
+        default=DEFAULT_STATE_TTL_HOURS,
+        help="Provide the age in hours after which unchanged companies are crawled again with --incremental.",
+    ),
+    source_base_url: str = typer.Option(
+        default=SOURCE_BASE_URL,
+        help="Provide the base URL of the API, e.g. a local stand-in server.",
+    ),
+    replay_mode: Optional[str] = typer.Option(
+        default=None,
+        help="Provide 'record' to store API responses in the replay store or 'replay' to crawl from it without network access.",
+    ),
+    replay_store_path: str = typer.Option(
+        default=DEFAULT_REPLAY_STORE_PATH,
+        help="Provide the path of the replay store used with --replay-mode.",
+    ),
+    metrics_path: Optional[str] = typer.Option(
+        default=None,
+        help="Provide a path to write the crawl metrics (per-endpoint latency histograms, retries, items/sec, requests in flight) as JSON. With --prefixes, one file per prefix is written with a _<prefix> suffix.",
+    ),
+    profile: bool = typer.Option(
+        default=False,
+        help=f"Provide --profile to write cProfile stats and the top memory allocations of the crawl to {DEFAULT_PROFILE_DIR}. With --prefixes, only the parent process is profiled.",
+    ),
+    job_dir: Optional[str] = typer.Option(
+        default=None,
+        help="Provide a job directory to make the crawl resumable: the search listing and the completed companies are checkpointed there and the feed is appended to, so running the same command again after a failure only crawls the remaining companies. Delete the directory to start over.",
     ),
 ):
     """
     Run the web crawler to collect data on active companies.
     """
+    if replay_mode not in (None, "record", "replay"):
+        raise typer.BadParameter("--replay-mode must be 'record' or 'replay'.")
+    if job_dir:
+        from web_crawler.checkpoint import RESUMABLE_FEED_FORMATS
+
+        if output_file_format.lower() not in RESUMABLE_FEED_FORMATS:
+            raise typer.BadParameter(
+                f"--job-dir supports the {', '.join(RESUMABLE_FEED_FORMATS)} formats only."
+            )
+    settings_overrides = {
+        "SOURCE_BASE_URL": source_base_url,
+        "REPLAY_MODE": replay_mode,
+        "REPLAY_STORE_PATH": replay_store_path,
+    }
+    if metrics_path:
+        root, extension = os.path.splitext(metrics_path)
+        settings_overrides["METRICS_PATH"] = (
+            f"{root}_%(search_param)s{extension}" if prefixes else metrics_path
+        )
+    spider_kwargs = (
+        {"state_path": state_path, "ttl_hours": ttl_hours} if incremental else {}
+    )
+    if job_dir:
+        spider_kwargs["job_dir"] = job_dir
+    if prefixes:
+        with profiled("run_crawler", profile):
+            run_sharded_crawler(
+                prefixes,
+                output_dir,
+                output_filename,
+                output_file_format.lower(),
+                workers,
+                spider_kwargs,
+                settings_overrides,
+            )
+        return
+
+    run_single_crawler(
+        search_param,
+        output_dir,
+        output_filename,
+        output_file_format.lower(),
+        spider_kwargs,
+        settings_overrides,
+        profile,
+    )
+
+
+def run_single_crawler(
+    search_param: str,
+    output_dir: str,
+    output_filename: str,
+    output_file_format: str,
+    spider_kwargs: dict,
+    settings_overrides: dict,
+    profile: bool = False,
+) -> str:
+    """
+    Crawl a single search_param in this process, publish its feed as the latest dataset and
+    return the feed path. With a job_dir in spider_kwargs, the crawl resumes from its checkpoint
+    and appends to the feed.
+    """
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
     settings = get_project_settings()
+    settings.setdict(settings_overrides, priority="cmdline")
 
     # Add custom settings for output file
-    settings.set(
-        "FEEDS",
-        {
-            os.path.join(
-                f"{output_dir}",
-                f"{output_filename}_{search_param}.{output_file_format.lower()}",
-            ): {
-                "format": output_file_format.lower(),
-            },
-            os.path.join(
-                f"{DEFAULT_OUT_DIR}/latest",
-                f"{output_filename}_{search_param}.{output_file_format.lower()}",
-            ): {
-                "format": output_file_format.lower(),
-            },
-        },
+    feed_path = os.path.join(
+        f"{output_dir}",
+        f"{output_filename}_{search_param}.{output_file_format}",
     )
+    feed_options = {"format": output_file_format}
+    if output_file_format == "parquet":
+        # A Parquet file cannot be appended to
+        feed_options["overwrite"] = True
+    if spider_kwargs.get("job_dir"):
+        from web_crawler.checkpoint import resumed_feed_options
+
+        feed_options = resumed_feed_options(
+            feed_path, output_file_format, spider_kwargs["job_dir"], search_param
+        )
+    settings.set("FEEDS", {feed_path: feed_options})
 
-    process = CrawlerProcess(settings)
-    process.crawl("rest_spider", search_param=search_param)
-    process.start()
+    with profiled("run_crawler", profile):
+        process = CrawlerProcess(settings)
+        process.crawl("rest_spider", search_param=search_param, **spider_kwargs)
+        process.start()
+    publish_latest(feed_path)
+    return feed_path
+
+
+@contextmanager
+def profiled(name: str, enabled: bool = True):
+    """
+    Profile the block with cProfile and tracemalloc if enabled. Writes <name>.prof (for pstats or
+    snakeviz) and <name>_memory.txt with the top memory allocations to DEFAULT_PROFILE_DIR.
+    """
+    if not enabled:
+        yield
+        return
+    os.makedirs(DEFAULT_PROFILE_DIR, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats_path = os.path.join(DEFAULT_PROFILE_DIR, f"{name}.prof")
+        memory_path = os.path.join(DEFAULT_PROFILE_DIR, f"{name}_memory.txt")
+        profiler.dump_stats(stats_path)
+        with open(memory_path, "w") as memory_file:
+            memory_file.write(f"Peak traced memory: {peak / 1024**2:.1f} MB\n")
+            for statistic in snapshot.statistics("lineno")[:50]:
+                memory_file.write(f"{statistic}\n")
+        logging.info(f"Wrote profiles to {stats_path} and {memory_path}")
+
+
+def publish_latest(feed_path: str) -> Optional[str]:
+    """
+    Point the dataset of the same name in the latest directory at a crawled feed, with a
+    relative symlink instead of a second full write, or a copy where symlinks are not supported.
+    Returns the latest path, or None if the feed was not written.
+    """
+    if not os.path.exists(feed_path):
+        logging.warning(f"Feed {feed_path} was not written, latest is unchanged")
+        return None
+    os.makedirs(DEFAULT_LATEST_DIR, exist_ok=True)
+    latest_path = os.path.join(DEFAULT_LATEST_DIR, os.path.basename(feed_path))
+    tmp_path = f"{latest_path}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.symlink(os.path.relpath(feed_path, DEFAULT_LATEST_DIR), tmp_path)
+    except OSError:
+        shutil.copyfile(feed_path, tmp_path)
+    # Replace the previous latest dataset atomically
+    os.replace(tmp_path, latest_path)
+    return latest_path
+
+
+def run_sharded_crawler(
+    prefixes: str,
+    output_dir: str,
+    output_filename: str,
+    output_file_format: str,
+    workers: int,
+    spider_kwargs: dict,
+    settings_overrides: dict,
+) -> None:
+    """
+    Crawl several prefixes in parallel processes and merge their feeds, deduplicated by company_id.
+    """
+    from web_crawler.sharding import (
+        MERGEABLE_FEED_FORMATS,
+        crawl_prefixes,
+        expand_prefixes,
+        merge_feeds,
+    )
+
+    if output_file_format not in MERGEABLE_FEED_FORMATS:
+        raise typer.BadParameter(
+            f"--prefixes supports the {', '.join(MERGEABLE_FEED_FORMATS)} formats only."
+        )
+    search_prefixes = expand_prefixes(prefixes)
+    label = prefixes.replace(",", "_")
+    shard_paths = crawl_prefixes(
+        search_prefixes,
+        os.path.join(output_dir, "shards"),
+        output_filename,
+        output_file_format,
+        workers,
+        spider_kwargs,
+        settings_overrides,
+    )
+    feed_path = os.path.join(
+        output_dir, f"{output_filename}_{label}.{output_file_format}"
+    )
+    merge_feeds(shard_paths, [feed_path], output_file_format)
+    publish_latest(feed_path)
 
 
 @app.command("run_er")
@@ -89,11 +320,235 @@ def run_er(
         default=f"{DEFAULT_OUT_PLOT_DIR}/{DEFAULT_OUT_FILE_NAME}_{DEFAULT_SEARCH_TERM}.{DEFAULT_OUT_PLOT_FORMAT}",
         help="Provide the full path for the output plot visualizating the entity relationships.",
     ),
+    out_cluster_path: str = typer.Option(
+        default=f"{DEFAULT_OUT_CLUSTER_DIR}/{DEFAULT_OUT_FILE_NAME}_{DEFAULT_SEARCH_TERM}.{DEFAULT_OUT_FILE_FORMAT}",
+        help="Provide the full path for the company to cluster table (.csv or .parquet). Cluster stats are written next to it with a _stats suffix.",
+    ),
+    fuzzy_threshold: float = typer.Option(
+        default=0.0,
+        help="Provide the minimum similarity (0-1), e.g. 0.9, for also linking similar addresses and names. Fuzzy matching is off by default (0), so clusters only follow shared entities and identical addresses.",
+    ),
+    streaming: bool = typer.Option(
+        default=False,
+        help="Provide --streaming to cluster inputs larger than memory in chunks. Only the cluster tables are written, no plot.",
+    ),
+    chunk_size: int = typer.Option(
+        default=DEFAULT_CHUNK_SIZE,
+        help="Provide the number of rows read per chunk in streaming mode.",
+    ),
+    render_mode: str = typer.Option(
+        default="single",
+        help="Provide 'single' for one page with the whole graph or 'split' for an index page plus one page per connected component, laid out offline.",
+    ),
+    min_component_size: int = typer.Option(
+        default=DEFAULT_MIN_COMPONENT_SIZE,
+        help="Provide the minimum number of nodes of a component with its own page in split render mode. Smaller components are collapsed.",
+    ),
+    since: Optional[str] = typer.Option(
+        default=None,
+        help="Provide the path of the previous snapshot to only apply the companies added, removed or changed since then to the stored ER state. Only the cluster tables and a _changes.json report of merged and split clusters are written, no plot.",
+    ),
+    er_state_path: str = typer.Option(
+        default=DEFAULT_ER_STATE_PATH,
+        help="Provide the path of the ER state store used with --since.",
+    ),
+    workers: int = typer.Option(
+        default=1,
+        help="Provide the number of processes scoring fuzzy matching blocks in parallel.",
+    ),
+    metrics_path: Optional[str] = typer.Option(
+        default=None,
+        help="Provide a path to write the time, peak memory and counters (rows, nodes, edges, candidate pairs, components, bytes written) of every ER stage as JSON.",
+    ),
+    profile: bool = typer.Option(
+        default=False,
+        help=f"Provide --profile to write cProfile stats and the top memory allocations of the ER run to {DEFAULT_PROFILE_DIR}.",
+    ),
+    index_path: str = typer.Option(
+        default=DEFAULT_CLUSTER_INDEX_PATH,
+        help="Provide the path of the SQLite index of the resolved clusters queried by query_clusters and serve_cluster_index. Use an empty path to skip it.",
+    ),
 ):
     """
     Run the entity resolution pipeline.
     """
-    EntityResolutionRunner(input_filepath, out_plot_path).run_er()
+    if render_mode not in RENDER_MODES:
+        raise typer.BadParameter(
+            f"--render-mode must be one of {', '.join(RENDER_MODES)}."
+        )
+    from entity_resolution.er import EntityResolutionRunner
+
+    runner = EntityResolutionRunner(
+        input_filepath,
+        out_plot_path,
+        out_cluster_path,
+        fuzzy_threshold,
+        streaming=streaming,
+        chunk_size=chunk_size,
+        render_mode=render_mode,
+        min_component_size=min_component_size,
+        since=since,
+        er_state_path=er_state_path,
+        workers=workers,
+        metrics_path=metrics_path,
+        index_path=index_path or None,
+    )
+    with profiled("run_er", profile):
+        runner.run_er()
+
+
+@app.command("run_crawler_er")
+def run_crawler_er(
+    search_param: str = typer.Option(
+        default=DEFAULT_SEARCH_TERM,
+        help="Provide a value to search for active companies.",
+    ),
+    output_dir: str = typer.Option(
+        default=DEFAULT_OUT_FILE_DIR,
+        help="Provide the output directory name where the file with crawled data has to be stored.",
+    ),
+    output_filename: str = typer.Option(
+        default=DEFAULT_OUT_FILE_NAME,
+        help="Provide the name for the file in which the crawled data has to be stored.",
+    ),
+    output_file_format: str = typer.Option(
+        default=DEFAULT_OUT_FILE_FORMAT,
+        help="Provide the output file format, e.g. csv, jsonlines or parquet.",
+    ),
+    incremental: bool = typer.Option(
+        default=False,
+        help="Only request details of new, changed or stale companies, reusing the rest from the crawl state store.",
+    ),
+    state_path: str = typer.Option(
+        default=DEFAULT_STATE_PATH,
+        help="Provide the path of the crawl state store used with --incremental.",
+    ),
+    ttl_hours: float = typer.Option(
+        default=DEFAULT_STATE_TTL_HOURS,
+        help="Provide the age in hours after which unchanged companies are crawled again with --incremental.",
+    ),
+    source_base_url: str = typer.Option(
+        default=SOURCE_BASE_URL,
+        help="Provide the base URL of the API, e.g. a local stand-in server.",
+    ),
+    out_cluster_path: str = typer.Option(
+        default=f"{DEFAULT_OUT_CLUSTER_DIR}/{DEFAULT_OUT_FILE_NAME}_{DEFAULT_SEARCH_TERM}.{DEFAULT_OUT_FILE_FORMAT}",
+        help="Provide the full path for the company to cluster table (.csv or .parquet). Cluster stats are written next to it with a _stats suffix.",
+    ),
+    fuzzy_threshold: float = typer.Option(
+        default=0.0,
+        help="Provide the minimum similarity (0-1), e.g. 0.9, for also linking similar addresses and names. Fuzzy matching is off by default (0), so clusters only follow shared entities and identical addresses.",
+    ),
+    workers: int = typer.Option(
+        default=1,
+        help="Provide the number of processes scoring fuzzy matching blocks in parallel.",
+    ),
+    index_path: str = typer.Option(
+        default="",
+        help="Provide a path to also index the resolved clusters for query_clusters and serve_cluster_index. The index is built from the feed once the crawl is done.",
+    ),
+    metrics_path: Optional[str] = typer.Option(
+        default=None,
+        help="Provide a path to write the crawl metrics (per-endpoint latency histograms, retries, items/sec, requests in flight) as JSON.",
+    ),
+):
+    """
+    Crawl active companies and resolve them while crawling: crawled companies are clustered in batches by an item pipeline, and the cluster tables are written as soon as the spider closes, without reading the feed back.
+    """
+    settings_overrides = {
+        "SOURCE_BASE_URL": source_base_url,
+        "STREAMING_ER_CLUSTER_PATH": out_cluster_path,
+        "STREAMING_ER_FUZZY_THRESHOLD": fuzzy_threshold,
+        "STREAMING_ER_WORKERS": workers,
+    }
+    if metrics_path:
+        settings_overrides["METRICS_PATH"] = metrics_path
+    spider_kwargs = (
+        {"state_path": state_path, "ttl_hours": ttl_hours} if incremental else {}
+    )
+    feed_path = run_single_crawler(
+        search_param,
+        output_dir,
+        output_filename,
+        output_file_format.lower(),
+        spider_kwargs,
+        settings_overrides,
+    )
+    if index_path:
+        from entity_resolution.query import build_cluster_index
+
+        n_companies = build_cluster_index(feed_path, out_cluster_path, index_path)
+        logging.info(f"Indexed {n_companies} companies in {index_path}")
+
+
+@app.command("query_clusters")
+def query_clusters(
+    name: Optional[str] = typer.Option(
+        default=None, help="Provide an entity or company name to look up."
+    ),
+    address: Optional[str] = typer.Option(
+        default=None, help="Provide an address to look up."
+    ),
+    company_id: Optional[str] = typer.Option(
+        default=None, help="Provide a company_id to look up."
+    ),
+    cluster_id: Optional[int] = typer.Option(
+        default=None, help="Provide a cluster_id to look up."
+    ),
+    index_path: str = typer.Option(
+        default=DEFAULT_CLUSTER_INDEX_PATH,
+        help="Provide the path of the cluster index written by run_er.",
+    ),
+    limit: int = typer.Option(
+        default=DEFAULT_LOOKUP_LIMIT,
+        help="Provide the maximum number of companies returned.",
+    ),
+):
+    """
+    Look up the clusters of a name, address, company or cluster in the index written by run_er, and print them as JSON.
+    """
+    from entity_resolution.query import ClusterIndex
+
+    index = ClusterIndex(index_path)
+    if name is not None:
+        result = index.by_name(name, limit)
+    elif address is not None:
+        result = index.by_address(address, limit)
+    elif company_id is not None:
+        result = index.company(company_id)
+    elif cluster_id is not None:
+        result = index.cluster(cluster_id, limit)
+    else:
+        raise typer.BadParameter(
+            "Provide one of --name, --address, --company-id or --cluster-id."
+        )
+    index.close()
+    print(json.dumps(result, indent=2))
+
+
+@app.command("serve_cluster_index")
+def serve_cluster_index(
+    host: str = typer.Option(
+        default="127.0.0.1", help="Provide the host to listen on."
+    ),
+    port: int = typer.Option(default=8001, help="Provide the port to listen on."),
+    index_path: str = typer.Option(
+        default=DEFAULT_CLUSTER_INDEX_PATH,
+        help="Provide the path of the cluster index written by run_er.",
+    ),
+):
+    """
+    Serve lookups in the cluster index written by run_er as JSON:
+    GET /name?q=NAME, /address?q=ADDRESS, /company/COMPANY_ID or /cluster/CLUSTER_ID, with an optional limit parameter.
+    """
+    from entity_resolution.query import ClusterIndex, ClusterIndexServer
+
+    server = ClusterIndexServer((host, port), ClusterIndex(index_path))
+    logging.info(f"Serving cluster lookups on http://{host}:{port}...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
 
 
 @app.command("view_er_in_browser")
@@ -109,6 +564,52 @@ def view_er_in_browser(
     typer.launch(DEFAULT_GH_PAGES_PATH)
 
 
+@app.command("run_standin_server")
+def run_standin_server(
+    host: str = typer.Option(
+        default="127.0.0.1", help="Provide the host to listen on."
+    ),
+    port: int = typer.Option(default=8080, help="Provide the port to listen on."),
+    latency: float = typer.Option(
+        default=0.0, help="Provide the mean response latency in seconds."
+    ),
+    error_rate: float = typer.Option(
+        default=0.0, help="Provide the share of requests (0-1) answered with a 503."
+    ),
+    companies: int = typer.Option(
+        default=1000, help="Provide the number of synthetic companies to serve."
+    ),
+    capacity: Optional[int] = typer.Option(
+        default=None,
+        help="Provide the number of requests served concurrently at the mean latency. Beyond it latency grows with load, and beyond twice it requests get a 503.",
+    ),
+    replay_store_path: Optional[str] = typer.Option(
+        default=None,
+        help="Provide a replay store to serve recorded responses instead of synthetic data.",
+    ),
+):
+    """
+    Run a local stand-in server for the North Dakota SOS API, for offline crawler tests and load tests.
+    Point the crawler at it with run_crawler --source-base-url http://HOST:PORT.
+    """
+    from web_crawler.replay import ReplayStore
+    from web_crawler.standin import StandInServer, SyntheticRegistry
+
+    server = StandInServer(
+        (host, port),
+        registry=SyntheticRegistry(companies=companies),
+        replay_store=ReplayStore(replay_store_path) if replay_store_path else None,
+        latency=latency,
+        error_rate=error_rate,
+        capacity=capacity,
+    )
+    logging.info(f"Serving the stand-in API on http://{host}:{port}...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
 def main():
     """
     Main entry point for the CLI application.
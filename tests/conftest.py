@@ -0,0 +1,81 @@
+import multiprocessing
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from web_crawler.sharding import crawl_prefix
+from web_crawler.standin import StandInServer, SyntheticRegistry
+
+STANDIN_COMPANIES = 1000
+
+
+@contextmanager
+def serve_standin(**kwargs):
+    """
+    Run a stand-in server on a free port in a thread and yield its base URL.
+
+    Parameters:
+    - kwargs: The StandInServer arguments, a synthetic registry of STANDIN_COMPANIES by default.
+    """
+    kwargs.setdefault("registry", SyntheticRegistry(companies=STANDIN_COMPANIES))
+    server = StandInServer(("127.0.0.1", 0), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def standin_url():
+    with serve_standin() as url:
+        yield url
+
+
+@pytest.fixture
+def run_crawl(standin_url, monkeypatch):
+    """
+    Return a function crawling a prefix of the stand-in server into a feed. Every crawl runs in a
+    fresh process, as a Twisted reactor cannot be restarted within a process.
+    """
+    monkeypatch.setenv("SCRAPY_SETTINGS_MODULE", "web_crawler.settings")
+
+    def crawl(
+        prefix: str,
+        feed_path: str,
+        feed_format: str = "jsonlines",
+        spider_kwargs: dict = None,
+        settings_overrides: dict = None,
+    ) -> None:
+        process = multiprocessing.get_context("spawn").Process(
+            target=crawl_prefix,
+            args=(
+                prefix,
+                str(feed_path),
+                feed_format,
+                spider_kwargs or {},
+                {"SOURCE_BASE_URL": standin_url, **(settings_overrides or {})},
+            ),
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+    return crawl
+
+
+def read_feed_records(path) -> dict[str, dict]:
+    """
+    Return the records of a jsonlines feed by company_id, without their retrieval time.
+    """
+    from web_crawler.sharding import read_feed
+
+    return {
+        record["company_id"]: {
+            key: value for key, value in record.items() if key != "retrieved_at"
+        }
+        for record in read_feed(str(path), "jsonlines")
+    }
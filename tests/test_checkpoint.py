@@ -0,0 +1,80 @@
+import csv
+import json
+
+import pytest
+
+from web_crawler.checkpoint import CrawlCheckpoint
+from web_crawler.sharding import read_feed
+from web_crawler.standin import SyntheticRegistry
+
+from tests.conftest import STANDIN_COMPANIES
+
+
+def feed_company_ids(path, feed_format: str = "jsonlines") -> list[str]:
+    return [record["company_id"] for record in read_feed(str(path), feed_format)]
+
+
+def rewrite_feed(path, feed_format: str, records: list[dict]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as feed:
+        if feed_format == "csv":
+            writer = csv.DictWriter(feed, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            feed.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def test_resumed_incremental_crawl_exports_stored_items(tmp_path, run_crawl):
+    state_kwargs = {"state_path": str(tmp_path / "state.sqlite"), "ttl_hours": 24}
+    run_crawl("A", tmp_path / "first.jsonl", spider_kwargs=state_kwargs)
+    listing = SyntheticRegistry(companies=STANDIN_COMPANIES).search("A")["rows"]
+    assert sorted(feed_company_ids(tmp_path / "first.jsonl")) == sorted(listing)
+
+    # A crawl interrupted right after saving its search listing
+    job_dir = tmp_path / "jobs"
+    checkpoint = CrawlCheckpoint(str(job_dir / "A.sqlite"))
+    checkpoint.save_listing("A", listing)
+    checkpoint.close()
+
+    # Every company is unchanged, so the resumed crawl exports the stored items
+    run_crawl(
+        "A",
+        tmp_path / "resumed.jsonl",
+        spider_kwargs={**state_kwargs, "job_dir": str(job_dir)},
+    )
+    assert sorted(feed_company_ids(tmp_path / "resumed.jsonl")) == sorted(listing)
+    checkpoint = CrawlCheckpoint(str(job_dir / "A.sqlite"))
+    assert checkpoint.counts() == (len(listing), len(listing))
+    checkpoint.close()
+
+
+@pytest.mark.parametrize("feed_format", ["jsonlines", "csv"])
+def test_resumed_crawl_reconciles_checkpoint_with_feed(
+    tmp_path, run_crawl, feed_format
+):
+    job_dir = tmp_path / "jobs"
+    feed_path = tmp_path / f"A.{feed_format}"
+    run_crawl("A", feed_path, feed_format, spider_kwargs={"job_dir": str(job_dir)})
+    records = list(read_feed(str(feed_path), feed_format))
+    listing = sorted(record["company_id"] for record in records)
+
+    # A hard kill after the checkpoint committed completions the feed did not flush, before it
+    # committed completions the feed did flush, and in the middle of writing a record
+    rewrite_feed(feed_path, feed_format, records[:-5])
+    checkpoint = CrawlCheckpoint(str(job_dir / "A.sqlite"))
+    with checkpoint.connection:
+        checkpoint.connection.executemany(
+            "UPDATE companies SET completed = 0 WHERE company_id = ?",
+            ((record["company_id"],) for record in records[-10:-5]),
+        )
+    checkpoint.close()
+    with open(feed_path, "a", encoding="utf-8") as feed:
+        feed.write(
+            '"1234","partial' if feed_format == "csv" else '{"company_id": "1234"'
+        )
+
+    run_crawl("A", feed_path, feed_format, spider_kwargs={"job_dir": str(job_dir)})
+    assert sorted(feed_company_ids(feed_path, feed_format)) == listing
+    checkpoint = CrawlCheckpoint(str(job_dir / "A.sqlite"))
+    assert checkpoint.counts() == (len(listing), len(listing))
+    checkpoint.close()
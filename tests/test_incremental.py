@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_registry import generate_registry
+from entity_resolution.er import EntityResolutionRunner
+from entity_resolution.incremental import IncrementalResolver
+
+COMPANIES = 2000
+DELTA_SIZE = COMPANIES // 50
+
+
+def add_companies(old: pd.DataFrame) -> pd.DataFrame:
+    added = generate_registry(DELTA_SIZE, seed=7)
+    added["company_id"] = "9" + added["company_id"]
+    return pd.concat([old, added], ignore_index=True)
+
+
+def remove_companies(old: pd.DataFrame) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    return old.drop(rng.choice(old.index, DELTA_SIZE, replace=False))
+
+
+def change_companies(old: pd.DataFrame) -> pd.DataFrame:
+    # Half of the changed companies move to the address of another company, the other half
+    # switch to the registered agent of another company
+    new = old.copy()
+    rng = np.random.default_rng(1)
+    moved = rng.choice(old.index, DELTA_SIZE // 2, replace=False)
+    new.loc[moved, "principal_address"] = (
+        old["principal_address"].sample(len(moved), random_state=2).to_numpy()
+    )
+    agents = old["registered_agent"].dropna()
+    switched = rng.choice(
+        agents.index.difference(moved), DELTA_SIZE // 2, replace=False
+    )
+    new.loc[switched, "registered_agent"] = agents.sample(
+        len(switched), random_state=3
+    ).to_numpy()
+    return new
+
+
+DELTAS = {
+    "added": add_companies,
+    "removed": remove_companies,
+    "changed": change_companies,
+}
+
+
+def partition(clusters: pd.DataFrame) -> set[frozenset]:
+    """
+    Return the clusters as sets of company_ids, regardless of their cluster_id.
+    """
+    return set(clusters.groupby("cluster_id")["company_id"].agg(frozenset))
+
+
+def resolve(tmp_path, old: pd.DataFrame, new: pd.DataFrame, threshold: float):
+    """
+    Resolve the new snapshot by applying its delta to the state of the old one, and in full with
+    EntityResolutionRunner. Returns both partitions and the change report.
+    """
+    old_path, new_path = str(tmp_path / "old.csv"), str(tmp_path / "new.csv")
+    old.to_csv(old_path, index=False)
+    new.to_csv(new_path, index=False)
+
+    resolver = IncrementalResolver(str(tmp_path / "er_state.sqlite"), threshold)
+    try:
+        clusters, _, changes = resolver.resolve(old_path, new_path)
+    finally:
+        resolver.store.close()
+
+    full_path = str(tmp_path / "full.csv")
+    EntityResolutionRunner(
+        new_path,
+        str(tmp_path / "plot.html"),
+        full_path,
+        fuzzy_threshold=threshold,
+        gh_pages_path=None,
+    ).run_er()
+    full = pd.read_csv(full_path, dtype={"company_id": str})
+    return partition(clusters), partition(full), changes
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.9])
+@pytest.mark.parametrize("delta", list(DELTAS))
+def test_incremental_resolution_matches_full_run(tmp_path, delta, threshold):
+    old = generate_registry(COMPANIES, seed=0)
+    new = DELTAS[delta](old)
+    incremental, full, changes = resolve(tmp_path, old, new, threshold)
+
+    assert incremental == full
+    common = old.index.intersection(new.index)
+    expected = {
+        "added": len(new) - len(common),
+        "removed": len(old) - len(common),
+        "changed": int(
+            (
+                old.loc[common, ["principal_address", "registered_agent"]].fillna("")
+                != new.loc[common, ["principal_address", "registered_agent"]].fillna("")
+            )
+            .any(axis=1)
+            .sum()
+        ),
+    }
+    assert expected[delta] > 0
+    assert {kind: changes[kind] for kind in expected} == expected
+
+
+@pytest.mark.xfail(
+    strict=True,
+    reason="TF-IDF weights are computed over the rematched blocks only, so pairs scored "
+    "close to the threshold can be linked differently than in a full run",
+)
+def test_incremental_resolution_diverges_near_threshold(tmp_path):
+    old = generate_registry(COMPANIES, seed=0)
+    incremental, full, _ = resolve(tmp_path, old, add_companies(old), 0.7)
+    assert incremental == full
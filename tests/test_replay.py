@@ -0,0 +1,43 @@
+import json
+
+from web_crawler.replay import ReplayStore
+from web_crawler.spiders.helpers.constants import RECORDED_API_PATHS
+
+from tests.conftest import read_feed_records, serve_standin
+
+
+def test_recorded_crawl_replays_in_process_and_from_standin(tmp_path, run_crawl):
+    store_path = str(tmp_path / "api_responses.sqlite")
+    run_crawl(
+        "A",
+        tmp_path / "live.jsonl",
+        settings_overrides={"REPLAY_MODE": "record", "REPLAY_STORE_PATH": store_path},
+    )
+    live = read_feed_records(tmp_path / "live.jsonl")
+    assert live
+
+    # The stand-in gzips its responses, but they are recorded decompressed
+    store = ReplayStore(store_path)
+    for api_path in RECORDED_API_PATHS:
+        for _, body in store.recorded(api_path):
+            json.loads(body)
+    for (headers,) in store.connection.execute("SELECT headers FROM responses"):
+        assert "Content-Encoding" not in json.loads(headers)
+
+    run_crawl(
+        "A",
+        tmp_path / "replayed.jsonl",
+        settings_overrides={
+            "REPLAY_MODE": "replay",
+            "REPLAY_STORE_PATH": store_path,
+            "SOURCE_BASE_URL": "http://127.0.0.1:9",
+        },
+    )
+    assert read_feed_records(tmp_path / "replayed.jsonl") == live
+
+    with serve_standin(replay_store=store) as url:
+        run_crawl(
+            "A", tmp_path / "served.jsonl", settings_overrides={"SOURCE_BASE_URL": url}
+        )
+    store.close()
+    assert read_feed_records(tmp_path / "served.jsonl") == live
@@ -0,0 +1,27 @@
+import scrapy
+from scrapy.http import Response
+from scrapy.utils.test import get_crawler
+
+from web_crawler.middlewares import CustomRetryMiddleware
+
+
+def test_retry_delay_is_capped_per_host():
+    crawler = get_crawler(
+        settings_dict={
+            "RETRY_BACKOFF_MAX_DELAY": 60,
+            "RETRY_BACKOFF_HOST_MAX_DELAY": {"flaky.example:8080": 5},
+        }
+    )
+    middleware = CustomRetryMiddleware.from_crawler(crawler)
+
+    def retry_delay(url: str, retry_times: int, retry_after: str = None) -> float:
+        request = scrapy.Request(url, meta={"retry_times": retry_times})
+        headers = {"Retry-After": retry_after} if retry_after else {}
+        response = Response(url, status=503, headers=headers, request=request)
+        return middleware.get_retry_delay(request, response)
+
+    assert retry_delay("http://flaky.example:8080/a", 10) == 5
+    assert retry_delay("http://flaky.example:8080/a", 0, retry_after="120") == 5
+    assert retry_delay("http://other.example/a", 10) == 60
+    assert retry_delay("http://other.example/a", 0, retry_after="30") >= 29
+    assert retry_delay("http://other.example/a", 0, retry_after="120") == 60
@@ -0,0 +1,279 @@
+import csv
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Iterator, Optional
+
+# A Parquet or JSON array feed cannot be appended to, so resumed crawls need a line-based feed
+RESUMABLE_FEED_FORMATS = ("csv", "jsonlines", "jl")
+
+logger = logging.getLogger(__name__)
+
+
+def checkpoint_path(job_dir: str, search_param: str) -> str:
+    """
+    Return the path of the checkpoint of the crawl of search_param in a job directory.
+
+    Parameters:
+    - job_dir: The job directory.
+    - search_param: The search parameter of the crawl.
+    """
+    return os.path.join(job_dir, f"{search_param}.sqlite")
+
+
+def exported_company_ids(feed_path: str, feed_format: str) -> set[str]:
+    """
+    Return the company_ids of the complete records of a csv or jsonlines feed. A last record cut
+    off by a hard kill is truncated, so that a resumed crawl appends after the last complete one.
+
+    Parameters:
+    - feed_path: The path of the feed.
+    - feed_format: The feed format, one of RESUMABLE_FEED_FORMATS.
+    """
+    company_ids = set()
+    if not os.path.exists(feed_path):
+        return company_ids
+    offset = complete_size = 0
+    with open(feed_path, "rb") as feed:
+
+        def lines() -> Iterator[str]:
+            # csv.reader pulls the lines of one record at a time, so offset ends every record
+            nonlocal offset
+            for line in feed:
+                if not line.endswith(b"\n"):
+                    # The last line was cut off before its terminator
+                    return
+                offset += len(line)
+                yield line.decode("utf-8", "replace")
+
+        try:
+            if feed_format == "csv":
+                records = csv.reader(lines(), strict=True)
+                header = next(records, [])
+                if "company_id" in header:
+                    complete_size = offset
+                    for record in records:
+                        if len(record) != len(header):
+                            break
+                        company_ids.add(record[header.index("company_id")])
+                        complete_size = offset
+            else:
+                for line in lines():
+                    if line.strip():
+                        company_ids.add(str(json.loads(line)["company_id"]))
+                    complete_size = offset
+        except (csv.Error, ValueError, KeyError):
+            # A record cut off inside a quoted field, or a malformed line
+            pass
+    if complete_size < os.path.getsize(feed_path):
+        logger.warning(
+            f"Truncating {os.path.getsize(feed_path) - complete_size} bytes of an incomplete "
+            f"record at the end of {feed_path}"
+        )
+        os.truncate(feed_path, complete_size)
+    return company_ids
+
+
+def resumed_feed_options(
+    feed_path: str, feed_format: str, job_dir: str, search_param: str
+) -> dict:
+    """
+    Return the FEEDS options of a resumable crawl, appending to the feed of the interrupted crawl
+    without repeating the CSV header line. A saved checkpoint is first reconciled with the feed, so
+    that the resumed crawl neither repeats nor drops companies after a hard kill.
+
+    Parameters:
+    - feed_path: The path of the feed.
+    - feed_format: The feed format, one of RESUMABLE_FEED_FORMATS.
+    - job_dir: The job directory of the crawl checkpoints.
+    - search_param: The search parameter of the crawl.
+    """
+    path = checkpoint_path(job_dir, search_param)
+    if os.path.exists(path):
+        checkpoint = CrawlCheckpoint(path)
+        try:
+            if checkpoint.is_listed(search_param):
+                checkpoint.reconcile(exported_company_ids(feed_path, feed_format))
+        finally:
+            checkpoint.close()
+    options = {"format": feed_format, "overwrite": False}
+    if feed_format == "csv" and os.path.exists(feed_path):
+        options["item_export_kwargs"] = {
+            "include_headers_line": os.path.getsize(feed_path) == 0
+        }
+    return options
+
+
+class CrawlCheckpoint:
+    """
+    Local SQLite checkpoint of a resumable crawl of one search_param.
+
+    It keeps every company of the search listing, its owner status once known and whether its item
+    was scraped, so that a crawl stopped by an error resumes with the remaining companies only,
+    without repeating the search request or the requests of completed companies.
+    """
+
+    def __init__(self, path: str, commit_every: int = 100) -> None:
+        """
+        Open (or create) the checkpoint.
+
+        Parameters:
+        - path: The path of the SQLite database file.
+        - commit_every: The number of updates between commits.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS companies (
+                company_id TEXT PRIMARY KEY,
+                company_meta_info TEXT NOT NULL,
+                owner_status TEXT,
+                completed INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS listing (search_param TEXT PRIMARY KEY)"
+        )
+        self.connection.commit()
+        self.commit_every = commit_every
+        self.pending_writes = 0
+
+    def is_listed(self, search_param: str) -> bool:
+        """
+        Return whether the search listing of search_param was saved, i.e. whether the crawl resumes.
+
+        Parameters:
+        - search_param: The search parameter of the crawl.
+        """
+        row = self.connection.execute(
+            "SELECT 1 FROM listing WHERE search_param = ?", (search_param,)
+        ).fetchone()
+        return row is not None
+
+    def save_listing(self, search_param: str, companies: dict[str, dict]) -> None:
+        """
+        Save the companies of the search listing of search_param in one transaction.
+
+        Parameters:
+        - search_param: The search parameter of the crawl.
+        - companies: The search-listing row of every company to crawl, by company_id.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO companies (company_id, company_meta_info) VALUES (?, ?)",
+                (
+                    (str(company_id), json.dumps(company_meta_info))
+                    for company_id, company_meta_info in companies.items()
+                ),
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO listing VALUES (?)", (search_param,)
+            )
+
+    def remaining(self) -> Iterator[tuple[str, dict]]:
+        """
+        Yield the company_id and search-listing row of every listed company that is not completed,
+        in listing order.
+        """
+        rows = self.connection.execute(
+            "SELECT company_id, company_meta_info FROM companies WHERE completed = 0 ORDER BY rowid"
+        ).fetchall()
+        for company_id, company_meta_info in rows:
+            yield company_id, json.loads(company_meta_info)
+
+    def reconcile(self, exported: set[str]) -> None:
+        """
+        Mark exactly the companies whose item is in the feed as completed. Completions are
+        committed in batches and feeds are buffered, so after a hard kill the feed can hold
+        companies that are still pending, or lack completed ones.
+
+        Parameters:
+        - exported: The company_ids of the items in the feed.
+        """
+        with self.connection:
+            self.connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS exported (company_id TEXT PRIMARY KEY)"
+            )
+            self.connection.execute("DELETE FROM exported")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO exported VALUES (?)",
+                ((company_id,) for company_id in exported),
+            )
+            pending, lost = self.connection.execute(
+                """
+                SELECT
+                    COALESCE(SUM(completed = 0 AND company_id IN exported), 0),
+                    COALESCE(SUM(completed = 1 AND company_id NOT IN exported), 0)
+                FROM companies
+                """
+            ).fetchone()
+            self.connection.execute(
+                "UPDATE companies SET completed = company_id IN exported"
+            )
+        if pending or lost:
+            logger.warning(
+                f"Reconciled the checkpoint with the feed: {pending} exported companies were "
+                f"pending, {lost} completed companies were missing from the feed"
+            )
+
+    def counts(self) -> tuple[int, int]:
+        """
+        Return the number of listed and of completed companies.
+        """
+        return self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM companies"
+        ).fetchone()
+
+    def get_owner_status(self, company_id: str) -> Optional[str]:
+        """
+        Return the saved owner status of a company, if any.
+
+        Parameters:
+        - company_id: The id of the company.
+        """
+        row = self.connection.execute(
+            "SELECT owner_status FROM companies WHERE company_id = ?",
+            (str(company_id),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def save_owner_status(self, company_id: str, owner_status: str) -> None:
+        """
+        Save the owner status of a company.
+
+        Parameters:
+        - company_id: The id of the company.
+        - owner_status: The owner status returned by the API.
+        """
+        self.update(
+            "UPDATE companies SET owner_status = ? WHERE company_id = ?",
+            (owner_status, str(company_id)),
+        )
+
+    def complete(self, company_id: str) -> None:
+        """
+        Mark a company as completed once its item is scraped.
+
+        Parameters:
+        - company_id: The id of the company.
+        """
+        self.update(
+            "UPDATE companies SET completed = 1 WHERE company_id = ?",
+            (str(company_id),),
+        )
+
+    def update(self, statement: str, parameters: tuple) -> None:
+        self.connection.execute(statement, parameters)
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,260 @@
+import bisect
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.log import LogCounterHandler
+
+from web_crawler.spiders.helpers.constants import RECORDED_API_PATHS
+
+# Upper bounds in seconds of the latency histogram buckets; slower responses fall in a last bucket
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Return the API endpoint of a URL: its known API path without ids, or its path otherwise.
+
+    Parameters:
+    - url: The request URL.
+    """
+    path = urlsplit(url).path
+    for api_path in RECORDED_API_PATHS:
+        if path.startswith(api_path):
+            return api_path
+    return path
+
+
+class EndpointMetrics:
+    """
+    Latency histogram, response statuses and retries of the requests to one endpoint.
+    """
+
+    def __init__(self) -> None:
+        self.requests: int = 0
+        self.retries: int = 0
+        self.error_responses: int = 0
+        self.statuses: dict[str, int] = {}
+        self.buckets: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_seconds: float = 0.0
+        self.max_seconds: float = 0.0
+
+    def add_response(self, status: int, latency: Optional[float]) -> None:
+        """
+        Record a response and its download latency.
+
+        Parameters:
+        - status: The HTTP status of the response.
+        - latency: The seconds between the request reaching the downloader and the response,
+          if known.
+        """
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if latency is not None:
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            self.total_seconds += latency
+            self.max_seconds = max(self.max_seconds, latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the upper bound of the histogram bucket containing the q-quantile latency.
+
+        Parameters:
+        - q: The quantile, between 0 and 1.
+        """
+        observed = sum(self.buckets)
+        if not observed:
+            return None
+        rank, seen = q * observed, 0
+        for upper_bound, count in zip(
+            (*LATENCY_BUCKETS, self.max_seconds), self.buckets
+        ):
+            seen += count
+            if seen >= rank:
+                return round(upper_bound, 4)
+        return round(self.max_seconds, 4)
+
+    def to_dict(self) -> dict:
+        observed = sum(self.buckets)
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "error_responses": self.error_responses,
+            "statuses": self.statuses,
+            "latency": {
+                "mean_seconds": round(self.total_seconds / observed, 4)
+                if observed
+                else None,
+                "p50_seconds": self.quantile(0.5),
+                "p95_seconds": self.quantile(0.95),
+                "max_seconds": round(self.max_seconds, 4),
+                "histogram": {
+                    **{
+                        f"le_{upper_bound}": count
+                        for upper_bound, count in zip(LATENCY_BUCKETS, self.buckets)
+                    },
+                    "inf": self.buckets[-1],
+                },
+            },
+        }
+
+
+class CrawlMetrics:
+    """
+    Scrapy extension recording per-endpoint latency histograms, statuses and retries, items
+    per second and requests in flight in the downloader.
+
+    A summary is logged every METRICS_INTERVAL seconds and when the spider closes, and the
+    metrics are written as JSON to METRICS_PATH if set. The path may contain %(name)s and spider
+    attribute placeholders such as %(search_param)s, like feed URIs.
+    """
+
+    def __init__(self, crawler) -> None:
+        self.crawler = crawler
+        self.path: Optional[str] = crawler.settings.get("METRICS_PATH")
+        self.interval: float = crawler.settings.getfloat("METRICS_INTERVAL", 60.0)
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+        self.items: int = 0
+        self.started_at: Optional[float] = None
+        self.task = None
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            self.request_reached_downloader, signal=signals.request_reached_downloader
+        )
+        crawler.signals.connect(
+            self.request_left_downloader, signal=signals.request_left_downloader
+        )
+        crawler.signals.connect(
+            self.response_received, signal=signals.response_received
+        )
+        crawler.signals.connect(self.item_scraped, signal=signals.item_scraped)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("METRICS_ENABLED", True):
+            raise NotConfigured
+        return cls(crawler)
+
+    def endpoint(self, request) -> EndpointMetrics:
+        return self.endpoints.setdefault(endpoint_name(request.url), EndpointMetrics())
+
+    def spider_opened(self, spider):
+        from twisted.internet import task
+
+        self.started_at = time.monotonic()
+        if self.interval:
+            self.task = task.LoopingCall(self.log_summary)
+            self.task.start(self.interval, now=False)
+
+    def request_reached_downloader(self, request, spider):
+        request.meta["download_started_at"] = time.monotonic()
+        endpoint = self.endpoint(request)
+        endpoint.requests += 1
+        if request.meta.get("retry_times"):
+            endpoint.retries += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def request_left_downloader(self, request, spider):
+        self.in_flight -= 1
+
+    def response_received(self, response, request, spider):
+        started_at = request.meta.get("download_started_at")
+        latency = None if started_at is None else time.monotonic() - started_at
+        self.endpoint(request).add_response(response.status, latency)
+        if response.status >= 400:
+            self.endpoint(request).error_responses += 1
+
+    def item_scraped(self, item, response, spider):
+        self.items += 1
+
+    def to_dict(self) -> dict:
+        """
+        Return the metrics of the crawl as a JSON-serializable dict.
+        """
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "items": self.items,
+            "items_per_second": round(self.items / elapsed, 3) if elapsed else None,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "retries": self.crawler.stats.get_value("retry/count", 0),
+            "endpoints": {
+                name: endpoint.to_dict() for name, endpoint in self.endpoints.items()
+            },
+        }
+
+    def log_summary(self) -> None:
+        metrics = self.to_dict()
+        endpoints = "; ".join(
+            f"{name}: {endpoint['requests']} requests, p95 {endpoint['latency']['p95_seconds']}s"
+            for name, endpoint in metrics["endpoints"].items()
+        )
+        logger.info(
+            f"Crawled {metrics['items']} items ({metrics['items_per_second']}/s), "
+            f"{metrics['in_flight']} requests in flight, {metrics['retries']} retries. "
+            f"{endpoints}"
+        )
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.log_summary()
+        if self.path:
+            path = Path(self.path % {"name": spider.name, **vars(spider)})
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                json.dumps(
+                    {"spider": spider.name, "reason": reason, **self.to_dict()},
+                    indent=2,
+                    default=str,
+                )
+            )
+            logger.info(f"Wrote crawl metrics to {path}")
+
+
+class RichLogging:
+    """
+    Scrapy extension replacing the handlers of the root logger with a rich console handler at
+    INFO level when a crawler starts.
+
+    It runs when the crawler is created rather than when the settings are imported, so that
+    importing the project settings has no logging side effects. Scrapy's LogCounterHandler is
+    kept, as it records the log_count/<level> stats of the crawl.
+    """
+
+    def __init__(self) -> None:
+        from rich.console import Console
+        from rich.logging import RichHandler
+
+        rich_handler = RichHandler(
+            markup=True,
+            console=Console(width=255, color_system="auto"),
+        )
+
+        # Customize the log format with a time format
+        rich_handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+        rich_handler.setLevel(logging.INFO)
+
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers[:]:
+            if not isinstance(handler, LogCounterHandler):
+                root_logger.removeHandler(handler)
+        root_logger.setLevel(logging.INFO)
+        root_logger.addHandler(rich_handler)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("RICH_LOGGING_ENABLED", True):
+            raise NotConfigured
+        return cls()
@@ -3,7 +3,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 
-@dataclass
+# Slotted, as a crawl allocates one item per company
+@dataclass(slots=True)
 class CompanyInfoItem:
     company_id: str
     company_name: str
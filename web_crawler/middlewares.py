@@ -1,11 +1,304 @@
+import random
 import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+
+from scrapy import signals
 from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from scrapy.exceptions import DontCloseSpider, IgnoreRequest, NotConfigured
+from scrapy.utils.response import response_status_message
+
+from web_crawler.extensions import endpoint_name
 
 
 class CustomRetryMiddleware(RetryMiddleware):
-    def _retry(self, request, reason, spider):
+    """
+    Retry middleware with jittered exponential backoff that does not block the reactor.
+
+    Instead of sleeping, a retried request is handed back to the engine after its delay
+    through the reactor, so other downloads continue meanwhile. Retry-After headers are
+    honoured, and a Retry-After from one host delays every pending retry to that host.
+    The delays of a host are capped at its RETRY_BACKOFF_HOST_MAX_DELAY entry, or else at
+    RETRY_BACKOFF_MAX_DELAY.
+    """
+
+    def __init__(self, crawler) -> None:
+        super().__init__(crawler.settings)
+        self.crawler = crawler
+        self.base_delay: float = crawler.settings.getfloat(
+            "RETRY_BACKOFF_BASE_DELAY", 1.0
+        )
+        self.max_delay: float = crawler.settings.getfloat(
+            "RETRY_BACKOFF_MAX_DELAY", 60.0
+        )
+        self.host_max_delay: dict[str, float] = {
+            host: float(max_delay)
+            for host, max_delay in crawler.settings.getdict(
+                "RETRY_BACKOFF_HOST_MAX_DELAY"
+            ).items()
+        }
+        self.jitter: float = crawler.settings.getfloat("RETRY_BACKOFF_JITTER", 0.5)
+        self.host_retry_after: dict[str, float] = {}
+        self.delayed_calls: set = set()
+        crawler.signals.connect(self.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_response(self, request, response, spider):
+        if request.meta.get("dont_retry", False):
+            return response
+        if response.status in self.retry_http_codes:
+            reason = response_status_message(response.status)
+            return self._retry(request, reason, spider, response) or response
+        return response
+
+    def _retry(self, request, reason, spider, response=None):
+        retry_request = super()._retry(request, reason, spider)
+        if retry_request is None:
+            return None
+
+        retry_delay = self.get_retry_delay(request, response)
+        if retry_delay <= 0:
+            return retry_request
+
+        spider.logger.info(f"Retrying {request.url} in {retry_delay:.2f} seconds...")
+        self.schedule(retry_request, retry_delay)
+        raise IgnoreRequest(f"Retry of {request.url} scheduled in {retry_delay:.2f}s")
+
+    def get_retry_delay(self, request, response=None) -> float:
+        """
+        Return the delay before retrying a request: a jittered exponential backoff,
+        extended to any Retry-After given by the host, capped at the maximum delay of the host.
+
+        Parameters:
+        - request: The request that failed.
+        - response: The response that triggered the retry, if any.
+        """
         retry_times = request.meta.get("retry_times", 0)
-        retry_delay = 2**retry_times
-        spider.logger.info(f"Retrying in {retry_delay} seconds...")
-        time.sleep(retry_delay)
-        return super()._retry(request, reason, spider)
+        backoff = self.base_delay * 2**retry_times
+        retry_delay = backoff * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        host = urlparse(request.url).netloc
+        now = time.monotonic()
+        retry_after = self.parse_retry_after(response)
+        if retry_after is not None:
+            self.host_retry_after[host] = max(
+                self.host_retry_after.get(host, now), now + retry_after
+            )
+        host_wait = self.host_retry_after.get(host, now) - now
+        max_delay = self.host_max_delay.get(host, self.max_delay)
+        return min(max(retry_delay, host_wait), max_delay)
+
+    @staticmethod
+    def parse_retry_after(response) -> Optional[float]:
+        """
+        Return the number of seconds requested by a Retry-After header, if any.
+
+        Parameters:
+        - response: The response to read the header from.
+        """
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        value = value.decode("latin-1").strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_at.timestamp() - time.time(), 0.0)
+
+    def schedule(self, request, delay: float) -> None:
+        """
+        Hand the request back to the engine after delay seconds, without blocking the reactor.
+
+        Parameters:
+        - request: The request to schedule.
+        - delay: The delay in seconds.
+        """
+        from twisted.internet import reactor
+
+        def crawl():
+            self.delayed_calls.discard(delayed_call)
+            self.crawler.engine.crawl(request)
+
+        delayed_call = reactor.callLater(delay, crawl)
+        self.delayed_calls.add(delayed_call)
+
+    def spider_idle(self, spider):
+        # Keep the spider open while retries are waiting for their backoff
+        if self.delayed_calls:
+            raise DontCloseSpider
+
+    def spider_closed(self, spider):
+        for delayed_call in self.delayed_calls:
+            if delayed_call.active():
+                delayed_call.cancel()
+        self.delayed_calls.clear()
+
+
+class EndpointConcurrency:
+    """
+    Adaptive concurrency of the requests to one endpoint. Per round trip, it is raised by one
+    while the smoothed latency stays close to the lowest seen and lowered by one while it is
+    above latency_tolerance times that; it is halved on errors.
+    """
+
+    def __init__(
+        self, concurrency: int, max_concurrency: int, latency_tolerance: float
+    ) -> None:
+        """
+        Initialize the EndpointConcurrency.
+
+        Parameters:
+        - concurrency: The initial number of concurrent requests.
+        - max_concurrency: The maximum number of concurrent requests.
+        - latency_tolerance: The ratio of the smoothed latency to the lowest latency seen
+          above which the endpoint is considered congested.
+        """
+        self.concurrency: float = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.min_latency: Optional[float] = None
+        self.smoothed_latency: Optional[float] = None
+        self.backed_off_at: float = 0.0
+
+    def add_latency(self, latency: float) -> None:
+        """
+        Adapt the concurrency to the latency of a successful response.
+
+        Parameters:
+        - latency: The download latency of the response in seconds.
+        """
+        self.smoothed_latency = (
+            latency
+            if self.smoothed_latency is None
+            else 0.8 * self.smoothed_latency + 0.2 * latency
+        )
+        # The baseline is the lowest smoothed latency, as single responses are too noisy
+        self.min_latency = min(
+            self.min_latency or self.smoothed_latency, self.smoothed_latency
+        )
+        if self.smoothed_latency > self.latency_tolerance * self.min_latency:
+            self.concurrency = max(self.concurrency - 1 / self.concurrency, 1.0)
+        else:
+            self.concurrency = min(
+                self.concurrency + 1 / self.concurrency, self.max_concurrency
+            )
+
+    def add_error(self) -> None:
+        """
+        Halve the concurrency after an error response or a failed download, at most once
+        per round trip so that a burst of errors does not collapse it.
+        """
+        now = time.monotonic()
+        if now - self.backed_off_at < (self.smoothed_latency or 0.0):
+            return
+        self.backed_off_at = now
+        self.concurrency = max(self.concurrency / 2, 1.0)
+
+
+class EndpointThrottleMiddleware:
+    """
+    Downloader middleware that gives every API endpoint its own download slot and adapts the
+    concurrency of that slot to the latency and errors of the endpoint, like AutoThrottle
+    but per endpoint: the fast owner-status calls are not held back by slow filing details,
+    and an endpoint returning errors is slowed down before its retries run out.
+
+    The concurrency of every endpoint starts at CONCURRENT_REQUESTS_PER_DOMAIN and stays below
+    ENDPOINT_THROTTLE_MAX_CONCURRENCY; CONCURRENT_REQUESTS caps the total, and only binds if it
+    is below the number of endpoints times ENDPOINT_THROTTLE_MAX_CONCURRENCY.
+
+    Scrapy drops download slots idle for a minute and recreates them at
+    CONCURRENT_REQUESTS_PER_DOMAIN, so the adapted concurrency is also kept in the DOWNLOAD_SLOTS
+    settings of the downloader and applied again to the slot of every request.
+    """
+
+    def __init__(self, crawler) -> None:
+        self.crawler = crawler
+        self.start_concurrency: int = crawler.settings.getint(
+            "CONCURRENT_REQUESTS_PER_DOMAIN"
+        )
+        self.max_concurrency: int = crawler.settings.getint(
+            "ENDPOINT_THROTTLE_MAX_CONCURRENCY", 32
+        )
+        self.latency_tolerance: float = crawler.settings.getfloat(
+            "ENDPOINT_THROTTLE_LATENCY_TOLERANCE", 2.0
+        )
+        self.error_codes = set(crawler.settings.getlist("RETRY_HTTP_CODES") + [429])
+        self.endpoints: dict[str, EndpointConcurrency] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ENDPOINT_THROTTLE_ENABLED", True):
+            raise NotConfigured
+        return cls(crawler)
+
+    def process_request(self, request, spider):
+        slot_key = f"{urlparse(request.url).netloc}{endpoint_name(request.url)}"
+        slot_key = request.meta.setdefault("download_slot", slot_key)
+        endpoint = self.endpoints.get(slot_key)
+        if endpoint is not None:
+            self.apply(slot_key, endpoint)
+        return None
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get("download_latency")
+        if response.status in self.error_codes:
+            self.update(request, EndpointConcurrency.add_error)
+        elif response.status < 400 and latency is not None:
+            self.update(request, EndpointConcurrency.add_latency, latency)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self.update(request, EndpointConcurrency.add_error)
+        return None
+
+    def update(self, request, adapt, *args) -> None:
+        """
+        Adapt the concurrency of the endpoint of a request and apply it to its download slot.
+
+        Parameters:
+        - request: The request that completed.
+        - adapt: The EndpointConcurrency method adapting the concurrency.
+        - args: The arguments of adapt.
+        """
+        slot_key = request.meta.get("download_slot")
+        if slot_key is None:
+            return
+        endpoint = self.endpoints.setdefault(
+            slot_key,
+            EndpointConcurrency(
+                self.start_concurrency, self.max_concurrency, self.latency_tolerance
+            ),
+        )
+        adapt(endpoint, *args)
+        self.apply(slot_key, endpoint)
+        self.crawler.stats.set_value(
+            f"endpoint_throttle/{slot_key}/concurrency", int(endpoint.concurrency)
+        )
+
+    def apply(self, slot_key: str, endpoint: EndpointConcurrency) -> None:
+        """
+        Apply the concurrency of an endpoint to its download slot, and to the slot Scrapy
+        creates in its place once it was dropped for being idle.
+
+        Parameters:
+        - slot_key: The download slot of the endpoint.
+        - endpoint: The adaptive concurrency of the endpoint.
+        """
+        concurrency = int(endpoint.concurrency)
+        downloader = self.crawler.engine.downloader
+        downloader.per_slot_settings.setdefault(slot_key, {})[
+            "concurrency"
+        ] = concurrency
+        slot = downloader.slots.get(slot_key)
+        if slot is not None:
+            slot.concurrency = concurrency
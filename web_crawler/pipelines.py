@@ -0,0 +1,99 @@
+import logging
+import time
+
+from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingERPipeline:
+    """
+    Item pipeline resolving the crawled companies while the crawl runs.
+
+    Items are added to an entity_resolution.streaming.StreamingClusterer in batches of
+    STREAMING_ER_BATCH_SIZE, and the company -> cluster table and cluster stats are written to
+    STREAMING_ER_CLUSTER_PATH as soon as the spider closes, without reading the feed back.
+    It is enabled when STREAMING_ER_CLUSTER_PATH is set, and only fits single-process crawls:
+    every shard of a sharded crawl would only cluster its own companies.
+    """
+
+    def __init__(
+        self,
+        cluster_path: str,
+        batch_size: int,
+        fuzzy_threshold: float,
+        workers: int,
+    ) -> None:
+        """
+        Initialize the StreamingERPipeline.
+
+        Parameters:
+        - cluster_path: The path of the company -> cluster table (.csv or .parquet).
+        - batch_size: The number of items prepared and clustered at a time.
+        - fuzzy_threshold: The minimum similarity for linking similar addresses and names,
+          0 disables fuzzy matching.
+        - workers: The number of processes scoring fuzzy matching blocks.
+        """
+        # The ER stack is only imported when the pipeline is enabled
+        from entity_resolution.streaming import StreamingClusterer
+
+        self.cluster_path = cluster_path
+        self.batch_size = batch_size
+        self.fuzzy_threshold = fuzzy_threshold
+        self.workers = workers
+        self.clusterer = StreamingClusterer()
+        self.batch: list[list] = []
+        self.items = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.get("STREAMING_ER_CLUSTER_PATH"):
+            raise NotConfigured
+        return cls(
+            settings.get("STREAMING_ER_CLUSTER_PATH"),
+            settings.getint("STREAMING_ER_BATCH_SIZE", 1000),
+            settings.getfloat("STREAMING_ER_FUZZY_THRESHOLD", 0.0),
+            settings.getint("STREAMING_ER_WORKERS", 1),
+        )
+
+    def process_item(self, item, spider):
+        from entity_resolution.preparation import ER_COLUMNS
+
+        adapter = ItemAdapter(item)
+        # Empty strings are missing values, as they are once read back from a CSV feed
+        self.batch.append([adapter.get(column) or None for column in ER_COLUMNS])
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+        return item
+
+    def flush(self) -> None:
+        """
+        Prepare the buffered items and add them to the clusters.
+        """
+        import pandas as pd
+
+        from entity_resolution.preparation import ER_COLUMNS, prepare_entities
+
+        if not self.batch:
+            return
+        chunk = pd.DataFrame(self.batch, columns=ER_COLUMNS)
+        self.batch = []
+        self.clusterer.add_chunk(prepare_entities(chunk))
+        self.items += len(chunk)
+
+    def close_spider(self, spider):
+        from entity_resolution.clustering import write_cluster_tables
+
+        self.flush()
+        start = time.perf_counter()
+        clusters, cluster_stats = self.clusterer.clusters(
+            self.fuzzy_threshold, self.workers
+        )
+        write_cluster_tables(clusters, cluster_stats, self.cluster_path)
+        logger.info(
+            f"Resolved {self.items} crawled companies into {len(cluster_stats)} clusters "
+            f"in {time.perf_counter() - start:.2f}s after the crawl, "
+            f"written to {self.cluster_path}"
+        )
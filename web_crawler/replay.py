@@ -0,0 +1,222 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers, Response
+from scrapy.responsetypes import responsetypes
+
+from web_crawler.spiders.helpers.constants import RECORDED_API_PATHS
+
+# Headers describing the body as downloaded, not the decompressed body that is recorded
+UNRECORDED_HEADERS = (b"content-encoding", b"content-length")
+
+
+class ReplayStore:
+    """
+    Compact on-disk store of recorded API request/response pairs.
+
+    Entries are keyed by method, path and request body but not by host, so recordings of the
+    live site can be replayed in-process or served by the local stand-in server.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open (or create) the replay store.
+
+        Parameters:
+        - path: The path of the SQLite database file.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # The stand-in server reads from several threads, so access is serialized with a lock
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def key(method: str, url: str, body: bytes) -> str:
+        """
+        Return the store key of a request.
+
+        Parameters:
+        - method: The HTTP method.
+        - url: The request URL or path.
+        - body: The request body.
+        """
+        parts = urlsplit(url)
+        path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        return hashlib.sha1(
+            b"\n".join([method.upper().encode(), path.encode(), body or b""])
+        ).hexdigest()
+
+    @staticmethod
+    def is_recorded(url: str) -> bool:
+        """
+        Return whether the URL belongs to one of the recorded API endpoints.
+
+        Parameters:
+        - url: The request URL or path.
+        """
+        return urlsplit(url).path.startswith(RECORDED_API_PATHS)
+
+    def get(
+        self, method: str, url: str, body: bytes
+    ) -> Optional[tuple[int, dict, bytes]]:
+        """
+        Return the recorded (status, headers, body) of a request, or None if it was not recorded.
+
+        Parameters:
+        - method: The HTTP method.
+        - url: The request URL or path.
+        - body: The request body.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT status, headers, body FROM responses WHERE key = ?",
+                (self.key(method, url, body),),
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, body = row
+        return status, json.loads(headers), zlib.decompress(body)
+
+    def put(
+        self,
+        method: str,
+        url: str,
+        body: bytes,
+        status: int,
+        headers: dict,
+        response_body: bytes,
+    ) -> None:
+        """
+        Record the response of a request.
+
+        Parameters:
+        - method: The HTTP method.
+        - url: The request URL or path.
+        - body: The request body.
+        - status: The response status.
+        - headers: The response headers.
+        - response_body: The response body.
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.key(method, url, body),
+                    method.upper(),
+                    urlsplit(url).path,
+                    status,
+                    json.dumps(headers),
+                    zlib.compress(response_body, 6),
+                ),
+            )
+
+    def recorded(self, path_prefix: str) -> Iterator[tuple[str, bytes]]:
+        """
+        Yield the path and body of every recorded successful response of an endpoint.
+
+        Parameters:
+        - path_prefix: The path of the endpoint, e.g. FILING_DETAIL_API_PATH.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT path, body FROM responses WHERE path LIKE ? AND status = 200",
+                (f"{path_prefix}%",),
+            ).fetchall()
+        for path, body in rows:
+            yield path, zlib.decompress(body)
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+
+class ReplayMiddleware:
+    """
+    Downloader middleware that records API responses to a ReplayStore (REPLAY_MODE = "record")
+    or serves them from it without touching the network (REPLAY_MODE = "replay").
+
+    Responses are recorded once HttpCompressionMiddleware decompressed them, so the middleware
+    must come before it, and are stored without their Content-Encoding and Content-Length.
+    """
+
+    def __init__(self, mode: str, store: ReplayStore, stats) -> None:
+        self.mode = mode
+        self.store = store
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mode = crawler.settings.get("REPLAY_MODE")
+        if not mode:
+            raise NotConfigured
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid REPLAY_MODE: {mode}")
+        middleware = cls(
+            mode, ReplayStore(crawler.settings.get("REPLAY_STORE_PATH")), crawler.stats
+        )
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_request(self, request, spider):
+        # data: requests are answered in-process, so they are downloaded in replay mode too
+        if self.mode != "replay" or urlsplit(request.url).scheme == "data":
+            return None
+        if not ReplayStore.is_recorded(request.url):
+            # Stay offline: other requests, such as robots.txt, are answered as not found
+            return Response(url=request.url, status=404, request=request)
+        recorded = self.store.get(request.method, request.url, request.body)
+        if recorded is None:
+            self.stats.inc_value("replay/miss", spider=spider)
+            raise IgnoreRequest(
+                f"No recorded response for {request.method} {request.url}"
+            )
+        status, headers, body = recorded
+        self.stats.inc_value("replay/hit", spider=spider)
+        headers = Headers(headers)
+        response_class = responsetypes.from_args(
+            headers=headers, url=request.url, body=body
+        )
+        return response_class(
+            url=request.url, status=status, headers=headers, body=body, request=request
+        )
+
+    def process_response(self, request, response, spider):
+        if self.mode == "record" and ReplayStore.is_recorded(request.url):
+            self.store.put(
+                request.method,
+                request.url,
+                request.body,
+                response.status,
+                {
+                    key.decode(): [value.decode("latin-1") for value in values]
+                    for key, values in response.headers.items()
+                    if key.lower() not in UNRECORDED_HEADERS
+                },
+                response.body,
+            )
+            self.stats.inc_value("replay/recorded", spider=spider)
+        return response
+
+    def spider_closed(self, spider):
+        self.store.close()
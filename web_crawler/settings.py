@@ -6,10 +6,7 @@
 #     https://docs.scrapy.org/en/latest/topics/settings.html
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-import logging
-import rich
-from rich.console import Console
-from rich.logging import RichHandler
+from web_crawler.spiders.helpers.constants import RECORDED_API_PATHS
 
 BOT_NAME = "web_crawler"
 
@@ -24,7 +21,7 @@ NEWSPIDER_MODULE = "web_crawler.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-# CONCURRENT_REQUESTS = 32
+# CONCURRENT_REQUESTS is derived from the per-endpoint concurrency of EndpointThrottleMiddleware below
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
@@ -56,20 +53,55 @@ DEFAULT_REQUEST_HEADERS = {
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
+    "scrapy.downloadermiddlewares.retry.RetryMiddleware": None,
     "web_crawler.middlewares.CustomRetryMiddleware": 543,
+    "web_crawler.middlewares.EndpointThrottleMiddleware": 550,
+    # Below HttpCompressionMiddleware (590), so that responses are recorded decompressed
+    "web_crawler.replay.ReplayMiddleware": 585,
 }
 
+# Per-endpoint adaptive concurrency (see web_crawler.middlewares.EndpointThrottleMiddleware):
+# every endpoint starts at CONCURRENT_REQUESTS_PER_DOMAIN concurrent requests, gains one per
+# round trip while its latency stays below ENDPOINT_THROTTLE_LATENCY_TOLERANCE times the lowest
+# seen, loses one per round trip above it and is halved on errors
+ENDPOINT_THROTTLE_ENABLED = True
+ENDPOINT_THROTTLE_MAX_CONCURRENCY = 32
+ENDPOINT_THROTTLE_LATENCY_TOLERANCE = 2.0
+# Every endpoint can reach its maximum concurrency at once, so the global cap does not bind
+# (lower it, or the maximum, to cap the total load on the API)
+CONCURRENT_REQUESTS = len(RECORDED_API_PATHS) * ENDPOINT_THROTTLE_MAX_CONCURRENCY
+
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-# }
+EXTENSIONS = {
+    "web_crawler.extensions.RichLogging": 0,
+    "web_crawler.extensions.CrawlMetrics": 500,
+}
+
+# Log to the console with rich once a crawler starts (see web_crawler.extensions.RichLogging),
+# instead of with Scrapy's own handler, which is disabled by LOG_ENABLED = False below
+RICH_LOGGING_ENABLED = True
+
+# Per-endpoint latency histograms, retries, items/sec and requests in flight
+# (see web_crawler.extensions.CrawlMetrics), logged every METRICS_INTERVAL seconds and
+# written as JSON to METRICS_PATH if set
+METRICS_ENABLED = True
+METRICS_INTERVAL = 60
+METRICS_PATH = None
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-# ITEM_PIPELINES = {
-#    "web_crawler.pipelines.WebCrawlerPipeline": 300,
-# }
+ITEM_PIPELINES = {
+    "web_crawler.pipelines.StreamingERPipeline": 300,
+}
+
+# Resolve the crawled companies while crawling (see web_crawler.pipelines.StreamingERPipeline),
+# writing the company -> cluster table to STREAMING_ER_CLUSTER_PATH when the spider closes
+STREAMING_ER_CLUSTER_PATH = None
+STREAMING_ER_BATCH_SIZE = 1000
+# Fuzzy matching of addresses and names is off (0) unless a minimum similarity such as 0.9 is set
+STREAMING_ER_FUZZY_THRESHOLD = 0.0
+STREAMING_ER_WORKERS = 1
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -96,6 +128,9 @@ DOWNLOADER_MIDDLEWARES = {
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
+FEED_EXPORTERS = {
+    "parquet": "web_crawler.exporters.ParquetItemExporter",
+}
 
 CLOSESPIDER_ERRORCOUNT = 1
 
@@ -103,33 +138,21 @@ RETRY_ENABLED = True
 RETRY_TIMES = 2
 RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 408, 400, 405]
 
-LOG_ENABLED = False
-
-
-def configure_rich_logging():
-    rich_handler = RichHandler(
-        markup=True,
-        console=Console(width=255, color_system="auto"),
-    )
-
-    # Customize the log format with a time format
-    log_format = logging.Formatter("%(message)s", datefmt="[%X]")
-    rich_handler.setFormatter(log_format)
-
-    root_logger = logging.getLogger()
+# Non-blocking retry backoff (see web_crawler.middlewares.CustomRetryMiddleware):
+# delay = RETRY_BACKOFF_BASE_DELAY * 2**retry_times, jittered by +/- RETRY_BACKOFF_JITTER,
+# extended to the host's Retry-After and capped at RETRY_BACKOFF_MAX_DELAY seconds, or at the
+# cap of the host (host:port of the request URL) in RETRY_BACKOFF_HOST_MAX_DELAY
+RETRY_BACKOFF_BASE_DELAY = 1
+RETRY_BACKOFF_MAX_DELAY = 60
+RETRY_BACKOFF_HOST_MAX_DELAY = {}
+RETRY_BACKOFF_JITTER = 0.5
 
-    # Remove existing handlers from the root logger
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
+# Record API responses to, or replay them from, a local store (see web_crawler.replay):
+# REPLAY_MODE = "record" | "replay"
+REPLAY_MODE = None
+REPLAY_STORE_PATH = "tmp/replay/api_responses.sqlite"
 
-    # Set the logging level for the root logger
-    root_logger.setLevel(logging.INFO)
+# Point the spider at another API host, e.g. the local stand-in server:
+# SOURCE_BASE_URL = "http://127.0.0.1:8080"
 
-    # Set the logging level for the RichHandler
-    rich_handler.setLevel(logging.INFO)
-
-    # Add the RichHandler to the root logger
-    root_logger.addHandler(rich_handler)
-
-
-configure_rich_logging()
+LOG_ENABLED = False
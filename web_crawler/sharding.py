@@ -0,0 +1,220 @@
+import csv
+import json
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Optional
+from string import ascii_uppercase, digits
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from web_crawler.checkpoint import resumed_feed_options
+
+MERGEABLE_FEED_FORMATS = ("csv", "jsonlines", "jl", "parquet")
+
+logger = logging.getLogger(__name__)
+
+
+def expand_prefixes(prefixes: str) -> list[str]:
+    """
+    Expand a comma-separated prefix spec into a list of search prefixes.
+    Single-character ranges such as "A-Z" or "0-9" are expanded, other items are kept as is.
+
+    Parameters:
+    - prefixes: The prefix spec, e.g. "A-Z,0-9" or "X,Y,ZE".
+    """
+    expanded = []
+    for item in (item.strip() for item in prefixes.split(",")):
+        if len(item) == 3 and item[1] == "-":
+            for alphabet in (ascii_uppercase, digits):
+                start, end = alphabet.find(item[0].upper()), alphabet.find(
+                    item[2].upper()
+                )
+                if -1 < start <= end:
+                    expanded.extend(alphabet[start : end + 1])
+                    break
+            else:
+                raise ValueError(f"Invalid prefix range: {item}")
+        elif item:
+            expanded.append(item)
+    return list(dict.fromkeys(expanded))
+
+
+def crawl_prefix(
+    prefix: str,
+    feed_path: str,
+    feed_format: str,
+    spider_kwargs: dict,
+    settings_overrides: dict,
+) -> str:
+    """
+    Crawl the active companies for a single prefix into its own feed.
+    Runs in a worker process, as a Twisted reactor cannot be restarted within a process.
+
+    Parameters:
+    - prefix: The search prefix.
+    - feed_path: The path of the feed to write.
+    - feed_format: The feed format.
+    - spider_kwargs: Additional arguments for the spider. With a job_dir, the crawl resumes from its
+      checkpoint and appends to the feed.
+    - settings_overrides: Settings overriding the project settings.
+    """
+    settings = get_project_settings()
+    settings.setdict(settings_overrides, priority="cmdline")
+    feed_options = {"format": feed_format, "overwrite": True}
+    if spider_kwargs.get("job_dir"):
+        feed_options = resumed_feed_options(
+            feed_path, feed_format, spider_kwargs["job_dir"], prefix
+        )
+    settings.set("FEEDS", {feed_path: feed_options})
+    process = CrawlerProcess(settings)
+    process.crawl("rest_spider", search_param=prefix, **spider_kwargs)
+    process.start()
+    return feed_path
+
+
+def crawl_prefixes(
+    prefixes: list[str],
+    shard_dir: str,
+    output_filename: str,
+    feed_format: str,
+    workers: int,
+    spider_kwargs: Optional[dict] = None,
+    settings_overrides: Optional[dict] = None,
+) -> list[str]:
+    """
+    Crawl every prefix in a pool of worker processes, each with its own spider and feed shard.
+
+    Parameters:
+    - prefixes: The search prefixes.
+    - shard_dir: The directory for the per-prefix feed shards.
+    - output_filename: The base name of the feed files.
+    - feed_format: The feed format.
+    - workers: The number of worker processes.
+    - spider_kwargs: Additional arguments for every spider.
+    - settings_overrides: Settings overriding the project settings of every crawl.
+    """
+    Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    tasks = [
+        (
+            prefix,
+            os.path.join(shard_dir, f"{output_filename}_{prefix}.{feed_format}"),
+            feed_format,
+            spider_kwargs or {},
+            settings_overrides or {},
+        )
+        for prefix in prefixes
+    ]
+    # One task per child: every crawl needs a fresh process for its reactor
+    with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+        return pool.starmap(crawl_prefix, tasks, chunksize=1)
+
+
+def read_feed(path: str, feed_format: str):
+    """
+    Yield the records of a csv or jsonlines feed.
+
+    Parameters:
+    - path: The feed path.
+    - feed_format: The feed format.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, newline="", encoding="utf-8") as feed:
+        if feed_format == "csv":
+            yield from csv.DictReader(feed)
+        else:
+            for line in feed:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def merge_feeds(shard_paths: list[str], out_paths: list[str], feed_format: str) -> int:
+    """
+    Merge feed shards into one dataset per output path, keeping the first record of every company_id.
+    Returns the number of records written.
+
+    Parameters:
+    - shard_paths: The feed shards to merge.
+    - out_paths: The merged feed paths to write.
+    - feed_format: The feed format of shards and output.
+    """
+    if feed_format == "parquet":
+        return merge_parquet_feeds(shard_paths, out_paths)
+    seen_company_ids = set()
+    outputs = []
+    for out_path in out_paths:
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        outputs.append(open(out_path, "w", newline="", encoding="utf-8"))
+    try:
+        writers = None
+        for shard_path in shard_paths:
+            for record in read_feed(shard_path, feed_format):
+                company_id = str(record["company_id"])
+                if company_id in seen_company_ids:
+                    continue
+                seen_company_ids.add(company_id)
+                if feed_format != "csv":
+                    line = json.dumps(record) + "\n"
+                    for output in outputs:
+                        output.write(line)
+                    continue
+                if writers is None:
+                    writers = [
+                        csv.DictWriter(output, fieldnames=list(record))
+                        for output in outputs
+                    ]
+                    for writer in writers:
+                        writer.writeheader()
+                for writer in writers:
+                    writer.writerow(record)
+    finally:
+        for output in outputs:
+            output.close()
+    logger.info(
+        f"Merged {len(shard_paths)} feed shards into {len(seen_company_ids)} companies"
+    )
+    return len(seen_company_ids)
+
+
+def merge_parquet_feeds(shard_paths: list[str], out_paths: list[str]) -> int:
+    """
+    Merge Parquet feed shards into one dataset per output path, one row group per shard,
+    keeping the first record of every company_id. Returns the number of records written.
+
+    Parameters:
+    - shard_paths: The feed shards to merge.
+    - out_paths: The merged feed paths to write.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from web_crawler.exporters import company_info_schema
+
+    schema = company_info_schema()
+    seen_company_ids = set()
+    writers = []
+    for out_path in out_paths:
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        writers.append(pq.ParquetWriter(out_path, schema, compression="zstd"))
+    try:
+        for shard_path in shard_paths:
+            if not os.path.exists(shard_path):
+                continue
+            table = pq.read_table(shard_path, schema=schema)
+            first_rows = []
+            for row, company_id in enumerate(table.column("company_id").to_pylist()):
+                if company_id not in seen_company_ids:
+                    seen_company_ids.add(company_id)
+                    first_rows.append(row)
+            for writer in writers:
+                writer.write_table(table.take(pa.array(first_rows, type=pa.int64())))
+    finally:
+        for writer in writers:
+            writer.close()
+    logger.info(
+        f"Merged {len(shard_paths)} feed shards into {len(seen_company_ids)} companies"
+    )
+    return len(seen_company_ids)
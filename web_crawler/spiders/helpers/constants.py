@@ -1,4 +1,17 @@
 SOURCE_BASE_URL = "https://firststop.sos.nd.gov"
-OWNER_STATUS_API_URL = f"{SOURCE_BASE_URL}/api/WebUserAccess/GET_USER_IS_OWNER"
-FILING_DETAIL_API_BASE_URL = f"{SOURCE_BASE_URL}/api/FilingDetail/business"
+BUSINESS_SEARCH_API_PATH = "/api/Records/businesssearch"
+OWNER_STATUS_API_PATH = "/api/WebUserAccess/GET_USER_IS_OWNER"
+FILING_DETAIL_API_PATH = "/api/FilingDetail/business"
+RECORDED_API_PATHS = (
+    BUSINESS_SEARCH_API_PATH,
+    OWNER_STATUS_API_PATH,
+    FILING_DETAIL_API_PATH,
+)
+OWNER_STATUS_API_URL = f"{SOURCE_BASE_URL}{OWNER_STATUS_API_PATH}"
+FILING_DETAIL_API_BASE_URL = f"{SOURCE_BASE_URL}{FILING_DETAIL_API_PATH}"
 DEFAULT_SOURCE_TYPE_ID = 54
+DEFAULT_STATE_TTL_HOURS = 24 * 7
+# Scheduler priorities: a company's follow-up requests run before the owner-status requests of
+# companies not started yet, so that started chains finish and in-flight state stays bounded
+OWNER_STATUS_PRIORITY = 1
+FILING_DETAIL_PRIORITY = 2
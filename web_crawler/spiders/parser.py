@@ -1,13 +1,29 @@
+import dataclasses
 import datetime
+from typing import Optional
+
 from web_crawler.items import CompanyInfoItem
 
+# The fields of CompanyInfoItem in constructor order, and the position of every field
+ITEM_FIELDS = tuple(field.name for field in dataclasses.fields(CompanyInfoItem))
+FIELD_POSITIONS = {name: position for position, name in enumerate(ITEM_FIELDS)}
+COMPANY_ID_POSITION = FIELD_POSITIONS["company_id"]
+COMPANY_NAME_POSITION = FIELD_POSITIONS["company_name"]
+TITLE_POSITION = FIELD_POSITIONS["title"]
+RETRIEVED_AT_POSITION = FIELD_POSITIONS["retrieved_at"]
+# Marks a key whose field position is not memoized yet, as None marks keys that are not fields
+UNSEEN = -1
+
 
 class Parser:
     def __init__(self) -> None:
         """
         Initialize the Parser class.
         """
-        pass
+        # Memoized positions in ITEM_FIELDS of the meta info keys and filing info labels,
+        # as the API returns the same few keys and labels for every company
+        self.meta_positions: dict[str, Optional[int]] = {}
+        self.label_positions: dict[str, Optional[int]] = {}
 
     def __normalize_text(self, text):
         """
@@ -27,35 +43,58 @@ class Parser:
         """
         return text.replace(" ", "_").replace("-", "_").replace("___", "_").lower()
 
+    def __meta_position(self, key: str) -> Optional[int]:
+        """
+        Return the position of the field a meta info key is parsed into, or None if it is not a field.
+        The id is the company_id, and the company_name and retrieved_at are set by parse_data.
+
+        Parameters:
+        - key: The meta info key.
+        """
+        name = self.__snakecase(key)
+        if name == "id":
+            return COMPANY_ID_POSITION
+        if name in ("company_id", "company_name", "retrieved_at"):
+            return None
+        return FIELD_POSITIONS.get(name)
+
+    def __label_position(self, label: str) -> Optional[int]:
+        """
+        Return the position of the field a filing info label is parsed into, or None if it is not a field.
+
+        Parameters:
+        - label: The filing info label.
+        """
+        return FIELD_POSITIONS.get(self.__snakecase(label))
+
     def parse_data(self, filing_info_data, meta_info_data):
         """
         Parse filing information and company meta information, combining them into a structured output.
+        Filing information takes precedence over meta information, and missing fields are None.
 
         Parameters:
         - company_filing_info: The filing information to be parsed.
         - company_meta_info: The meta information about the company.
         """
-        filing_info = {
-            self.__snakecase(info["LABEL"]): self.__normalize_text(info["VALUE"])
-            for info in filing_info_data["DRAWER_DETAIL_LIST"]
-        }
-        meta_info_formatted = {
-            self.__snakecase(key): value for key, value in meta_info_data.items()
-        }
-        meta_info_formatted.update(
-            {
-                "company_id": meta_info_formatted.pop("id"),
-                "company_name": meta_info_formatted["title"][0],
-                "retrieved_at": datetime.datetime.now(),  # Add meta-info
-            }
-        )
-
-        combined_info = meta_info_formatted | filing_info
-
-        # Ensure all fields are present in parsed_data with default values of None
-        parsed_data = {
-            key: combined_info.get(key, None)
-            for key in CompanyInfoItem.__annotations__.keys()
-        }
-
-        yield CompanyInfoItem(**parsed_data)
+        values = [None] * len(ITEM_FIELDS)
+
+        meta_positions = self.meta_positions
+        for key, value in meta_info_data.items():
+            position = meta_positions.get(key, UNSEEN)
+            if position == UNSEEN:
+                position = meta_positions[key] = self.__meta_position(key)
+            if position is not None:
+                values[position] = value
+        values[COMPANY_NAME_POSITION] = values[TITLE_POSITION][0]
+        values[RETRIEVED_AT_POSITION] = datetime.datetime.now()  # Add meta-info
+
+        label_positions = self.label_positions
+        for info in filing_info_data["DRAWER_DETAIL_LIST"]:
+            label = info["LABEL"]
+            position = label_positions.get(label, UNSEEN)
+            if position == UNSEEN:
+                position = label_positions[label] = self.__label_position(label)
+            if position is not None:
+                values[position] = self.__normalize_text(info["VALUE"])
+
+        yield CompanyInfoItem(*values)
@@ -1,12 +1,21 @@
 import scrapy
 import json
+import os
+from typing import Iterable, Optional
+from scrapy import signals
 from .parser import Parser
 from .helpers.constants import (
     SOURCE_BASE_URL,
-    OWNER_STATUS_API_URL,
-    FILING_DETAIL_API_BASE_URL,
+    BUSINESS_SEARCH_API_PATH,
+    OWNER_STATUS_API_PATH,
+    FILING_DETAIL_API_PATH,
     DEFAULT_SOURCE_TYPE_ID,
+    DEFAULT_STATE_TTL_HOURS,
+    OWNER_STATUS_PRIORITY,
+    FILING_DETAIL_PRIORITY,
 )
+from web_crawler.state import CrawlStateStore
+from web_crawler.checkpoint import CrawlCheckpoint, checkpoint_path
 
 
 class RestSpider(scrapy.Spider):
@@ -16,21 +25,80 @@ class RestSpider(scrapy.Spider):
 
     name = "rest_spider"
 
-    def __init__(self, search_param: str):
+    def __init__(
+        self,
+        search_param: str,
+        state_path: Optional[str] = None,
+        ttl_hours: float = DEFAULT_STATE_TTL_HOURS,
+        job_dir: Optional[str] = None,
+    ):
         """
         Initialize the RestSpider with the specified search parameter.
 
         Parameters:
         - search_param (str): The parameter used for searching active companies.
+        - state_path (str): The crawl state store used for incremental crawls. Detail requests are then
+          only issued for new or changed companies, or companies older than ttl_hours.
+        - ttl_hours (float): The age after which an unchanged company is crawled again.
+        - job_dir (str): The directory of the crawl checkpoints used for resumable crawls. The search
+          listing and the completed companies are saved to <job_dir>/<search_param>.sqlite, and a
+          crawl with an existing checkpoint only requests the companies that are not completed.
         """
         super().__init__()
         self.search_param: str = search_param
         self.parser: Parser = Parser()
+        self.state: Optional[CrawlStateStore] = (
+            CrawlStateStore(state_path, float(ttl_hours)) if state_path else None
+        )
+        self.unchanged_companies: int = 0
+        self.owner_statuses: dict[str, str] = {}
+        self.cached_owner_statuses: int = 0
+        self.checkpoint: Optional[CrawlCheckpoint] = (
+            CrawlCheckpoint(checkpoint_path(job_dir, search_param)) if job_dir else None
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if spider.checkpoint:
+            crawler.signals.connect(spider.spider_opened, signal=signals.spider_opened)
+        return spider
+
+    def spider_opened(self, spider):
+        # Connected once the feed exporter is, so that companies are completed after their item
+        # was exported
+        self.crawler.signals.connect(self.item_scraped, signal=signals.item_scraped)
+
+    def item_scraped(self, item, response, spider):
+        """
+        Mark the company of an exported item as completed.
+        """
+        self.checkpoint.complete(item.company_id)
+
+    @property
+    def source_base_url(self) -> str:
+        """
+        The base URL of the API, overridable with the SOURCE_BASE_URL setting (e.g. for a local stand-in server).
+        """
+        return self.settings.get("SOURCE_BASE_URL") or SOURCE_BASE_URL
 
     def start_requests(self):
         """
-        Start the requests by initiating a search for active companies.
+        Start the requests by initiating a search for active companies, or by resuming the
+        companies of a saved search listing that are not completed.
         """
+        if self.checkpoint and self.checkpoint.is_listed(self.search_param):
+            listed, completed = self.checkpoint.counts()
+            self.logger.info(
+                f"Resuming the crawl of {self.search_param}: {completed} of {listed} companies are completed..."
+            )
+            # The stored items of unchanged companies cannot be yielded from start_requests, so
+            # the companies are resumed from the callback of an in-process data: request
+            yield scrapy.Request(
+                "data:,", callback=self.resume_companies, dont_filter=True
+            )
+            return
+
         self.logger.info(
             f"Pulling active companies list starting with letter: {self.search_param}..."
         )
@@ -40,7 +108,7 @@ class RestSpider(scrapy.Spider):
             "ACTIVE_ONLY_YN": True,
         }
         yield scrapy.Request(
-            url=f"{SOURCE_BASE_URL}/api/Records/businesssearch",
+            url=f"{self.source_base_url}{BUSINESS_SEARCH_API_PATH}",
             method="POST",
             body=json.dumps(payload),
             callback=self.handle_active_companies_list,
@@ -53,29 +121,82 @@ class RestSpider(scrapy.Spider):
         Parameters:
         - response: The response object containing information about active companies.
         """
-        active_companies = response.json().get("rows", {})
-
-        for company_id, company_meta_info in active_companies.items():
-            if (
-                company_meta_info["TITLE"][0]
-                .lower()
-                .startswith(self.search_param.lower())
-            ):
-                payload = {
-                    "SOURCE_TYPE_ID": DEFAULT_SOURCE_TYPE_ID,
-                    "SOURCE_ID": company_id,
-                }
-
-                yield scrapy.Request(
-                    url=OWNER_STATUS_API_URL,
-                    method="POST",
-                    body=json.dumps(payload),
-                    meta={
-                        "company_id": company_id,
-                        "company_meta_info": company_meta_info,
-                    },
-                    callback=self.handle_owner_status,
-                )
+        active_companies = {
+            company_id: company_meta_info
+            for company_id, company_meta_info in response.json().get("rows", {}).items()
+            if company_meta_info["TITLE"][0]
+            .lower()
+            .startswith(self.search_param.lower())
+        }
+        if self.checkpoint:
+            self.checkpoint.save_listing(self.search_param, active_companies)
+        yield from self.company_requests(active_companies.items())
+
+    def resume_companies(self, response):
+        """
+        Resume the companies of the saved search listing that are not completed.
+
+        Parameters:
+        - response: The empty response of the data: request.
+        """
+        yield from self.company_requests(self.checkpoint.remaining())
+
+    def company_requests(self, companies: Iterable[tuple[str, dict]]):
+        """
+        Yield the owner-status or filing-detail request of every company, or its stored item if it
+        is unchanged.
+
+        Parameters:
+        - companies: The company_id and search-listing row of every company.
+        """
+        for company_id, company_meta_info in companies:
+            if self.state:
+                # Reuse the stored item of unchanged companies instead of re-crawling them
+                item = self.state.get_unchanged_item(company_id, company_meta_info)
+                if item is not None:
+                    self.unchanged_companies += 1
+                    yield item
+                    continue
+
+            meta = {
+                "company_id": company_id,
+                "company_meta_info": company_meta_info,
+            }
+            owner_status = self.get_owner_status(company_id)
+            if owner_status is not None:
+                # Skip the owner-status request of companies whose status is known
+                self.cached_owner_statuses += 1
+                yield self.filing_detail_request(company_id, owner_status, meta)
+                continue
+
+            payload = {
+                "SOURCE_TYPE_ID": DEFAULT_SOURCE_TYPE_ID,
+                "SOURCE_ID": company_id,
+            }
+
+            yield scrapy.Request(
+                url=f"{self.source_base_url}{OWNER_STATUS_API_PATH}",
+                method="POST",
+                body=json.dumps(payload),
+                meta=meta,
+                priority=OWNER_STATUS_PRIORITY,
+                callback=self.handle_owner_status,
+            )
+
+    def get_owner_status(self, company_id: str) -> Optional[str]:
+        """
+        Return the owner status of a company seen earlier in this crawl, saved in the checkpoint of
+        a resumed crawl or stored in the crawl state store, if any.
+
+        Parameters:
+        - company_id: The id of the company.
+        """
+        owner_status = self.owner_statuses.get(company_id)
+        if owner_status is None and self.checkpoint:
+            owner_status = self.checkpoint.get_owner_status(company_id)
+        if owner_status is None and self.state:
+            owner_status = self.state.get_owner_status(company_id)
+        return owner_status
 
     def handle_owner_status(self, response):
         """
@@ -83,11 +204,36 @@ class RestSpider(scrapy.Spider):
         """
         owner_status: str = str(response.json()).lower()
         company_id: str = response.meta["company_id"]
+        self.owner_statuses[company_id] = owner_status
+        if self.state:
+            self.state.save_owner_status(company_id, owner_status)
+        if self.checkpoint:
+            self.checkpoint.save_owner_status(company_id, owner_status)
 
-        yield scrapy.Request(
-            url=f"{FILING_DETAIL_API_BASE_URL}/{company_id}/{owner_status}",
+        # Only the company is passed on: the download slot and retry count of the response
+        # belong to the owner-status request
+        meta = {
+            "company_id": company_id,
+            "company_meta_info": response.meta["company_meta_info"],
+        }
+        yield self.filing_detail_request(company_id, owner_status, meta)
+
+    def filing_detail_request(
+        self, company_id: str, owner_status: str, meta: dict
+    ) -> scrapy.Request:
+        """
+        Return the request retrieving the filing info of a company.
+
+        Parameters:
+        - company_id: The id of the company.
+        - owner_status: The owner status of the company.
+        - meta: The company_id and company_meta_info of the company.
+        """
+        return scrapy.Request(
+            url=f"{self.source_base_url}{FILING_DETAIL_API_PATH}/{company_id}/{owner_status}",
             method="GET",
-            meta=response.meta,
+            meta=meta,
+            priority=FILING_DETAIL_PRIORITY,
             callback=self.retrieve_company_filing_info,
         )
 
@@ -102,7 +248,10 @@ class RestSpider(scrapy.Spider):
             response.json(),
             response.meta["company_meta_info"],
         )
-        yield from self.parser.parse_data(company_filing_info_json, company_meta_info)
+        for item in self.parser.parse_data(company_filing_info_json, company_meta_info):
+            if self.state:
+                self.state.save(company_meta_info, item)
+            yield item
 
     def closed(self, reason):
         """
@@ -111,4 +260,21 @@ class RestSpider(scrapy.Spider):
         Parameters:
         - reason: The reason for closing the spider.
         """
+        if self.cached_owner_statuses:
+            self.logger.info(
+                f"Reused the owner status of {self.cached_owner_statuses} companies..."
+            )
+        if self.state:
+            self.state.close()
+            self.logger.info(
+                f"Skipped detail requests for {self.unchanged_companies} unchanged companies..."
+            )
+        if self.checkpoint:
+            listed, completed = self.checkpoint.counts()
+            self.checkpoint.close()
+            self.logger.info(
+                f"Completed {completed} of {listed} companies, run the crawl again with the same job directory to resume..."
+                if completed < listed
+                else f"Completed all {listed} companies..."
+            )
         self.logger.info("Done...")
@@ -0,0 +1,241 @@
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import ascii_uppercase, digits
+from typing import Optional
+from urllib.parse import urlsplit
+
+from web_crawler.replay import ReplayStore
+from web_crawler.spiders.helpers.constants import (
+    BUSINESS_SEARCH_API_PATH,
+    FILING_DETAIL_API_PATH,
+    OWNER_STATUS_API_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+FILING_TYPES = [
+    "Limited Liability Company - Business - Domestic",
+    "Limited Liability Company - Business - Foreign",
+    "Corporation - Business - Domestic",
+    "Corporation - Business - Foreign",
+]
+COMMERCIAL_AGENTS = [
+    "C T CORPORATION SYSTEM 120 W SWEET AVE BISMARCK, ND  58504",
+    "REGISTERED AGENTS INC. 1060 E INTERSTATE AVE STE 4 BISMARCK, ND  58503",
+    "CORPORATION SERVICE COMPANY 1709 N 19TH ST STE 3 BISMARCK, ND  58501-2121",
+]
+CITIES = ["BISMARCK, ND 58501", "FARGO, ND 58103", "MINOT, ND 58701"]
+
+
+class SyntheticRegistry:
+    """
+    Deterministic synthetic stand-in for the business registry, shaped like the three API endpoints.
+    """
+
+    def __init__(self, companies: int = 1000, agents: int = 50, seed: int = 0) -> None:
+        """
+        Generate the synthetic registry.
+
+        Parameters:
+        - companies: The number of companies.
+        - agents: The number of distinct non-commercial registered agents.
+        - seed: The random seed.
+        """
+        rng = random.Random(seed)
+        initials = ascii_uppercase + digits
+        self.search_rows: dict[str, dict] = {}
+        self.filing_details: dict[str, dict] = {}
+        for i in range(companies):
+            company_id = str(100000 + i)
+            filing_type = rng.choice(FILING_TYPES)
+            name = f"{initials[i % len(initials)]}{rng.randint(100, 999)} VENTURES {i}, LLC"
+            filing_date = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(1990, 2023)}"
+            address = f"{rng.randint(1, 9999)} MAIN ST {rng.choice(CITIES)}"
+            self.search_rows[company_id] = {
+                "ID": company_id,
+                "TITLE": [name, filing_type],
+                "FILING_TYPE": filing_type,
+                "FILING_DATE": filing_date,
+                "RECORD_NUM": company_id.zfill(10),
+                "STATUS": "Active",
+                "STANDING": "Good Standing",
+                "ALERT": False,
+                "CAN_REINSTATE": False,
+                "CAN_FILE_AR": False,
+                "CAN_ALWAYS_FILE_AR": False,
+                "CAN_FILE_REINSTATEMENT": False,
+            }
+            agent_label, agent = (
+                ("Commercial Registered Agent", rng.choice(COMMERCIAL_AGENTS))
+                if rng.random() < 0.5
+                else (
+                    "Registered Agent",
+                    f"AGENT {rng.randrange(agents)}\n{address}",
+                )
+            )
+            self.filing_details[company_id] = {
+                "DRAWER_DETAIL_LIST": [
+                    {"LABEL": "Filing Type", "VALUE": filing_type},
+                    {"LABEL": "Status", "VALUE": "Active"},
+                    {"LABEL": "Standing - AR", "VALUE": "Good"},
+                    {"LABEL": "Standing - RA", "VALUE": "Good"},
+                    {"LABEL": "Standing - Other", "VALUE": "Good"},
+                    {"LABEL": "Formed In", "VALUE": "NORTH DAKOTA"},
+                    {"LABEL": "Term of Duration", "VALUE": "Perpetual"},
+                    {"LABEL": "Initial Filing Date", "VALUE": filing_date},
+                    {"LABEL": "Principal Address", "VALUE": address},
+                    {"LABEL": "Mailing Address", "VALUE": address},
+                    {"LABEL": "AR Due Date", "VALUE": "11/15/2024"},
+                    {"LABEL": agent_label, "VALUE": agent},
+                ]
+            }
+
+    def search(self, search_value: str) -> dict:
+        """
+        Return the businesssearch response for a search value.
+
+        Parameters:
+        - search_value: The prefix searched for.
+        """
+        prefix = search_value.lower()
+        return {
+            "rows": {
+                company_id: row
+                for company_id, row in self.search_rows.items()
+                if row["TITLE"][0].lower().startswith(prefix)
+            }
+        }
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local HTTP stand-in for the North Dakota SOS API, serving recorded responses from a
+    ReplayStore or synthetic data, with configurable latency, error rate and capacity.
+    Like the live API, responses are gzip-compressed for clients that accept it.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        registry: Optional[SyntheticRegistry] = None,
+        replay_store: Optional[ReplayStore] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        capacity: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the StandInServer.
+
+        Parameters:
+        - address: The (host, port) to listen on.
+        - registry: The synthetic registry served when no replay store is given.
+        - replay_store: The store of recorded responses to serve.
+        - latency: The mean response latency in seconds (jittered by +/- 50%).
+        - error_rate: The share of requests answered with a 503.
+        - capacity: The number of requests served concurrently at the mean latency. Beyond it the
+          latency grows with the number of requests in flight, and requests beyond twice the
+          capacity are answered with a 503, like an overloaded server.
+        """
+        super().__init__(address, StandInRequestHandler)
+        self.registry = registry or SyntheticRegistry()
+        self.replay_store = replay_store
+        self.latency = latency
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def do_GET(self):
+        self.handle_api("GET")
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+    def handle_api(self, method: str) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server.in_flight_lock:
+            server.in_flight += 1
+            load = server.in_flight / server.capacity if server.capacity else 1.0
+        try:
+            if load > 2:
+                self.send(503, b"", {"Retry-After": "1"})
+                return
+            if server.latency:
+                time.sleep(server.latency * max(load, 1.0) * random.uniform(0.5, 1.5))
+            self.handle_load(method, body)
+        finally:
+            with server.in_flight_lock:
+                server.in_flight -= 1
+
+    def handle_load(self, method: str, body: bytes) -> None:
+        if random.random() < self.server.error_rate:
+            self.send(503, b"", {"Retry-After": "1"})
+            return
+
+        if self.server.replay_store is not None:
+            recorded = self.server.replay_store.get(method, self.path, body)
+            if recorded is None:
+                self.send(404, b"")
+                return
+            status, headers, response_body = recorded
+            self.send(
+                status,
+                response_body,
+                {
+                    key: headers[key][0]
+                    # Stores recorded before decompression hold the encoded body
+                    for key in ("Content-Type", "Content-Encoding")
+                    if key in headers
+                },
+            )
+            return
+
+        response = self.synthetic_response(method, urlsplit(self.path).path, body)
+        if response is None:
+            self.send(404, b"")
+        else:
+            self.send(200, json.dumps(response).encode())
+
+    def synthetic_response(self, method: str, path: str, body: bytes):
+        registry = self.server.registry
+        if method == "POST" and path == BUSINESS_SEARCH_API_PATH:
+            return registry.search(json.loads(body).get("SEARCH_VALUE", ""))
+        if method == "POST" and path == OWNER_STATUS_API_PATH:
+            return False
+        if method == "GET" and path.startswith(FILING_DETAIL_API_PATH):
+            company_id = path[len(FILING_DETAIL_API_PATH) :].strip("/").split("/")[0]
+            return registry.filing_details.get(company_id)
+        return None
+
+    def send(self, status: int, body: bytes, headers: Optional[dict] = None) -> None:
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        if (
+            body
+            and "Content-Encoding" not in headers
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        ):
+            # Compress like the live API
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
@@ -0,0 +1,167 @@
+import dataclasses
+import datetime
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from web_crawler.items import CompanyInfoItem
+
+
+class CrawlStateStore:
+    """
+    Local SQLite store of the last crawled state of every company, keyed by company_id.
+
+    It keeps a hash of the company's search-listing row, the last parsed item and when it was
+    retrieved, so that follow-up detail requests are only needed for new, changed or stale companies.
+    The owner status of every company is kept as well, so that changed companies skip the
+    owner-status request while it is younger than the TTL.
+    """
+
+    def __init__(self, path: str, ttl_hours: float, commit_every: int = 500) -> None:
+        """
+        Open (or create) the state store.
+
+        Parameters:
+        - path: The path of the SQLite database file.
+        - ttl_hours: The age after which a stored company is crawled again even if unchanged.
+        - commit_every: The number of saved companies between commits.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Sharded crawls write from several processes, so wait for locks instead of failing
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS companies (
+                company_id TEXT PRIMARY KEY,
+                search_hash TEXT NOT NULL,
+                item TEXT NOT NULL,
+                retrieved_at TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS owner_statuses (
+                company_id TEXT PRIMARY KEY,
+                owner_status TEXT NOT NULL,
+                retrieved_at TEXT NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+        self.ttl = datetime.timedelta(hours=ttl_hours)
+        self.commit_every = commit_every
+        self.pending_writes = 0
+
+    @staticmethod
+    def search_hash(company_meta_info: dict) -> str:
+        """
+        Return a stable hash of a company's search-listing row.
+
+        Parameters:
+        - company_meta_info: The search-listing row of the company.
+        """
+        return hashlib.sha1(
+            json.dumps(company_meta_info, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def get_unchanged_item(
+        self, company_id: str, company_meta_info: dict
+    ) -> Optional[CompanyInfoItem]:
+        """
+        Return the stored item of a company if its search-listing row is unchanged and the item
+        is younger than the TTL, otherwise None.
+
+        Parameters:
+        - company_id: The id of the company.
+        - company_meta_info: The current search-listing row of the company.
+        """
+        row = self.connection.execute(
+            "SELECT search_hash, item, retrieved_at FROM companies WHERE company_id = ?",
+            (str(company_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        search_hash, item, retrieved_at = row
+        if search_hash != self.search_hash(company_meta_info):
+            return None
+        if (
+            datetime.datetime.now() - datetime.datetime.fromisoformat(retrieved_at)
+            > self.ttl
+        ):
+            return None
+        item = json.loads(item)
+        item["retrieved_at"] = datetime.datetime.fromisoformat(item["retrieved_at"])
+        return CompanyInfoItem(**item)
+
+    def save(self, company_meta_info: dict, item: CompanyInfoItem) -> None:
+        """
+        Store the search-listing row and parsed item of a crawled company.
+
+        Parameters:
+        - company_meta_info: The search-listing row of the company.
+        - item: The parsed company item.
+        """
+        retrieved_at = item.retrieved_at.isoformat()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?)",
+            (
+                str(item.company_id),
+                self.search_hash(company_meta_info),
+                json.dumps(dataclasses.asdict(item) | {"retrieved_at": retrieved_at}),
+                retrieved_at,
+            ),
+        )
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def get_owner_status(self, company_id: str) -> Optional[str]:
+        """
+        Return the stored owner status of a company if it is younger than the TTL, otherwise None.
+
+        Parameters:
+        - company_id: The id of the company.
+        """
+        row = self.connection.execute(
+            "SELECT owner_status, retrieved_at FROM owner_statuses WHERE company_id = ?",
+            (str(company_id),),
+        ).fetchone()
+        if row is None:
+            return None
+        owner_status, retrieved_at = row
+        if (
+            datetime.datetime.now() - datetime.datetime.fromisoformat(retrieved_at)
+            > self.ttl
+        ):
+            return None
+        return owner_status
+
+    def save_owner_status(self, company_id: str, owner_status: str) -> None:
+        """
+        Store the owner status of a company.
+
+        Parameters:
+        - company_id: The id of the company.
+        - owner_status: The owner status returned by the API.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO owner_statuses VALUES (?, ?, ?)",
+            (
+                str(company_id),
+                owner_status,
+                datetime.datetime.now().isoformat(),
+            ),
+        )
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()